@@ -1,24 +1,83 @@
 # 应用主入口 - 初始化FastAPI应用并注册路由
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from api.middleware import MetricsMiddleware
 from api.routes import briefing_router
-from core.config import setup_logger
+from core.config import setup_logger, PRELOAD_MODELS, METRICS_ENABLED, PRELOAD_RETRY_INITIAL_DELAY, PRELOAD_RETRY_MAX_DELAY
+from core.metrics import metrics_registry
+from services.summary_service import summary_service
+from services.job_service import job_service
+from services.news_service import news_service
+from services.spider_service import spider_service
+from services.llm_service import llm
+
+# 初始化日志记录器
+logger = setup_logger()
+
+
+async def preload_models():
+    """在线程池中加载并预热模型，避免阻塞事件循环；失败时按指数退避重试，直到成功或应用关闭"""
+    delay = PRELOAD_RETRY_INITIAL_DELAY
+    while not summary_service.warmed_up:
+        try:
+            await asyncio.to_thread(summary_service.warm_up)
+        except Exception as e:
+            logger.error(f"模型预加载失败，{delay:.0f} 秒后重试: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PRELOAD_RETRY_MAX_DELAY)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时在后台预加载模型并恢复未完成的简报任务，关闭时停止任务线程池、推理进程、异步HTTP客户端和LLM异步客户端"""
+    preload_task = asyncio.create_task(preload_models()) if PRELOAD_MODELS else None
+    job_service.start()
+    yield
+    if preload_task and not preload_task.done():
+        preload_task.cancel()
+    job_service.stop()
+    summary_service.close()
+    await news_service.aclose()
+    await spider_service.aclose()
+    await llm.aclose()
+
 
 # 初始化FastAPI应用
 app = FastAPI(
     title="舆情简报服务",
     description="一个用于生成网络舆情简报的快速原型",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 注册API路由
 app.include_router(briefing_router)
 
-# 初始化日志记录器
-logger = setup_logger()
+# 注册指标中间件
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # 健康检查端点
 @app.get("/")
 def health_check():
     """服务健康检查端点"""
-    return {"status": "ok", "message": "舆情简报服务正在运行"}
\ No newline at end of file
+    return {"status": "ok", "message": "舆情简报服务正在运行"}
+
+# 就绪检查端点
+@app.get("/ready")
+def readiness_check():
+    """服务就绪检查端点，开启模型预加载时仅在模型预热完成后返回就绪"""
+    if PRELOAD_MODELS and not summary_service.warmed_up:
+        return JSONResponse(status_code=503, content={"status": "loading", "message": "模型加载中"})
+    return {"status": "ready", "message": "舆情简报服务已就绪"}
+
+# 指标端点
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """以Prometheus文本格式导出当前进程的指标"""
+    if not METRICS_ENABLED:
+        return PlainTextResponse("指标导出未开启", status_code=404)
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
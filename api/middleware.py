@@ -0,0 +1,50 @@
+# 中间件 - 记录HTTP请求数、正在处理的请求数和请求耗时指标
+
+import time
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from core.metrics import http_requests, http_requests_in_flight, http_request_duration
+
+
+class MetricsMiddleware:
+    """
+    HTTP指标中间件，按路由模板统计请求
+
+    以ASGI中间件实现而非BaseHTTPMiddleware，流式响应的耗时包含全部响应体的发送时间
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route_template(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status_code)
+            http_requests_in_flight.dec(route=route)
+
+    @staticmethod
+    def _route_template(scope: Scope) -> str:
+        """匹配请求对应的路由模板，如/jobs/{job_id}，未匹配任何路由时返回unmatched"""
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return "unmatched"
@@ -1,18 +1,22 @@
 # API路由 - 处理HTTP请求并调用相应的业务逻辑
 
+import asyncio
+import json
 import time
 import fastapi
 from fastapi import HTTPException
-from core.models import BriefingRequest, BriefingResponse, StructuredBriefingResponse
+from fastapi.responses import StreamingResponse
+from core.models import BriefingRequest, BriefingResponse, StructuredBriefingResponse, JobRequest, JobResponse
 from core.briefing_generator import briefing_generator
 from core.structured_briefing_generator import structured_briefing_generator
 from core.config import logger
+from services.job_service import job_service
 
 # 创建FastAPI路由器
 briefing_router = fastapi.APIRouter()
 
 @briefing_router.post("/generate_briefing", response_model=BriefingResponse)
-def generate_briefing(request: BriefingRequest):
+async def generate_briefing(request: BriefingRequest):
     """
     生成舆情简报的API端点
     
@@ -27,7 +31,7 @@ def generate_briefing(request: BriefingRequest):
     
     try:
         # 调用核心业务逻辑生成简报
-        response = briefing_generator.generate_briefing(request, request_id)
+        response = await briefing_generator.agenerate_briefing(request, request_id)
         return response
     except ValueError as e:
         # 处理已知的业务逻辑错误
@@ -37,7 +41,7 @@ def generate_briefing(request: BriefingRequest):
         raise HTTPException(status_code=500, detail=f"处理请求时发生错误: {str(e)}")
 
 @briefing_router.post("/briefing/structured", response_model=StructuredBriefingResponse)
-def generate_structured_briefing(request: BriefingRequest):
+async def generate_structured_briefing(request: BriefingRequest):
     """
     生成结构化舆情简报的API端点
     
@@ -52,11 +56,65 @@ def generate_structured_briefing(request: BriefingRequest):
     
     try:
         # 调用核心业务逻辑生成结构化简报
-        response = structured_briefing_generator.generate_structured_briefing(request, request_id)
+        response = await structured_briefing_generator.agenerate_structured_briefing(request, request_id)
         return response
     except ValueError as e:
         # 处理已知的业务逻辑错误
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         # 处理其他未知错误
-        raise HTTPException(status_code=500, detail=f"处理请求时发生错误: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"处理请求时发生错误: {str(e)}")
+
+@briefing_router.post("/briefing/structured/stream")
+def stream_structured_briefing(request: BriefingRequest):
+    """
+    以NDJSON流式返回结构化舆情简报的API端点
+    
+    Args:
+        request: 包含主题和最大文章数的请求体
+        
+    Returns:
+        每行一个JSON事件的流式响应，依次包含文章列表、逐篇提取结果、总结增量、总结结果和完成事件
+    """
+    # 生成请求ID用于日志追踪
+    request_id = f"req_{int(time.time())}_{hash(request.topic) % 10000}_structured_stream"
+    
+    def event_stream():
+        for event in structured_briefing_generator.stream_structured_briefing(request, request_id):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@briefing_router.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(request: JobRequest):
+    """
+    创建后台简报任务的API端点，立即返回任务ID，不等待简报生成
+    
+    Args:
+        request: 包含主题、最大文章数、简报类型和可选回调地址的请求体
+        
+    Returns:
+        新建任务的状态
+    """
+    try:
+        return await asyncio.to_thread(job_service.submit_job, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"创建任务时发生错误: {str(e)}")
+
+@briefing_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    查询后台简报任务状态的API端点
+    
+    Args:
+        job_id: 任务ID
+        
+    Returns:
+        任务状态，运行中时包含部分结果，成功时包含简报结果，失败时包含错误信息
+    """
+    job = await asyncio.to_thread(job_service.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在: {job_id}")
+    return job
@@ -1,11 +1,14 @@
 # 简报生成器 - 核心业务逻辑，负责协调各服务生成舆情简报
 
+import asyncio
 import time
 from typing import List
 from core.models import BriefingRequest, BriefingResponse, ArticleModel
 from services.news_service import news_service
 from services.summary_service import summary_service
-from core.config import logger
+from core.cache_service import briefing_cache_service
+from core.profiling import StageTimeline, span, collect_timings
+from core.config import logger, DEBUG_REQUESTS_ENABLED
 
 class BriefingGenerator:
     """舆情简报生成器，负责协调各服务完成简报生成"""
@@ -17,7 +20,9 @@ class BriefingGenerator:
     
     def generate_briefing(self, request: BriefingRequest, request_id: str) -> BriefingResponse:
         """
-        生成舆情简报
+        生成舆情简报，相同请求在缓存有效期内直接返回缓存结果，并发的相同请求共享同一次生成
+        
+        debug请求跳过缓存，响应中附带各阶段耗时明细
         
         Args:
             request: 简报请求对象
@@ -29,15 +34,29 @@ class BriefingGenerator:
         Raises:
             Exception: 当处理过程中发生错误时
         """
+        debug = self._is_debug(request)
+        with collect_timings(request_id, profile=debug) as timeline:
+            if debug:
+                response = self._generate_briefing(request, request_id)
+            else:
+                key = briefing_cache_service.make_key("summary", request.topic, request.max_articles)
+                response = briefing_cache_service.get_or_compute(key, lambda: self._generate_briefing(request, request_id), request_id,
+                        cacheable=self._is_cacheable)
+        return self._finalize_response(response, request_id, timeline, debug)
+    
+    def _generate_briefing(self, request: BriefingRequest, request_id: str) -> BriefingResponse:
+        """生成舆情简报的内部方法，不经过缓存"""
         logger.info(f"[{request_id}] 收到请求，主题: {request.topic}, 最大文章数: {request.max_articles}")
         start_time = time.time()
         
         try:
             # 步骤一：获取新闻文章
-            articles = self._get_news_articles(request.topic, request.max_articles, request_id)
+            with span("fetch_articles"):
+                articles = self._get_news_articles(request.topic, request.max_articles, request_id)
             
             # 步骤二：生成摘要
-            summary = self._generate_summary(articles, request_id)
+            with span("summarize"):
+                summary = self._generate_summary(articles, request_id)
             
             # 计算处理时间
             total_time = time.time() - start_time
@@ -56,6 +75,78 @@ class BriefingGenerator:
             logger.error(f"[{request_id}] 请求处理异常，总耗时: {total_time:.2f} 秒, 错误: {str(e)}")
             raise
     
+    async def agenerate_briefing(self, request: BriefingRequest, request_id: str) -> BriefingResponse:
+        """
+        异步生成舆情简报，参数和返回值与generate_briefing一致，与其共用简报缓存
+        
+        新闻API和网页爬取使用异步HTTP客户端，摘要模型推理为CPU密集型操作，显式放到线程池中执行
+        
+        Raises:
+            Exception: 当处理过程中发生错误时
+        """
+        debug = self._is_debug(request)
+        with collect_timings(request_id, profile=debug) as timeline:
+            if debug:
+                response = await self._agenerate_briefing(request, request_id)
+            else:
+                key = briefing_cache_service.make_key("summary", request.topic, request.max_articles)
+                response = await briefing_cache_service.aget_or_compute(key, lambda: self._agenerate_briefing(request, request_id), request_id,
+                        cacheable=self._is_cacheable)
+        return self._finalize_response(response, request_id, timeline, debug)
+    
+    @staticmethod
+    def _is_cacheable(response: BriefingResponse) -> bool:
+        """没有文章或摘要为空的降级结果不写入简报缓存"""
+        return response.article_count > 0 and bool(response.summary.strip())
+    
+    @staticmethod
+    def _is_debug(request: BriefingRequest) -> bool:
+        """debug请求会跳过缓存并触发性能剖析，仅在服务端开启DEBUG_REQUESTS_ENABLED时生效"""
+        return request.debug and DEBUG_REQUESTS_ENABLED
+    
+    @staticmethod
+    def _finalize_response(response: BriefingResponse, request_id: str, timeline: StageTimeline, debug: bool) -> BriefingResponse:
+        """复制缓存的响应并填入本次请求ID，debug请求附带各阶段耗时明细"""
+        update = {"request_id": request_id}
+        if debug:
+            update["timings"] = timeline.summary()
+        return response.model_copy(update=update)
+    
+    async def _agenerate_briefing(self, request: BriefingRequest, request_id: str) -> BriefingResponse:
+        """异步生成舆情简报的内部方法，不经过缓存"""
+        logger.info(f"[{request_id}] 收到异步请求，主题: {request.topic}, 最大文章数: {request.max_articles}")
+        start_time = time.time()
+        
+        try:
+            # 步骤一：获取新闻文章
+            try:
+                with span("fetch_articles"):
+                    articles = await self.news_service.aget_articles(request.topic, request.max_articles, request_id)
+            except Exception as e:
+                logger.error(f"[{request_id}] 获取新闻文章失败: {str(e)}")
+                raise
+            
+            # 步骤二：在线程池中生成摘要，不阻塞事件循环
+            with span("summarize"):
+                summary = await asyncio.to_thread(self._generate_summary, articles, request_id)
+            
+            # 计算处理时间
+            total_time = time.time() - start_time
+            logger.info(f"[{request_id}] 异步请求处理完成，总耗时: {total_time:.2f} 秒")
+            
+            # 构建响应
+            return BriefingResponse(
+                request_id=request_id,
+                topic=request.topic,
+                article_count=len(articles),
+                summary=summary,
+                processing_time=f"{total_time:.2f}秒"
+            )
+        except Exception as e:
+            total_time = time.time() - start_time
+            logger.error(f"[{request_id}] 异步请求处理异常，总耗时: {total_time:.2f} 秒, 错误: {str(e)}")
+            raise
+    
     def _get_news_articles(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
         """获取新闻文章的内部方法"""
         try:
@@ -0,0 +1,431 @@
+# 缓存服务 - 提供LLM响应的持久化缓存和简报结果的进程内缓存功能
+
+import asyncio
+import sqlite3
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from core.config import (
+    logger, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES,
+    BRIEFING_CACHE_ENABLED, BRIEFING_CACHE_TTL, BRIEFING_CACHE_MAX_ENTRIES
+)
+from core.db_service import SQLiteConnectionManager
+from core.metrics import metrics_registry
+
+
+class LLMCacheService:
+    """LLM响应缓存服务类，基于SQLite存储，支持TTL过期和LRU淘汰"""
+
+    def __init__(self, db_path: str = None, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        """
+        初始化缓存服务
+
+        Args:
+            db_path: 缓存数据库文件路径，默认使用应用根目录下的llm_cache.db（与articles.db同目录）
+            ttl: 缓存有效期（秒）
+            max_entries: 缓存最大条目数，超出后按最近访问时间淘汰
+        """
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "llm_cache.db")
+
+        self.db_path = db_path
+        self.connections = SQLiteConnectionManager(db_path, initializer=self._init_db)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 条目数在建表时统计一次，之后随写入和删除维护，避免每次写入都执行COUNT(*)
+        self._size = 0
+
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        """创建缓存表，由连接池在首次建立连接时调用"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                created_at REAL,
+                last_accessed REAL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_accessed ON llm_cache (last_accessed)')
+        conn.commit()
+        cursor.execute('SELECT COUNT(*) FROM llm_cache')
+        self._size = cursor.fetchone()[0]
+        logger.info(f"LLM缓存初始化成功，文件路径: {self.db_path}")
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, max_tokens: int, **kwargs) -> str:
+        """
+        根据提示词、模型和生成参数计算缓存键
+
+        Returns:
+            SHA-256十六进制摘要
+        """
+        payload = json.dumps(
+            {
+                "prompt": prompt,
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "kwargs": kwargs
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存，过期条目视为未命中并删除
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应文本，未命中时返回None
+        """
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                now = time.time()
+
+                cursor.execute('SELECT response, created_at FROM llm_cache WHERE key = ?', (key,))
+                row = cursor.fetchone()
+
+                if row and now - row[1] <= self.ttl:
+                    # 命中时刷新访问时间，用于LRU淘汰
+                    cursor.execute('UPDATE llm_cache SET last_accessed = ? WHERE key = ?', (now, key))
+                    conn.commit()
+                    self._record(hit=True)
+                    return row[0]
+
+                if row:
+                    cursor.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                    conn.commit()
+                    self._resize(-cursor.rowcount)
+
+                self._record(hit=False)
+                return None
+        except sqlite3.Error as e:
+            logger.error(f"读取LLM缓存时出错: {str(e)}")
+            self._record(hit=False)
+            return None
+
+    def set(self, key: str, response: str, model: str = None) -> bool:
+        """
+        写入缓存，超出最大条目数时淘汰最久未访问的条目
+
+        Args:
+            key: 缓存键
+            response: 响应文本
+            model: 模型名称，仅用于记录
+
+        Returns:
+            写入是否成功
+        """
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                now = time.time()
+
+                cursor.execute('''
+                    INSERT OR IGNORE INTO llm_cache (key, model, response, created_at, last_accessed)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (key, model, response, now, now))
+                added = cursor.rowcount
+                if not added:
+                    cursor.execute('''
+                        UPDATE llm_cache SET model = ?, response = ?, created_at = ?, last_accessed = ? WHERE key = ?
+                    ''', (model, response, now, now, key))
+
+                # LRU淘汰
+                evicted = 0
+                overflow = self._size + added - self.max_entries
+                if overflow > 0:
+                    cursor.execute('''
+                        DELETE FROM llm_cache WHERE key IN (
+                            SELECT key FROM llm_cache ORDER BY last_accessed ASC LIMIT ?
+                        )
+                    ''', (overflow,))
+                    evicted = cursor.rowcount
+                    logger.info(f"LLM缓存超出上限，淘汰 {evicted} 条")
+
+                conn.commit()
+                self._resize(added - evicted)
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"写入LLM缓存时出错: {str(e)}")
+            return False
+
+    def clear(self) -> None:
+        """清空缓存并重置统计"""
+        try:
+            with self.connections.get_connection() as conn:
+                conn.execute('DELETE FROM llm_cache')
+                conn.commit()
+                with self._lock:
+                    self._size = 0
+        except sqlite3.Error as e:
+            logger.error(f"清空LLM缓存时出错: {str(e)}")
+
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存命中统计
+
+        Returns:
+            包含命中数、未命中数和命中率的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0
+            }
+
+    def _record(self, hit: bool) -> None:
+        """记录一次命中或未命中"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _resize(self, delta: int) -> None:
+        """按写入或删除的行数更新条目数"""
+        with self._lock:
+            self._size = max(0, self._size + delta)
+
+
+class BriefingCacheService:
+    """
+    简报结果缓存服务类：进程内TTL缓存，支持LRU淘汰，并对并发的相同请求进行合并（single-flight）
+
+    同一个键同时只有一次计算在进行，其余请求等待并共享其结果；计算失败时不缓存，异常同样传递给等待的请求
+    """
+
+    def __init__(self, ttl: int = BRIEFING_CACHE_TTL, max_entries: int = BRIEFING_CACHE_MAX_ENTRIES,
+                 enabled: bool = BRIEFING_CACHE_ENABLED):
+        """
+        初始化简报缓存
+
+        Args:
+            ttl: 缓存有效期（秒）
+            max_entries: 缓存最大条目数，超出后按最近访问顺序淘汰
+            enabled: 是否启用缓存和请求合并，关闭时每次都直接计算
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # 异步计算任务的强引用，避免发起请求取消后任务在完成前被回收
+        self._tasks: Set[asyncio.Task] = set()
+
+        # 命中统计，coalesced为等待进行中计算的请求数
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(briefing_type: str, topic: str, max_articles: int) -> str:
+        """
+        根据简报类型、规范化后的主题和文章数计算缓存键
+
+        主题经过NFKC规范化、合并空白并忽略大小写
+        """
+        normalized_topic = " ".join(unicodedata.normalize("NFKC", topic).split()).casefold()
+        return f"{briefing_type}:{max_articles}:{normalized_topic}"
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], request_id: str = "",
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        读取缓存，未命中时计算并缓存；已有相同请求在计算时阻塞等待其结果
+
+        Args:
+            key: 缓存键
+            compute: 计算结果的函数
+            request_id: 请求ID，用于日志追踪
+            cacheable: 判断结果是否可以缓存的函数，返回False时结果仍返回给当前和等待的请求，但不写入缓存
+
+        Returns:
+            缓存或计算得到的结果
+
+        Raises:
+            Exception: 当计算失败时
+        """
+        if not self.enabled:
+            return compute()
+
+        value, future, is_leader = self._acquire(key, request_id)
+        if future is None:
+            return value
+        if not is_leader:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self._release(key, future, error=e)
+            raise
+        self._release(key, future, value=value, cache=cacheable is None or cacheable(value), request_id=request_id)
+        return value
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]], request_id: str = "",
+                              cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        异步读取缓存，未命中时执行协程计算并缓存；已有相同请求在计算时等待其结果，不阻塞事件循环
+
+        与get_or_compute共用缓存和进行中的计算，参数和返回值一致
+        """
+        if not self.enabled:
+            return await compute()
+
+        value, future, is_leader = self._acquire(key, request_id)
+        if future is None:
+            return value
+        # 共享的Future被多个请求等待，某个请求取消（如客户端断开）时不能取消计算或影响其他请求
+        if not is_leader:
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        task = asyncio.ensure_future(self._acompute(key, future, compute, request_id, cacheable))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        return await asyncio.shield(task)
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """移除已完成任务的引用；发起请求已取消时异常已通过共享Future传递，这里取出以免告警"""
+        self._tasks.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _acompute(self, key: str, future: Future, compute: Callable[[], Awaitable[Any]], request_id: str,
+                        cacheable: Optional[Callable[[Any], bool]]) -> Any:
+        """在独立任务中执行计算并结束进行中的计算，发起请求被取消时仍继续为等待的请求计算"""
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._release(key, future, error=e)
+            raise
+        self._release(key, future, value=value, cache=cacheable is None or cacheable(value), request_id=request_id)
+        return value
+
+    def clear(self) -> None:
+        """清空缓存并重置统计，不影响进行中的计算"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.coalesced = 0
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存命中统计
+
+        Returns:
+            包含命中数、未命中数、合并请求数、命中率和当前条目数的字典
+        """
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_ratio": (self.hits + self.coalesced) / total if total else 0.0,
+                "entries": len(self._entries)
+            }
+
+    def _acquire(self, key: str, request_id: str) -> Tuple[Any, Optional[Future], bool]:
+        """
+        查找缓存或进行中的计算
+
+        Returns:
+            (缓存值, 进行中计算的Future, 是否由当前请求负责计算)元组，命中缓存时Future为None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                logger.info(f"[{request_id}] 命中简报缓存: {key}")
+                return entry[1], None, False
+            if entry:
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                logger.info(f"[{request_id}] 相同简报正在生成，等待共享结果: {key}")
+                return None, future, False
+
+            future = Future()
+            self._in_flight[key] = future
+            self.misses += 1
+            return None, future, True
+
+    def _release(self, key: str, future: Future, value: Any = None, error: Optional[BaseException] = None,
+                 cache: bool = True, request_id: str = "") -> None:
+        """结束进行中的计算，成功且结果可缓存时写入缓存，并将结果或异常传递给等待的请求"""
+        if error is None and not cache:
+            logger.warning(f"[{request_id}] 简报结果不完整，不写入缓存: {key}")
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if error is None and cache:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+
+# 创建单例实例，方便其他模块使用
+llm_cache_service = LLMCacheService()
+briefing_cache_service = BriefingCacheService()
+
+
+def _cache_request_samples() -> List[Tuple[Dict[str, str], float]]:
+    """导出两类缓存的命中、未命中和合并请求数"""
+    samples = []
+    for cache_name, service in (("llm", llm_cache_service), ("briefing", briefing_cache_service)):
+        stats = service.get_stats()
+        for result in ("hits", "misses", "coalesced"):
+            if result in stats:
+                samples.append(({"cache": cache_name, "result": result}, stats[result]))
+    return samples
+
+
+def _cache_gauge_samples(key: str) -> List[Tuple[Dict[str, str], float]]:
+    """导出两类缓存统计中的某一项瞬时值"""
+    samples = []
+    for cache_name, service in (("llm", llm_cache_service), ("briefing", briefing_cache_service)):
+        stats = service.get_stats()
+        if key in stats:
+            samples.append(({"cache": cache_name}, stats[key]))
+    return samples
+
+
+metrics_registry.callback("cache_requests_total", "缓存查询次数，result为hits、misses或coalesced", "counter", _cache_request_samples)
+metrics_registry.callback("cache_hit_ratio", "缓存命中率，简报缓存的合并请求计为命中", "gauge", lambda: _cache_gauge_samples("hit_ratio"))
+metrics_registry.callback("cache_entries", "缓存当前条目数", "gauge", lambda: _cache_gauge_samples("entries"))
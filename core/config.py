@@ -2,7 +2,7 @@
 
 import logging
 import os
-from typing import Optional
+from typing import Dict, List, Optional
 
 # 配置日志
 def setup_logger() -> logging.Logger:
@@ -52,4 +52,131 @@ FETCH_FULL_TEXT: bool = False
 # OpenAI接口模型配置
 OPENAI_API_KEY: Optional[str] = "xxx"
 OPENAI_BASE_URL: Optional[str] = "https://api.vveai.com/v1"
-DEFAULT_OPENAI_MODEL: str = "qwen3-32b"
\ No newline at end of file
+DEFAULT_OPENAI_MODEL: str = "qwen3-32b"
+
+# 结构化提取时并发调用LLM的最大线程数，避免超出模型服务的速率限制
+EXTRACTION_MAX_WORKERS: int = 5
+
+# LLM客户端HTTP连接池配置，同步与异步客户端共用
+LLM_MAX_CONNECTIONS: int = 100
+LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+
+# 异步批量调用LLM时的最大并发请求数
+LLM_MAX_CONCURRENCY: int = 10
+
+# LLM响应缓存配置，默认关闭，可在调用时通过use_cache参数单独开启
+LLM_CACHE_ENABLED: bool = False
+LLM_CACHE_TTL: int = 24 * 60 * 60  # 缓存有效期（秒）
+LLM_CACHE_MAX_ENTRIES: int = 10000  # 缓存最大条目数，超出后按LRU淘汰
+
+# 结构化提取时是否将多篇文章打包到同一个提示词中，以及每个提示词的token预算
+EXTRACTION_BATCH_ENABLED: bool = False
+EXTRACTION_BATCH_TOKEN_BUDGET: int = 3000
+
+# SQLite连接配置：锁等待超时（毫秒）、每个连接缓存的预编译语句数和连接池大小
+DB_BUSY_TIMEOUT_MS: int = 5000
+DB_CACHED_STATEMENTS: int = 128
+DB_MAX_QUERY_PARAMS: int = 500  # 批量IN查询每条语句的最大参数数
+DB_POOL_MAX_IDLE: int = 8  # 每个数据库连接池保留的最大空闲连接数
+
+# 是否优先从本地文章库检索文章，数量不足时再调用新闻API；以及本地文章的新鲜度（小时）
+NEWS_LOCAL_FIRST: bool = False
+NEWS_LOCAL_MAX_AGE_HOURS: int = 6
+
+# 批量爬取网页配置
+SPIDER_MAX_WORKERS: int = 10  # 并发爬取线程数
+SPIDER_PER_HOST_LIMIT: int = 2  # 同一主机的最大并发请求数
+SPIDER_BATCH_DEADLINE: float = 15  # 整批爬取的截止时间（秒）
+SPIDER_POOL_MAXSIZE: int = 20  # 每个主机的HTTP连接池大小
+
+# 网页正文提取配置：是否在保存前提取正文，文本块最少字符数与最大链接文本占比
+EXTRACT_FULL_TEXT: bool = True
+EXTRACT_MIN_BLOCK_CHARS: int = 20
+EXTRACT_MAX_LINK_DENSITY: float = 0.5
+
+# 已爬取网页的新鲜期（秒），期内直接使用数据库内容，过期后发送条件请求重新校验
+SPIDER_FRESHNESS_SECONDS: int = 6 * 60 * 60
+# 按域名覆盖新鲜期，子域名同样适用，例如 {"36kr.com": 30 * 60}
+SPIDER_DOMAIN_FRESHNESS: Dict[str, int] = {}
+
+# 分块摘要配置：输入超过SUMMARY_CHUNK_TOKENS时按token分块，批量生成部分摘要后再汇总
+SUMMARY_MAP_REDUCE: bool = True
+SUMMARY_CHUNK_TOKENS: int = 512
+SUMMARY_PARTIAL_MAX_LENGTH: int = 128
+SUMMARY_BATCH_SIZE: int = 8
+SUMMARY_MAX_REDUCE_LEVELS: int = 3
+
+# 是否在应用启动时预加载摘要模型并预热，预热完成前就绪检查返回未就绪
+PRELOAD_MODELS: bool = True
+WARMUP_TEXT: str = "人工智能技术正在快速发展，应用领域越来越广泛。"
+PRELOAD_RETRY_INITIAL_DELAY: float = 5.0  # 预加载失败后首次重试的等待时间（秒），之后按指数退避
+PRELOAD_RETRY_MAX_DELAY: float = 300.0  # 预加载重试的最长等待时间（秒）
+
+# 摘要模型动态微批处理：收集并发请求最多等待的毫秒数，每批最多SUMMARY_BATCH_SIZE条文本
+SUMMARY_MICRO_BATCHING: bool = True
+SUMMARY_BATCH_WAIT_MS: float = 10
+
+# 摘要模型CPU推理后端：eager（默认fp32）、int8（动态量化）、compile（torch.compile）、onnx（ONNX Runtime）
+SUMMARY_BACKEND: str = "eager"
+SUMMARY_USE_FAST_TOKENIZER: bool = False
+SUMMARY_TORCH_THREADS: Optional[int] = None  # PyTorch推理线程数，None时使用默认值
+SUMMARY_ONNX_PATH: str = MODEL_PATH + "-onnx"  # 导出的ONNX模型缓存目录
+
+# 摘要推理进程数：大于0时模型在独立的工作进程中加载和推理，避免阻塞API进程；
+# 多进程时建议将SUMMARY_TORCH_THREADS设为CPU核数除以进程数
+SUMMARY_PROCESS_WORKERS: int = 0
+SUMMARY_PROCESS_TASK_TIMEOUT: float = 300  # 单次推理任务的最长等待时间（秒），超时的任务以异常结束
+SUMMARY_PROCESS_CHECK_INTERVAL: float = 1.0  # 检查工作进程存活的间隔（秒）
+
+# 简报结果缓存：相同主题、文章数和简报类型的请求在有效期内直接返回缓存结果，并发的相同请求共享同一次计算
+BRIEFING_CACHE_ENABLED: bool = True
+BRIEFING_CACHE_TTL: int = 10 * 60  # 缓存有效期（秒）
+BRIEFING_CACHE_MAX_ENTRIES: int = 256  # 缓存最大条目数，超出后按LRU淘汰
+
+# 简报任务队列：后台工作线程数、完成回调的超时时间（秒）和重试次数
+JOB_MAX_WORKERS: int = 4
+JOB_WEBHOOK_TIMEOUT: int = 10
+JOB_WEBHOOK_RETRIES: int = 3
+JOB_WEBHOOK_MAX_WORKERS: int = 2  # 发送完成回调的线程数，与任务线程池分开，慢速回调不占用任务线程
+
+# 完成回调地址限制：只允许http/https；列表非空时只允许列表中的主机，
+# 为空时拒绝解析到内网、回环、链路本地等非公网地址的主机，防止借回调访问内部服务
+JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = []
+
+# 近似重复去重：字符n-gram长度和哈希向量维度
+DEDUP_NGRAM_SIZE: int = 2
+DEDUP_HASH_DIM: int = 4096
+
+# 结构化提取结果的意见去重：余弦相似度不低于阈值的意见合并为一条
+OPINION_DEDUP_ENABLED: bool = True
+OPINION_DEDUP_THRESHOLD: float = 0.6
+
+# 文章级近似重复过滤：标题加描述的MinHash签名估计Jaccard相似度不低于阈值的文章只保留排在最前的一篇
+# LSH将签名分为MINHASH_BANDS段用于快速筛选候选对，签名保存在数据库中供后续请求复用
+ARTICLE_DEDUP_ENABLED: bool = True
+ARTICLE_DEDUP_THRESHOLD: float = 0.5
+MINHASH_NUM_PERM: int = 64
+MINHASH_BANDS: int = 16
+MINHASH_NGRAM_SIZE: int = 3
+
+# 结构化总结提示词的token预算：意见按簇大小排序，超出预算时分块并行总结后再汇总（分层总结），
+# 块数不超过SUMMARY_PROMPT_MAX_CHUNKS，放不下的低显著性意见被舍弃，单条超出预算的意见被截断；
+# 部分总结仍超出预算时继续分层，最多SUMMARY_PROMPT_MAX_LEVELS层，保证最终一次LLM调用的输入有界
+SUMMARY_PROMPT_TOKEN_BUDGET: int = 3000
+SUMMARY_PROMPT_MAX_CHUNKS: int = 4
+SUMMARY_PROMPT_MAX_LEVELS: int = 3
+SUMMARY_PARTIAL_MAX_TOKENS: int = 512  # 分块总结每次调用的最大生成token数
+# 统计提示词token数使用的tokenizer名称或本地路径，应与DEFAULT_OPENAI_MODEL对应；None时按每字符一个token保守估算
+PROMPT_TOKENIZER: Optional[str] = None
+
+# 请求耗时分析：各阶段耗时在请求结束时汇总，总耗时不低于SLOW_REQUEST_LOG_SECONDS时记录各阶段耗时明细
+SLOW_REQUEST_LOG_SECONDS: float = 30
+# 是否接受请求中的debug参数：debug请求跳过简报缓存并触发性能剖析，只应在受控环境中开启
+DEBUG_REQUESTS_ENABLED: bool = False
+# debug请求的性能剖析工具："cprofile"、"pyinstrument"（需要安装pyinstrument）或None（不剖析）
+REQUEST_PROFILER: Optional[str] = None
+PROFILE_OUTPUT_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "profiles")  # 剖析结果保存目录
+
+# 指标导出：开启时记录HTTP请求、处理阶段、LLM调用和缓存指标，并在/metrics以Prometheus文本格式导出
+METRICS_ENABLED: bool = True
+METRICS_LATENCY_BUCKETS: tuple = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # 延迟直方图分桶上界（秒）
@@ -1,11 +1,148 @@
 # 数据库服务 - 提供持久化数据存储功能
 
+import queue
+import re
 import sqlite3
+import threading
 import uuid
 import os
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List
-from core.config import logger
+from typing import Callable, Iterator, Optional, List, Dict
+from core.config import logger, DB_BUSY_TIMEOUT_MS, DB_CACHED_STATEMENTS, DB_MAX_QUERY_PARAMS, DB_POOL_MAX_IDLE
+from core.profiling import span
+
+# 连续的中日韩文字，用于生成二元分词
+_CJK_RUN = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]+')
+
+
+def cjk_bigrams(text: Optional[str]) -> Optional[str]:
+    """
+    将文本中连续的中日韩文字切分为以空格分隔的相邻二字组，其余文本保持不变
+
+    供二元分词索引使用：unicode61分词按空格切分后，每个二字组成为一个词，可直接匹配两个字的主题
+    """
+    if text is None:
+        return None
+    return _CJK_RUN.sub(lambda match: " " + " ".join(
+        match.group()[index:index + 2] for index in range(max(len(match.group()) - 1, 1))
+    ) + " ", text)
+
+
+class SQLiteConnectionManager:
+    """
+    SQLite连接池：连接在线程间共享，使用时借出、用完归还
+
+    空闲连接数不超过max_idle，多余的连接归还时直接关闭，因此连接数只随并发量而不随线程数增长；
+    数据库文件在首次借出连接时才创建，导入模块不会产生文件
+    """
+    
+    def __init__(self, db_path: str, max_idle: int = DB_POOL_MAX_IDLE,
+                 initializer: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        """
+        初始化连接池
+        
+        Args:
+            db_path: 数据库文件路径
+            max_idle: 池中保留的最大空闲连接数
+            initializer: 建表等初始化函数，在首次建立连接时执行一次，失败时下次建立连接再重试
+            on_connect: 每个新连接都执行的设置函数，如注册触发器使用的SQL函数，在initializer之前执行
+        """
+        self.db_path = db_path
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_idle)
+        self._initializer = initializer
+        self._on_connect = on_connect
+        self._initialized = initializer is None
+        self._init_lock = threading.Lock()
+    
+    @contextmanager
+    def get_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        从池中借出一个连接，池为空时新建
+        
+        退出上下文时提交或回滚事务，并将连接归还到池中
+        
+        Yields:
+            数据库连接，只能在上下文内使用
+        """
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._release(conn)
+    
+    def _acquire(self) -> sqlite3.Connection:
+        """取出一个空闲连接，后进先出以复用最近使用过的连接"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+    
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """归还连接，池已满时关闭"""
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """创建新连接并设置PRAGMA"""
+        # 连接会被不同线程先后借用，同一时刻只由一个线程使用
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            cached_statements=DB_CACHED_STATEMENTS,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row  # 使返回的结果可以通过列名访问
+        
+        # WAL模式允许读写并发，NORMAL同步级别在WAL下可保证一致性
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}')
+        conn.execute('PRAGMA foreign_keys=ON')
+        if self._on_connect is not None:
+            self._on_connect(conn)
+        
+        if not self._initialized:
+            try:
+                self._initialize(conn)
+            except BaseException:
+                conn.close()
+                raise
+        return conn
+    
+    def _initialize(self, conn: sqlite3.Connection) -> None:
+        """
+        执行初始化函数，并发建立的连接只有一个执行
+        
+        Raises:
+            sqlite3.Error: 当初始化失败时
+        """
+        with self._init_lock:
+            if self._initialized:
+                return
+            try:
+                with conn:
+                    self._initializer(conn)
+            except sqlite3.Error as e:
+                logger.error(f"数据库初始化失败，文件路径: {self.db_path}, 错误: {str(e)}")
+                raise
+            self._initialized = True
+    
+    def close_all(self) -> None:
+        """关闭池中所有空闲连接，借出中的连接归还后仍可继续使用"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
 
 
 class DatabaseService:
@@ -23,48 +160,231 @@ class DatabaseService:
             db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "articles.db")
         
         self.db_path = db_path
-        self._init_db()
+        self.fts_enabled = False
+        self.bigram_enabled = False
+        self.connections = SQLiteConnectionManager(db_path, initializer=self._init_db, on_connect=self._register_functions)
+    
+    @staticmethod
+    def _register_functions(conn: sqlite3.Connection) -> None:
+        """注册二元分词索引的同步触发器使用的SQL函数，每个连接都需要注册"""
+        conn.create_function("cjk_bigrams", 1, cjk_bigrams, deterministic=True)
+    
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        """创建必要的表结构，由连接池在首次建立连接时调用"""
+        cursor = conn.cursor()
+        
+        # 创建articles表，存储文章的基本信息
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                id TEXT PRIMARY KEY,
+                title TEXT,
+                description TEXT,
+                content TEXT,
+                url TEXT UNIQUE,
+                source TEXT,
+                minhash TEXT,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP
+            )
+        ''')
+        
+        # 创建full_texts表，存储文章的完整网页内容
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS full_texts (
+                id TEXT PRIMARY KEY,
+                article_id TEXT,
+                full_text TEXT,
+                raw_hash TEXT,
+                created_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE
+            )
+        ''')
+        
+        # 创建page_validators表，存储网页的HTTP缓存校验信息
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS page_validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at TIMESTAMP
+            )
+        ''')
+        
+        # 兼容旧表结构：补充原始网页哈希列和文章MinHash签名列
+        cursor.execute('PRAGMA table_info(full_texts)')
+        if 'raw_hash' not in {row['name'] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE full_texts ADD COLUMN raw_hash TEXT')
+        cursor.execute('PRAGMA table_info(articles)')
+        if 'minhash' not in {row['name'] for row in cursor.fetchall()}:
+            cursor.execute('ALTER TABLE articles ADD COLUMN minhash TEXT')
+        
+        # 为url创建索引，提高查询效率
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_url ON articles (url)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_full_texts_article_id ON full_texts (article_id)')
+        
+        # 每篇文章只保留一条完整内容记录，唯一索引供批量upsert使用
+        cursor.execute('''
+            DELETE FROM full_texts WHERE rowid NOT IN (
+                SELECT MAX(rowid) FROM full_texts GROUP BY article_id
+            )
+        ''')
+        cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_full_texts_article_id_unique ON full_texts (article_id)')
+        
+        conn.commit()
+        logger.info(f"数据库初始化成功，文件路径: {self.db_path}")
+        
+        self.fts_enabled = self._init_fts(conn)
+        self.bigram_enabled = self._init_bigram_index(conn)
     
-    def _init_db(self):
-        """初始化数据库，创建必要的表结构"""
+    def _init_fts(self, conn: sqlite3.Connection) -> bool:
+        """
+        创建FTS5全文索引表及同步触发器，首次创建时回填已有文章
+        
+        索引表的rowid与articles表的rowid一一对应，使用trigram分词以支持中文子串检索
+        
+        Returns:
+            全文索引是否可用
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # 创建articles表，存储文章的基本信息
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS articles (
-                        id TEXT PRIMARY KEY,
-                        title TEXT,
-                        description TEXT,
-                        content TEXT,
-                        url TEXT UNIQUE,
-                        source TEXT,
-                        created_at TIMESTAMP,
-                        updated_at TIMESTAMP
-                    )
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'")
+            needs_backfill = cursor.fetchone() is None
+            
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    title, description, content, full_text,
+                    tokenize = 'trigram'
+                )
+            ''')
+            
+            # articles表变更时同步索引
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_fts (rowid, title, description, content, full_text)
+                    VALUES (new.rowid, new.title, new.description, new.content,
+                            (SELECT full_text FROM full_texts WHERE article_id = new.id));
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS articles_fts_update AFTER UPDATE ON articles BEGIN
+                    DELETE FROM articles_fts WHERE rowid = old.rowid;
+                    INSERT INTO articles_fts (rowid, title, description, content, full_text)
+                    VALUES (new.rowid, new.title, new.description, new.content,
+                            (SELECT full_text FROM full_texts WHERE article_id = new.id));
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+                    DELETE FROM articles_fts WHERE rowid = old.rowid;
+                END
+            ''')
+            
+            # full_texts表变更时重建对应文章的索引行
+            for event, article_id in (("INSERT", "new.article_id"), ("UPDATE", "new.article_id"), ("DELETE", "old.article_id")):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS full_texts_fts_{event.lower()} AFTER {event} ON full_texts BEGIN
+                        DELETE FROM articles_fts WHERE rowid = (SELECT rowid FROM articles WHERE id = {article_id});
+                        INSERT INTO articles_fts (rowid, title, description, content, full_text)
+                        SELECT a.rowid, a.title, a.description, a.content, ft.full_text
+                        FROM articles a LEFT JOIN full_texts ft ON a.id = ft.article_id
+                        WHERE a.id = {article_id};
+                    END
                 ''')
-                
-                # 创建full_texts表，存储文章的完整网页内容
+            
+            if needs_backfill:
                 cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS full_texts (
-                        id TEXT PRIMARY KEY,
-                        article_id TEXT,
-                        full_text TEXT,
-                        created_at TIMESTAMP,
-                        updated_at TIMESTAMP,
-                        FOREIGN KEY (article_id) REFERENCES articles (id) ON DELETE CASCADE
-                    )
+                    INSERT INTO articles_fts (rowid, title, description, content, full_text)
+                    SELECT a.rowid, a.title, a.description, a.content, ft.full_text
+                    FROM articles a LEFT JOIN full_texts ft ON a.id = ft.article_id
                 ''')
-                
-                # 为url创建索引，提高查询效率
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_articles_url ON articles (url)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_full_texts_article_id ON full_texts (article_id)')
-                
-                conn.commit()
-                logger.info(f"数据库初始化成功，文件路径: {self.db_path}")
+                logger.info(f"全文索引创建完成，回填 {cursor.rowcount} 篇文章")
+            
+            conn.commit()
+            return True
         except sqlite3.Error as e:
-            logger.error(f"数据库初始化失败: {str(e)}")
+            # 撤销未完成的索引变更，主表结构已在此前提交
+            conn.rollback()
+            logger.warning(f"全文索引不可用，主题搜索将使用LIKE查询: {str(e)}")
+            return False
+    
+    def _init_bigram_index(self, conn: sqlite3.Connection) -> bool:
+        """
+        创建二元分词的FTS5辅助索引表及同步触发器，首次创建时回填已有文章
+        
+        trigram分词无法检索少于3个字符的主题，而中文主题多为两个字；该表存储cjk_bigrams切分后的文本，
+        以unicode61分词，两个字的主题按词匹配，英文等短主题按整词匹配
+        
+        Returns:
+            二元分词索引是否可用
+        """
+        columns = "title, description, content, full_text"
+        
+        def bigram_values(alias: str, full_text: str) -> str:
+            return (f"cjk_bigrams({alias}.title), cjk_bigrams({alias}.description), "
+                    f"cjk_bigrams({alias}.content), cjk_bigrams({full_text})")
+        
+        try:
+            cursor = conn.cursor()
+            
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_bigram'")
+            needs_backfill = cursor.fetchone() is None
+            
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_bigram USING fts5(
+                    {columns},
+                    tokenize = 'unicode61'
+                )
+            ''')
+            
+            # articles表变更时同步索引
+            new_full_text = "(SELECT full_text FROM full_texts WHERE article_id = new.id)"
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS articles_bigram_insert AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_bigram (rowid, {columns})
+                    VALUES (new.rowid, {bigram_values("new", new_full_text)});
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS articles_bigram_update AFTER UPDATE ON articles BEGIN
+                    DELETE FROM articles_bigram WHERE rowid = old.rowid;
+                    INSERT INTO articles_bigram (rowid, {columns})
+                    VALUES (new.rowid, {bigram_values("new", new_full_text)});
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS articles_bigram_delete AFTER DELETE ON articles BEGIN
+                    DELETE FROM articles_bigram WHERE rowid = old.rowid;
+                END
+            ''')
+            
+            # full_texts表变更时重建对应文章的索引行
+            for event, article_id in (("INSERT", "new.article_id"), ("UPDATE", "new.article_id"), ("DELETE", "old.article_id")):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS full_texts_bigram_{event.lower()} AFTER {event} ON full_texts BEGIN
+                        DELETE FROM articles_bigram WHERE rowid = (SELECT rowid FROM articles WHERE id = {article_id});
+                        INSERT INTO articles_bigram (rowid, {columns})
+                        SELECT a.rowid, {bigram_values("a", "ft.full_text")}
+                        FROM articles a LEFT JOIN full_texts ft ON a.id = ft.article_id
+                        WHERE a.id = {article_id};
+                    END
+                ''')
+            
+            if needs_backfill:
+                cursor.execute(f'''
+                    INSERT INTO articles_bigram (rowid, {columns})
+                    SELECT a.rowid, {bigram_values("a", "ft.full_text")}
+                    FROM articles a LEFT JOIN full_texts ft ON a.id = ft.article_id
+                ''')
+                logger.info(f"二元分词索引创建完成，回填 {cursor.rowcount} 篇文章")
+            
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.warning(f"二元分词索引不可用，短主题搜索将使用LIKE查询: {str(e)}")
+            return False
     
     def check_article_exists(self, url: str) -> Optional[dict]:
         """
@@ -80,13 +400,12 @@ class DatabaseService:
             return None
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row  # 使返回的结果可以通过列名访问
+            with self.connections.get_connection() as conn:
                 cursor = conn.cursor()
                 
                 # 查询文章基本信息
                 cursor.execute('''
-                    SELECT a.*, ft.full_text 
+                    SELECT a.*, ft.full_text, ft.raw_hash 
                     FROM articles a 
                     LEFT JOIN full_texts ft ON a.id = ft.article_id 
                     WHERE a.url = ?
@@ -105,6 +424,242 @@ class DatabaseService:
             logger.error(f"检查文章是否存在时出错: {str(e)}")
             return None
     
+    @span("db.get_articles_by_urls")
+    def get_articles_by_urls(self, urls: List[str]) -> Dict[str, dict]:
+        """
+        批量查询多个URL对应的文章
+        
+        Args:
+            urls: 文章URL列表
+            
+        Returns:
+            以URL为键的文章信息字典，不存在的URL不会出现在结果中
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+        
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                articles = {}
+                
+                # 分块查询，避免超出SQLite单条语句的参数数量上限
+                for start in range(0, len(urls), DB_MAX_QUERY_PARAMS):
+                    chunk = urls[start:start + DB_MAX_QUERY_PARAMS]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f'''
+                        SELECT a.*, ft.full_text, ft.raw_hash, ft.updated_at AS full_text_updated_at 
+                        FROM articles a 
+                        LEFT JOIN full_texts ft ON a.id = ft.article_id 
+                        WHERE a.url IN ({placeholders})
+                    ''', chunk)
+                    articles.update((row['url'], dict(row)) for row in cursor.fetchall())
+                
+                logger.info(f"批量查询 {len(urls)} 个URL，找到 {len(articles)} 篇已存在的文章")
+                return articles
+        except sqlite3.Error as e:
+            logger.error(f"批量查询文章时出错: {str(e)}")
+            return {}
+    
+    @span("db.save_articles")
+    def save_articles(self, articles_data: List[dict]) -> bool:
+        """
+        在一个事务中批量保存文章信息，已存在的URL更新，不存在的插入
+        
+        Args:
+            articles_data: 文章信息字典列表，每项需要包含url字段
+            
+        Returns:
+            保存是否成功
+        """
+        articles_data = [article_data for article_data in articles_data if article_data and article_data.get('url')]
+        if not articles_data:
+            return True
+        
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                current_time = datetime.now().isoformat()
+                
+                # 未提供MinHash签名时保留已有签名
+                cursor.executemany('''
+                    INSERT INTO articles (id, title, description, content, url, source, minhash, created_at, updated_at) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET 
+                        title = excluded.title, 
+                        description = excluded.description, 
+                        content = excluded.content, 
+                        source = excluded.source, 
+                        minhash = COALESCE(excluded.minhash, articles.minhash), 
+                        updated_at = excluded.updated_at
+                ''', [
+                    (
+                        str(uuid.uuid4()),
+                        article_data.get('title'),
+                        article_data.get('description'),
+                        article_data.get('content'),
+                        article_data['url'],
+                        article_data.get('source'),
+                        article_data.get('minhash'),
+                        current_time,
+                        current_time
+                    )
+                    for article_data in articles_data
+                ])
+                
+                # 仅保存有完整内容的文章，article_id通过url关联获取
+                cursor.executemany('''
+                    INSERT INTO full_texts (id, article_id, full_text, raw_hash, created_at, updated_at) 
+                    SELECT ?, a.id, ?, ?, ?, ? FROM articles a WHERE a.url = ?
+                    ON CONFLICT(article_id) DO UPDATE SET 
+                        full_text = excluded.full_text, 
+                        raw_hash = excluded.raw_hash, 
+                        updated_at = excluded.updated_at
+                ''', [
+                    (
+                        str(uuid.uuid4()),
+                        article_data['full_text'],
+                        article_data.get('raw_hash'),
+                        current_time,
+                        current_time,
+                        article_data['url']
+                    )
+                    for article_data in articles_data if article_data.get('full_text')
+                ])
+                
+                conn.commit()
+                logger.info(f"成功批量保存 {len(articles_data)} 篇文章")
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"批量保存文章时出错: {str(e)}")
+            return False
+    
+    @span("db.get_page_validators")
+    def get_page_validators(self, urls: List[str]) -> Dict[str, dict]:
+        """
+        批量查询网页的HTTP缓存校验信息
+        
+        Args:
+            urls: 网页URL列表
+            
+        Returns:
+            以URL为键的校验信息字典，包含etag、last_modified和checked_at字段
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+        
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                validators = {}
+                
+                for start in range(0, len(urls), DB_MAX_QUERY_PARAMS):
+                    chunk = urls[start:start + DB_MAX_QUERY_PARAMS]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f'SELECT * FROM page_validators WHERE url IN ({placeholders})', chunk)
+                    validators.update((row['url'], dict(row)) for row in cursor.fetchall())
+                
+                return validators
+        except sqlite3.Error as e:
+            logger.error(f"查询网页校验信息时出错: {str(e)}")
+            return {}
+    
+    @span("db.save_page_validators")
+    def save_page_validators(self, validators: List[dict]) -> bool:
+        """
+        批量保存网页的HTTP缓存校验信息，校验时间记为当前时间
+        
+        Args:
+            validators: 校验信息列表，每项包含url、etag、last_modified字段
+            
+        Returns:
+            保存是否成功
+        """
+        validators = [validator for validator in validators if validator.get('url')]
+        if not validators:
+            return True
+        
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                current_time = datetime.now().isoformat()
+                
+                cursor.executemany('''
+                    INSERT INTO page_validators (url, etag, last_modified, checked_at) 
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(url) DO UPDATE SET 
+                        etag = excluded.etag, 
+                        last_modified = excluded.last_modified, 
+                        checked_at = excluded.checked_at
+                ''', [
+                    (validator['url'], validator.get('etag'), validator.get('last_modified'), current_time)
+                    for validator in validators
+                ])
+                
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"保存网页校验信息时出错: {str(e)}")
+            return False
+    
+    @span("db.get_article_signatures")
+    def get_article_signatures(self, urls: List[str]) -> Dict[str, dict]:
+        """
+        批量查询文章的MinHash签名及计算签名所用的标题和描述
+        
+        Args:
+            urls: 文章URL列表
+            
+        Returns:
+            以URL为键的字典，包含title、description和minhash字段，不存在的URL不会出现在结果中
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+        
+        try:
+            with self.connections.get_connection() as conn:
+                cursor = conn.cursor()
+                signatures = {}
+                
+                for start in range(0, len(urls), DB_MAX_QUERY_PARAMS):
+                    chunk = urls[start:start + DB_MAX_QUERY_PARAMS]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f'SELECT url, title, description, minhash FROM articles WHERE url IN ({placeholders})', chunk)
+                    signatures.update((row['url'], dict(row)) for row in cursor.fetchall())
+                
+                return signatures
+        except sqlite3.Error as e:
+            logger.error(f"查询文章签名时出错: {str(e)}")
+            return {}
+    
+    @span("db.save_article_signatures")
+    def save_article_signatures(self, signatures: Dict[str, str]) -> bool:
+        """
+        批量更新已存在文章的MinHash签名，不存在的URL忽略
+        
+        Args:
+            signatures: 以URL为键、十六进制签名为值的字典
+            
+        Returns:
+            保存是否成功
+        """
+        if not signatures:
+            return True
+        
+        try:
+            with self.connections.get_connection() as conn:
+                conn.executemany('UPDATE articles SET minhash = ? WHERE url = ?', [
+                    (signature, url) for url, signature in signatures.items()
+                ])
+                conn.commit()
+                return True
+        except sqlite3.Error as e:
+            logger.error(f"保存文章签名时出错: {str(e)}")
+            return False
+    
     def save_article(self, article_data: dict) -> bool:
         """
         保存文章信息到数据库
@@ -120,12 +675,13 @@ class DatabaseService:
             return False
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.get_connection() as conn:
                 cursor = conn.cursor()
                 current_time = datetime.now().isoformat()
                 
-                # 检查文章是否已存在
-                existing_article = self.check_article_exists(article_data['url'])
+                # 检查文章是否已存在（复用当前连接，避免嵌套事务）
+                cursor.execute('SELECT id FROM articles WHERE url = ?', (article_data['url'],))
+                existing_article = cursor.fetchone()
                 
                 if existing_article:
                     # 文章已存在，更新信息
@@ -154,21 +710,23 @@ class DatabaseService:
                         if full_text_record:
                             cursor.execute('''
                                 UPDATE full_texts 
-                                SET full_text = ?, updated_at = ? 
+                                SET full_text = ?, raw_hash = ?, updated_at = ? 
                                 WHERE article_id = ?
                             ''', (
                                 article_data['full_text'],
+                                article_data.get('raw_hash'),
                                 current_time,
                                 article_id
                             ))
                         else:
                             cursor.execute('''
-                                INSERT INTO full_texts (id, article_id, full_text, created_at, updated_at) 
-                                VALUES (?, ?, ?, ?, ?)
+                                INSERT INTO full_texts (id, article_id, full_text, raw_hash, created_at, updated_at) 
+                                VALUES (?, ?, ?, ?, ?, ?)
                             ''', (
                                 str(uuid.uuid4()),
                                 article_id,
                                 article_data['full_text'],
+                                article_data.get('raw_hash'),
                                 current_time,
                                 current_time
                             ))
@@ -194,12 +752,13 @@ class DatabaseService:
                     # 插入full_texts表（如果有full_text）
                     if 'full_text' in article_data and article_data['full_text']:
                         cursor.execute('''
-                            INSERT INTO full_texts (id, article_id, full_text, created_at, updated_at) 
-                            VALUES (?, ?, ?, ?, ?)
+                            INSERT INTO full_texts (id, article_id, full_text, raw_hash, created_at, updated_at) 
+                            VALUES (?, ?, ?, ?, ?, ?)
                         ''', (
                             str(uuid.uuid4()),
                             article_id,
                             article_data['full_text'],
+                            article_data.get('raw_hash'),
                             current_time,
                             current_time
                         ))
@@ -211,13 +770,15 @@ class DatabaseService:
             logger.error(f"保存文章时出错: {str(e)}")
             return False
     
-    def save_full_text(self, url: str, full_text: str) -> bool:
+    @span("db.save_full_text")
+    def save_full_text(self, url: str, full_text: str, raw_hash: Optional[str] = None) -> bool:
         """
         保存文章的完整网页内容
         
         Args:
             url: 文章URL
             full_text: 完整网页内容
+            raw_hash: 原始网页哈希，可选
             
         Returns:
             保存是否成功
@@ -227,7 +788,7 @@ class DatabaseService:
             return False
         
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connections.get_connection() as conn:
                 cursor = conn.cursor()
                 current_time = datetime.now().isoformat()
                 
@@ -246,22 +807,24 @@ class DatabaseService:
                         # 更新现有记录
                         cursor.execute('''
                             UPDATE full_texts 
-                            SET full_text = ?, updated_at = ? 
+                            SET full_text = ?, raw_hash = ?, updated_at = ? 
                             WHERE article_id = ?
                         ''', (
                             full_text,
+                            raw_hash,
                             current_time,
                             article_id
                         ))
                     else:
                         # 创建新记录
                         cursor.execute('''
-                            INSERT INTO full_texts (id, article_id, full_text, created_at, updated_at) 
-                            VALUES (?, ?, ?, ?, ?)
+                            INSERT INTO full_texts (id, article_id, full_text, raw_hash, created_at, updated_at) 
+                            VALUES (?, ?, ?, ?, ?, ?)
                         ''', (
                             str(uuid.uuid4()),
                             article_id,
                             full_text,
+                            raw_hash,
                             current_time,
                             current_time
                         ))
@@ -276,34 +839,73 @@ class DatabaseService:
             logger.error(f"保存网页内容时出错: {str(e)}")
             return False
     
-    def get_articles_by_topic(self, topic: str, limit: int = 10) -> List[dict]:
+    @span("db.get_articles_by_topic")
+    def get_articles_by_topic(self, topic: str, limit: int = 10, updated_after: Optional[str] = None) -> List[dict]:
         """
         根据主题搜索文章
         
+        优先使用FTS5全文索引按bm25相关度排序；主题少于3个字符（trigram分词无法匹配）时使用二元分词索引，
+        两个字的中文主题按二字组匹配、英文等短主题按整词匹配；单个汉字的主题或索引不可用时，
+        回退为LIKE模糊查询并按更新时间排序
+        
         Args:
             topic: 搜索主题
             limit: 返回的文章数量上限
+            updated_after: ISO格式时间，仅返回在此之后更新过的文章，默认不限制
             
         Returns:
             文章信息列表
         """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.connections.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # 在标题、描述和内容中搜索包含主题的文章
-                query = '''
-                    SELECT a.*, ft.full_text 
-                    FROM articles a 
-                    LEFT JOIN full_texts ft ON a.id = ft.article_id 
-                    WHERE a.title LIKE ? OR a.description LIKE ? OR a.content LIKE ?
-                    ORDER BY a.updated_at DESC
-                    LIMIT ?
-                '''
-                
-                search_pattern = f'%{topic}%'
-                cursor.execute(query, (search_pattern, search_pattern, search_pattern, limit))
+                topic = topic.strip()
+                # 单个汉字无法由二字组匹配，仍使用LIKE查询
+                bigram_terms = cjk_bigrams(topic).split()
+                use_bigram = self.bigram_enabled and bool(bigram_terms) and not any(
+                    len(term) == 1 and _CJK_RUN.fullmatch(term) for term in bigram_terms)
+                if self.fts_enabled and len(topic) >= 3:
+                    # 将主题作为短语检索，trigram分词下等价于子串匹配
+                    # bm25权重依次对应title、description、content、full_text
+                    query = '''
+                        SELECT a.*, ft.full_text, ft.raw_hash 
+                        FROM articles_fts 
+                        JOIN articles a ON a.rowid = articles_fts.rowid 
+                        LEFT JOIN full_texts ft ON a.id = ft.article_id 
+                        WHERE articles_fts MATCH ? AND (? IS NULL OR a.updated_at >= ?)
+                        ORDER BY bm25(articles_fts, 10.0, 5.0, 2.0, 1.0)
+                        LIMIT ?
+                    '''
+                    match_expression = '"' + topic.replace('"', '""') + '"'
+                    cursor.execute(query, (match_expression, updated_after, updated_after, limit))
+                elif use_bigram:
+                    # 短主题在二元分词索引中按短语检索，权重与全文索引一致
+                    query = '''
+                        SELECT a.*, ft.full_text, ft.raw_hash 
+                        FROM articles_bigram 
+                        JOIN articles a ON a.rowid = articles_bigram.rowid 
+                        LEFT JOIN full_texts ft ON a.id = ft.article_id 
+                        WHERE articles_bigram MATCH ? AND (? IS NULL OR a.updated_at >= ?)
+                        ORDER BY bm25(articles_bigram, 10.0, 5.0, 2.0, 1.0)
+                        LIMIT ?
+                    '''
+                    match_expression = '"' + " ".join(bigram_terms).replace('"', '""') + '"'
+                    cursor.execute(query, (match_expression, updated_after, updated_after, limit))
+                else:
+                    # 在标题、描述、内容和完整内容中搜索包含主题的文章
+                    query = '''
+                        SELECT a.*, ft.full_text, ft.raw_hash 
+                        FROM articles a 
+                        LEFT JOIN full_texts ft ON a.id = ft.article_id 
+                        WHERE (a.title LIKE ? OR a.description LIKE ? OR a.content LIKE ? OR ft.full_text LIKE ?)
+                            AND (? IS NULL OR a.updated_at >= ?)
+                        ORDER BY a.updated_at DESC
+                        LIMIT ?
+                    '''
+                    search_pattern = f'%{topic}%'
+                    cursor.execute(query, (search_pattern, search_pattern, search_pattern, search_pattern,
+                                           updated_after, updated_after, limit))
                 
                 results = cursor.fetchall()
                 articles = [dict(row) for row in results]
@@ -313,6 +915,10 @@ class DatabaseService:
         except sqlite3.Error as e:
             logger.error(f"搜索文章时出错: {str(e)}")
             return []
+    
+    def close(self) -> None:
+        """关闭所有数据库连接"""
+        self.connections.close_all()
 
 
 # 创建单例实例，方便其他模块使用
@@ -0,0 +1,219 @@
+# 指标服务 - 进程内的轻量指标注册表，以Prometheus文本格式导出吞吐量、延迟和资源使用指标
+
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+from core.config import METRICS_LATENCY_BUCKETS
+
+# 指标样本：(指标名, 标签字典, 数值)
+Sample = Tuple[str, Dict[str, str], float]
+
+
+class _Metric(ABC):
+    """带标签指标的基类，每个标签组合对应一个时间序列"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        """
+        将标签字典转换为时间序列的键
+
+        Raises:
+            ValueError: 当标签名与定义不一致时
+        """
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Sample]:
+        """逐个产出(指标名, 标签字典, 数值)样本，供导出为Prometheus文本格式"""
+
+
+class Counter(_Metric):
+    """单调递增的计数器"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    """固定分桶的直方图，记录各桶计数、总和与样本数"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = METRICS_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # 落在所有上界之外的样本只计入+Inf桶，即count
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, count
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class CallbackMetric(_Metric):
+    """导出时通过回调函数读取的指标，用于暴露其他服务已有的统计数据"""
+
+    def __init__(self, name: str, documentation: str, type_name: str,
+                 callback: Callable[[], List[Tuple[Dict[str, str], float]]]):
+        super().__init__(name, documentation)
+        self.type_name = type_name
+        self.callback = callback
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self.callback():
+            yield self.name, labels, value
+
+
+class MetricsRegistry:
+    """
+    指标注册表，同名指标只注册一次
+
+    数据保存在当前进程内，多工作进程部署时每个进程单独导出
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = METRICS_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, type_name: str,
+                 callback: Callable[[], List[Tuple[Dict[str, str], float]]]) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, type_name, callback))
+
+    def render(self) -> str:
+        """以Prometheus文本格式（0.0.4）导出所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{label}="{_escape_label(label_value)}"' for label, label_value in labels.items())
+                    lines.append(f"{name}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+
+def _escape_label(value: str) -> str:
+    """转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """格式化样本数值，整数不带小数部分"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# 创建单例实例供其他模块使用
+metrics_registry = MetricsRegistry()
+
+# HTTP请求指标，route为路由模板，避免路径参数导致时间序列过多
+http_requests = metrics_registry.counter(
+    "http_requests_total", "HTTP请求总数", ("method", "route", "status"))
+http_requests_in_flight = metrics_registry.gauge(
+    "http_requests_in_flight", "正在处理的HTTP请求数", ("route",))
+http_request_duration = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP请求处理耗时（秒），流式响应包含全部响应体的发送时间", ("method", "route"))
+
+# 处理阶段耗时，stage与core.profiling.span的名称一致，如news.api、db.save_articles、llm.generate、summarizer.inference
+stage_duration = metrics_registry.histogram(
+    "briefing_stage_duration_seconds", "简报处理各阶段耗时（秒）", ("stage",))
+
+# LLM调用指标，status为success、error或cache_hit；token数来自响应的usage字段
+llm_calls = metrics_registry.counter(
+    "llm_calls_total", "LLM调用次数", ("model", "status"))
+llm_tokens = metrics_registry.counter(
+    "llm_tokens_total", "LLM消耗的token数", ("model", "type"))
@@ -1,13 +1,15 @@
 # 数据模型文件 - 定义请求和响应的数据结构
 
-from pydantic import BaseModel
-from typing import Optional, List
+import asyncio
+from pydantic import BaseModel, HttpUrl
+from typing import Any, Dict, Literal, Optional, List, Tuple
 from services.spider_service import spider_service
 
 class BriefingRequest(BaseModel):
     """舆情简报请求模型"""
     topic: str
     max_articles: int = 5  # 默认获取5篇文章
+    debug: bool = False  # 为True且服务端开启DEBUG_REQUESTS_ENABLED时跳过简报缓存，在响应中返回各阶段耗时明细，并按REQUEST_PROFILER配置剖析本次请求
 
 class ArticleModel(BaseModel):
     """新闻文章模型"""
@@ -16,47 +18,172 @@ class ArticleModel(BaseModel):
     content: Optional[str] = None
     url: Optional[str] = None
     source: Optional[str] = None
-    full_text: Optional[str] = None  # 根据url获取的完整网页内容
+    full_text: Optional[str] = None  # 根据url获取的网页正文内容
+    raw_hash: Optional[str] = None  # 原始网页的紧凑哈希
+    minhash: Optional[str] = None  # 标题和描述的MinHash签名（十六进制），用于近似重复过滤
     
     def fetch_full_text(self, request_id: str = "") -> None:
         """
         根据url字段获取完整网页内容并填充到full_text字段
-        优先从数据库获取，数据库不存在时调用爬虫服务获取
+        优先从数据库获取，数据库不存在或已过新鲜期时调用爬虫服务获取
         
         Args:
             request_id: 请求ID，用于日志追踪
         """
         if self.url:
-            try:
-                # 先从数据库检查是否已存在该文章
-                from core.db_service import db_service
-                existing_article = db_service.check_article_exists(self.url)
+            ArticleModel.fetch_full_texts([self], request_id)
+    
+    def set_page(self, html: Optional[str], request_id: str = "") -> None:
+        """
+        根据爬取的原始网页设置full_text和raw_hash
+        开启EXTRACT_FULL_TEXT时full_text为提取后的正文，否则为原始网页
+        
+        Args:
+            html: 原始网页内容，为空时清空full_text
+            request_id: 请求ID，用于日志追踪
+        """
+        from core.config import EXTRACT_FULL_TEXT
+        from services.extract_service import extract_service
+        
+        if not html:
+            self.full_text = None
+            return
+        
+        self.raw_hash = extract_service.hash_page(html)
+        self.full_text = extract_service.extract_text(html, request_id) if EXTRACT_FULL_TEXT else html
+    
+    @staticmethod
+    def fetch_full_texts(articles: List["ArticleModel"], request_id: str = "") -> None:
+        """
+        批量填充多篇文章的full_text字段
+        
+        一次批量查询数据库：新鲜期内的内容直接使用；过期的内容携带ETag/Last-Modified发送条件请求，
+        返回304时继续使用数据库内容；缺少内容的文章正常爬取。爬取和校验结果最后一次性批量保存
+        
+        Args:
+            articles: 文章模型列表
+            request_id: 请求ID，用于日志追踪
+        """
+        from core.config import logger
+        
+        try:
+            pending_articles, revalidate = ArticleModel._plan_full_text_fetch(articles, request_id)
+            
+            # 调用爬虫服务并发获取，截止时间内未完成或失败的保持原有内容
+            pages = spider_service.fetch_pages([article.url for article in pending_articles], request_id, validators=revalidate)
+            ArticleModel._apply_fetched_pages(pending_articles, pages, request_id)
+        except Exception as e:
+            # 在出错情况下，保持已填充的内容，不抛出异常
+            logger.error(f"[{request_id}] 批量获取网页内容失败: {str(e)}")
+    
+    @staticmethod
+    async def afetch_full_texts(articles: List["ArticleModel"], request_id: str = "") -> None:
+        """
+        异步批量填充多篇文章的full_text字段，逻辑与fetch_full_texts一致
+        
+        网页通过异步HTTP客户端获取，数据库读写和正文提取在线程池中执行，不阻塞事件循环
+        
+        Args:
+            articles: 文章模型列表
+            request_id: 请求ID，用于日志追踪
+        """
+        from core.config import logger
+        
+        try:
+            pending_articles, revalidate = await asyncio.to_thread(ArticleModel._plan_full_text_fetch, articles, request_id)
+            pages = await spider_service.afetch_pages([article.url for article in pending_articles], request_id, validators=revalidate)
+            await asyncio.to_thread(ArticleModel._apply_fetched_pages, pending_articles, pages, request_id)
+        except Exception as e:
+            # 在出错情况下，保持已填充的内容，不抛出异常
+            logger.error(f"[{request_id}] 异步批量获取网页内容失败: {str(e)}")
+    
+    @staticmethod
+    def _plan_full_text_fetch(articles: List["ArticleModel"], request_id: str) -> Tuple[List["ArticleModel"], Dict[str, dict]]:
+        """
+        批量查询数据库，填充已有内容并确定需要爬取的文章
+        
+        Returns:
+            (需要爬取的文章列表, 以URL为键的条件请求校验信息)元组
+        """
+        from core.db_service import db_service
+        from core.config import logger
+        
+        urls = [article.url for article in articles if article.url]
+        existing_articles = db_service.get_articles_by_urls(urls)
+        validators = db_service.get_page_validators(urls)
+        
+        pending_articles = []
+        revalidate = {}
+        for article in articles:
+            if not article.url:
+                continue
+            
+            existing_article = existing_articles.get(article.url)
+            if existing_article and existing_article.get('full_text'):
+                # 数据库中已存在完整内容，先使用数据库内容
+                article.full_text = existing_article['full_text']
+                article.raw_hash = existing_article.get('raw_hash')
                 
-                if existing_article and 'full_text' in existing_article and existing_article['full_text']:
-                    # 数据库中已存在完整内容，直接使用
-                    self.full_text = existing_article['full_text']
-                    from core.config import logger
-                    logger.info(f"[{request_id}] 从数据库获取文章内容，URL: {self.url}")
-                else:
-                    # 数据库中不存在或没有完整内容，调用爬虫服务获取
-                    self.full_text = spider_service.get_page_content(self.url, request_id)
-                    
-                    # 获取成功后保存到数据库
-                    if self.full_text:
-                        # 准备文章数据
-                        article_data = {
-                            'title': self.title,
-                            'description': self.description,
-                            'content': self.content,
-                            'url': self.url,
-                            'source': self.source,
-                            'full_text': self.full_text
-                        }
-                        db_service.save_article(article_data)
-            except Exception as e:
-                # 在出错情况下，保持full_text为None，不抛出异常
-                from core.config import logger
-                logger.error(f"[{request_id}] 获取网页内容失败: {str(e)}, URL: {self.url}")
+                validator = validators.get(article.url)
+                # 没有校验信息的旧数据以完整内容的更新时间作为上次校验时间
+                checked = validator or {'checked_at': existing_article.get('full_text_updated_at')}
+                if spider_service.is_fresh(article.url, checked):
+                    logger.info(f"[{request_id}] 从数据库获取文章内容，URL: {article.url}")
+                    continue
+                
+                # 超过新鲜期，使用条件请求重新校验
+                if validator:
+                    revalidate[article.url] = validator
+            
+            pending_articles.append(article)
+        
+        return pending_articles, revalidate
+    
+    @staticmethod
+    def _apply_fetched_pages(pending_articles: List["ArticleModel"], pages: Dict[str, Optional[dict]], request_id: str) -> None:
+        """提取爬取结果的正文填充到文章，并将内容和校验信息批量保存到数据库"""
+        from core.db_service import db_service
+        from core.config import logger
+        
+        fetched_articles = []
+        checked_pages = []
+        for article in pending_articles:
+            page = pages.get(article.url)
+            if not page:
+                continue
+            
+            checked_pages.append({'url': article.url, 'etag': page['etag'], 'last_modified': page['last_modified']})
+            if page['status'] == 304:
+                logger.info(f"[{request_id}] 网页未修改，沿用数据库内容，URL: {article.url}")
+                continue
+            
+            article.set_page(page['content'], request_id)
+            if article.full_text:
+                fetched_articles.append(article)
+        
+        # 获取成功的文章及校验信息批量保存到数据库
+        if fetched_articles:
+            db_service.save_articles([article.model_dump() for article in fetched_articles])
+        if checked_pages:
+            db_service.save_page_validators(checked_pages)
+
+class JobRequest(BriefingRequest):
+    """简报任务请求模型"""
+    type: Literal["structured", "summary"] = "structured"  # 简报类型：结构化简报或摘要简报
+    webhook_url: Optional[HttpUrl] = None  # 任务完成后以POST方式回调的地址，只允许http/https
+
+class JobResponse(BaseModel):
+    """简报任务状态响应模型"""
+    job_id: str
+    type: str
+    topic: str
+    max_articles: int
+    status: str  # queued、running、succeeded、failed
+    partial: Dict[str, Any] = {}  # 运行中的部分结果
+    result: Optional[Dict[str, Any]] = None  # 成功时的简报结果
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
 
 class BriefingResponse(BaseModel):
     """舆情简报响应模型"""
@@ -65,6 +192,7 @@ class BriefingResponse(BaseModel):
     article_count: int
     summary: str
     processing_time: str
+    timings: Optional[Dict[str, Dict[str, float]]] = None  # 各阶段耗时明细，仅debug请求返回
 
 class StructuredBriefingResponse(BaseModel):
     """结构化舆情简报响应模型"""
@@ -74,4 +202,5 @@ class StructuredBriefingResponse(BaseModel):
     positive_opinion: str = ""  # 正面意见总结
     negative_concern: str = ""  # 负面关切总结
     constructive_suggestion: str = ""  # 建设性建议总结
-    processing_time: str
\ No newline at end of file
+    processing_time: str
+    timings: Optional[Dict[str, Dict[str, float]]] = None  # 各阶段耗时明细，仅debug请求返回
@@ -0,0 +1,163 @@
+# 性能分析工具 - 提供请求内各阶段的耗时统计和按请求触发的性能剖析
+
+import contextvars
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+from core.config import logger, SLOW_REQUEST_LOG_SECONDS, REQUEST_PROFILER, PROFILE_OUTPUT_DIR, METRICS_ENABLED
+from core.metrics import stage_duration
+
+# 当前请求的阶段耗时记录，asyncio任务和asyncio.to_thread会自动继承，线程池需通过propagate_context传递
+_current_timeline: contextvars.ContextVar[Optional["StageTimeline"]] = contextvars.ContextVar("stage_timeline", default=None)
+
+
+class StageTimeline:
+    """单个请求的阶段耗时记录，同一阶段多次执行时累计次数、总耗时和最大耗时"""
+
+    def __init__(self):
+        self._stages: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        """记录一次阶段耗时"""
+        with self._lock:
+            stats = self._stages.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        获取各阶段耗时明细
+
+        Returns:
+            以阶段名为键的字典，值包含count、total_ms和max_ms；并发执行的阶段耗时相互重叠，总和可能超过请求总耗时
+        """
+        with self._lock:
+            return {
+                name: {"count": count, "total_ms": round(total * 1000, 2), "max_ms": round(peak * 1000, 2)}
+                for name, (count, total, peak) in self._stages.items()
+            }
+
+    def format(self) -> str:
+        """将耗时明细格式化为单行文本，用于日志"""
+        return ", ".join(
+            f"{name}={stats['count']}次/{stats['total_ms']:.0f}ms" for name, stats in self.summary().items()
+        )
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    记录代码块耗时：开启METRICS_ENABLED时计入阶段耗时指标，在collect_timings范围内时同时记录到当前请求
+
+    也可作为同步函数的装饰器使用；异步函数需在函数体内使用with span(...)
+    """
+    timeline = _current_timeline.get()
+    if timeline is None and not METRICS_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timeline is not None:
+            timeline.record(name, elapsed)
+        if METRICS_ENABLED:
+            stage_duration.observe(elapsed, stage=name)
+
+
+def propagate_context(fn: Callable) -> Callable:
+    """包装提交到线程池的函数，使其在提交时的上下文中执行，阶段耗时记录到同一请求"""
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        # 同一个Context不能在多个线程中同时进入，每次调用使用独立副本
+        return context.copy().run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def collect_timings(request_id: str, profile: bool = False) -> Iterator[StageTimeline]:
+    """
+    在代码块范围内收集阶段耗时，结束时记录total阶段，总耗时超过SLOW_REQUEST_LOG_SECONDS时输出明细日志
+
+    Args:
+        request_id: 请求ID，用于日志追踪和剖析结果文件名
+        profile: 是否使用REQUEST_PROFILER配置的工具剖析本次请求
+
+    Yields:
+        本次请求的阶段耗时记录
+    """
+    timeline = StageTimeline()
+    token = _current_timeline.set(timeline)
+    profiler = _start_profiler(request_id) if profile else None
+    start = time.perf_counter()
+
+    try:
+        yield timeline
+    finally:
+        elapsed = time.perf_counter() - start
+        timeline.record("total", elapsed)
+        _current_timeline.reset(token)
+
+        if profiler is not None:
+            _save_profile(profiler, request_id)
+        if elapsed >= SLOW_REQUEST_LOG_SECONDS:
+            logger.warning(f"[{request_id}] 慢请求，总耗时 {elapsed:.2f} 秒，各阶段耗时: {timeline.format()}")
+
+
+def _start_profiler(request_id: str):
+    """
+    按REQUEST_PROFILER启动剖析器，未配置或启动失败时返回None
+
+    cProfile只剖析当前线程，异步请求会同时记录同一事件循环上其他请求的调用；
+    pyinstrument以async_mode剖析时只记录当前任务
+    """
+    if REQUEST_PROFILER == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning(f"[{request_id}] pyinstrument未安装，跳过性能剖析")
+            return None
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        return profiler
+
+    if REQUEST_PROFILER == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # 同一线程中已有其他剖析器在运行
+            logger.warning(f"[{request_id}] 启动cProfile失败，跳过性能剖析: {str(e)}")
+            return None
+        return profiler
+
+    if REQUEST_PROFILER:
+        logger.warning(f"[{request_id}] 未知的性能剖析工具: {REQUEST_PROFILER}")
+    return None
+
+
+def _save_profile(profiler, request_id: str) -> None:
+    """停止剖析器并保存结果：cProfile保存为.prof文件，pyinstrument保存为HTML报告"""
+    try:
+        os.makedirs(PROFILE_OUTPUT_DIR, exist_ok=True)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.disable()
+            path = os.path.join(PROFILE_OUTPUT_DIR, f"{request_id}.prof")
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = os.path.join(PROFILE_OUTPUT_DIR, f"{request_id}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        logger.info(f"[{request_id}] 性能剖析结果已保存: {path}")
+    except Exception as e:
+        logger.error(f"[{request_id}] 保存性能剖析结果失败: {str(e)}")
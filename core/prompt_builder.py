@@ -0,0 +1,115 @@
+# 提示词构建工具 - 负责统计提示词token数，并将按显著性排序的条目装入token预算
+
+import threading
+from typing import List, Optional
+from core.config import logger, PROMPT_TOKENIZER
+
+
+class PromptBuilder:
+    """提示词构建类，使用LLM对应的tokenizer统计token数，tokenizer不可用时按字符数保守估算"""
+
+    def __init__(self, tokenizer_path: Optional[str] = PROMPT_TOKENIZER):
+        """
+        初始化提示词构建工具，tokenizer在首次统计时加载
+
+        Args:
+            tokenizer_path: tokenizer名称或本地路径，None时按每字符一个token估算
+        """
+        self.tokenizer_path = tokenizer_path
+        self.tokenizer = None
+        self._tokenizer_loaded = False
+        self._lock = threading.Lock()
+
+    def count_tokens(self, text: str) -> int:
+        """统计文本token数，未配置或加载tokenizer失败时按每字符一个token计，对中文偏保守"""
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return len(text)
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """将文本截断到不超过max_tokens个token，token的统计方式与count_tokens一致"""
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return text[:max(max_tokens, 0)]
+        token_ids = tokenizer.encode(text, add_special_tokens=False)
+        return tokenizer.decode(token_ids[:max(max_tokens, 0)], skip_special_tokens=True)
+
+    def pack(self, sections: List[List[str]], overhead_tokens: int, budget: int,
+             max_chunks: int, request_id: str = "") -> List[List[List[str]]]:
+        """
+        将多个分区的条目装入若干个不超过token预算的块
+
+        各分区内的条目已按显著性从高到低排序，装箱时按名次轮流从各分区取条目，
+        使每个分区都优先保留最显著的条目；块数达到max_chunks后放不下的条目被舍弃，
+        单个超出预算的条目被截断到独占一个块时恰好放得下
+
+        Args:
+            sections: 分区列表，每个分区为按显著性排序的条目列表
+            overhead_tokens: 每个块的固定开销，即不含条目的提示词token数
+            budget: 每个块的token预算
+            max_chunks: 最大块数
+            request_id: 请求ID，用于日志追踪
+
+        Returns:
+            块列表，每个块与sections结构相同，每个块都不超过预算
+        """
+        order = [
+            (position, items[rank])
+            for rank in range(max((len(items) for items in sections), default=0))
+            for position, items in enumerate(sections)
+            if rank < len(items)
+        ]
+
+        chunks = []
+        current = [[] for _ in sections]
+        current_tokens = overhead_tokens
+        dropped = 0
+        truncated = 0
+        item_budget = budget - overhead_tokens
+
+        for position, item in order:
+            # 与提示词中"- 条目"逐行拼接的格式保持一致
+            item_tokens = self.count_tokens(f"- {item}\n")
+            if item_tokens > item_budget:
+                item = self.truncate(item, item_budget - self.count_tokens("- \n"))
+                item_tokens = self.count_tokens(f"- {item}\n")
+                truncated += 1
+            if any(current) and current_tokens + item_tokens > budget:
+                if len(chunks) + 1 >= max_chunks:
+                    dropped += 1
+                    continue
+                chunks.append(current)
+                current = [[] for _ in sections]
+                current_tokens = overhead_tokens
+
+            current[position].append(item)
+            current_tokens += item_tokens
+
+        chunks.append(current)
+        if truncated:
+            logger.info(f"[{request_id}] {truncated} 条条目单独超出token预算，已截断")
+        if dropped:
+            logger.info(f"[{request_id}] 提示词超出token预算，舍弃 {dropped} 条低显著性条目")
+        return chunks
+
+    def _get_tokenizer(self):
+        """加载tokenizer，只尝试一次"""
+        if self._tokenizer_loaded:
+            return self.tokenizer
+
+        with self._lock:
+            if not self._tokenizer_loaded:
+                if self.tokenizer_path:
+                    try:
+                        from transformers import AutoTokenizer
+                        self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_path)
+                        logger.info(f"提示词tokenizer加载成功: {self.tokenizer_path}")
+                    except Exception as e:
+                        logger.warning(f"提示词tokenizer加载失败，改为按字符数估算token: {str(e)}")
+                self._tokenizer_loaded = True
+        return self.tokenizer
+
+
+# 创建单例实例供其他模块使用
+prompt_builder = PromptBuilder()
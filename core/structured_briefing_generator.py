@@ -1,12 +1,82 @@
 # 结构化舆情简报生成器 - 负责从舆情内容中提取三个核心维度
 
+import asyncio
 import time
 import json
-from typing import List, Tuple
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Tuple, Optional
 from core.models import BriefingRequest, StructuredBriefingResponse, ArticleModel
 from services.news_service import news_service
 from services.llm_service import llm
-from core.config import logger
+from services.dedup_service import dedup_service
+from core.cache_service import briefing_cache_service
+from core.prompt_builder import prompt_builder
+from core.profiling import StageTimeline, span, collect_timings, propagate_context
+from core.config import (
+    logger, EXTRACTION_MAX_WORKERS, EXTRACTION_BATCH_ENABLED, EXTRACTION_BATCH_TOKEN_BUDGET, OPINION_DEDUP_ENABLED,
+    SUMMARY_PROMPT_TOKEN_BUDGET, SUMMARY_PROMPT_MAX_CHUNKS, SUMMARY_PROMPT_MAX_LEVELS, SUMMARY_PARTIAL_MAX_TOKENS,
+    DEBUG_REQUESTS_ENABLED
+)
+
+# 单篇文章结构化提取提示词
+EXTRACTION_PROMPT = """### 角色：你是一个专业的舆情分析师，负责从新闻文章中提取正面意见、负面关切和建设性建议。
+### 任务：请分析以下新闻文章，围绕#{topic}#主题，提取出其中的正面意见、负面关切和建设性建议。
+### 思考流程：
+1. 首先判断新闻主旨是属于提出正面意见、还是负面关切或者是提出建设性建议
+2. 如果是正面意见，将其添加到正面意见列表中
+3. 如果是负面关切，将其添加到负面关切列表中
+4. 如果是建设性建议，将其添加到建设性建议列表中
+5. 文章中可能同时包含以上三种维度的内容
+6. 和主题不相关的意见直接忽略，不要提取
+### 输出格式：
+{{"positive_opinions": [], "negative_concerns": [], "constructive_suggestions": []}}
+不要输出其他内容
+### 文章内容：
+# 标题：{title}
+# 摘要：{description}
+"""
+
+# 多篇文章打包提取提示词，文章列表由BATCH_ARTICLE_TEMPLATE逐篇拼接
+BATCH_EXTRACTION_PROMPT = """### 角色：你是一个专业的舆情分析师，负责从新闻文章中提取正面意见、负面关切和建设性建议。
+### 任务：请逐篇分析以下{count}篇新闻文章，围绕#{topic}#主题，分别提取出每篇文章中的正面意见、负面关切和建设性建议。
+### 思考流程：
+1. 首先判断新闻主旨是属于提出正面意见、还是负面关切或者是提出建设性建议
+2. 如果是正面意见，将其添加到正面意见列表中
+3. 如果是负面关切，将其添加到负面关切列表中
+4. 如果是建设性建议，将其添加到建设性建议列表中
+5. 文章中可能同时包含以上三种维度的内容
+6. 和主题不相关的意见直接忽略，不要提取
+### 输出格式：
+输出一个JSON数组，按文章编号顺序每篇文章对应一个元素，共{count}个元素：
+[{{"index": 1, "positive_opinions": [], "negative_concerns": [], "constructive_suggestions": []}}]
+不要输出其他内容
+### 文章内容：
+{articles}"""
+
+BATCH_ARTICLE_TEMPLATE = """## 文章{index}
+# 标题：{title}
+# 摘要：{description}
+"""
+
+# 结构化内容总结提示词
+SUMMARY_PROMPT = """### 角色：你是一个专业的舆情分析师。
+### 任务：请围绕#{topic}#主题，对以内容进行总结，生成一段简洁明了的总结文字。
+### 思考流程：
+1. 对正面意见、负面关切和建设性建议分别进行总结
+2. 如果列表为空，直接返回空字符串
+### 要求：
+1. 总结要涵盖主要观点
+2. 语言简洁，避免重复
+3. 保持原有的情感色彩
+4. 直接输出总结结果，不要添加其他说明
+### 输出格式：
+{{"positive_opinions": "xxx", "negative_concerns": "xxx", "constructive_suggestions": "xxx"}}
+### 需要总结的内容：
+# 正面意见：{positive_opinions}
+# 负面关切：{negative_concerns}
+# 建设性建议：{constructive_suggestions}
+"""
 
 class StructuredBriefingGenerator:
     """结构化舆情简报生成器，负责从舆情内容中提取三个核心维度"""
@@ -17,7 +87,9 @@ class StructuredBriefingGenerator:
     
     def generate_structured_briefing(self, request: BriefingRequest, request_id: str) -> StructuredBriefingResponse:
         """
-        生成结构化舆情简报
+        生成结构化舆情简报，相同请求在缓存有效期内直接返回缓存结果，并发的相同请求共享同一次生成
+        
+        debug请求跳过缓存，响应中附带各阶段耗时明细
         
         Args:
             request: 简报请求对象
@@ -29,20 +101,35 @@ class StructuredBriefingGenerator:
         Raises:
             Exception: 当处理过程中发生错误时
         """
+        debug = self._is_debug(request)
+        with collect_timings(request_id, profile=debug) as timeline:
+            if debug:
+                response = self._generate_structured_briefing(request, request_id)
+            else:
+                key = briefing_cache_service.make_key("structured", request.topic, request.max_articles)
+                response = briefing_cache_service.get_or_compute(key, lambda: self._generate_structured_briefing(request, request_id), request_id,
+                        cacheable=self._is_cacheable)
+        return self._finalize_response(response, request_id, timeline, debug)
+    
+    def _generate_structured_briefing(self, request: BriefingRequest, request_id: str) -> StructuredBriefingResponse:
+        """生成结构化舆情简报的内部方法，不经过缓存"""
         logger.info(f"[{request_id}] 收到结构化简报请求，主题: {request.topic}, 最大文章数: {request.max_articles}")
         start_time = time.time()
         
         try:
             # 步骤一：获取新闻文章
-            articles = self._get_news_articles(request.topic, request.max_articles, request_id)
+            with span("fetch_articles"):
+                articles = self._get_news_articles(request.topic, request.max_articles, request_id)
             
             # 步骤二：结构化提取三个核心维度
-            positive_opinions, negative_concerns, constructive_suggestions = \
-                self._extract_structured_content(articles, request.topic, request_id)
+            with span("extract"):
+                positive_opinions, negative_concerns, constructive_suggestions = \
+                    self._extract_structured_content(articles, request.topic, request_id)
             
             # 步骤三：对结构化内容进行总结
-            positive_opinion, negative_concern, constructive_suggestion = \
-                self._summarize_structured_content(positive_opinions, negative_concerns, constructive_suggestions, request.topic, request_id)
+            with span("summarize"):
+                positive_opinion, negative_concern, constructive_suggestion = \
+                    self._summarize_structured_content(positive_opinions, negative_concerns, constructive_suggestions, request.topic, request_id)
             
             # 计算处理时间
             total_time = time.time() - start_time
@@ -63,6 +150,183 @@ class StructuredBriefingGenerator:
             logger.error(f"[{request_id}] 结构化简报处理异常，总耗时: {total_time:.2f} 秒, 错误: {str(e)}")
             raise
     
+    async def agenerate_structured_briefing(self, request: BriefingRequest, request_id: str) -> StructuredBriefingResponse:
+        """
+        异步生成结构化舆情简报，参数和返回值与generate_structured_briefing一致，与其共用简报缓存
+        
+        新闻API、网页爬取和LLM调用均使用异步HTTP客户端，单个工作进程的并发数只受I/O限制
+        
+        Raises:
+            Exception: 当处理过程中发生错误时
+        """
+        debug = self._is_debug(request)
+        with collect_timings(request_id, profile=debug) as timeline:
+            if debug:
+                response = await self._agenerate_structured_briefing(request, request_id)
+            else:
+                key = briefing_cache_service.make_key("structured", request.topic, request.max_articles)
+                response = await briefing_cache_service.aget_or_compute(key, lambda: self._agenerate_structured_briefing(request, request_id), request_id,
+                        cacheable=self._is_cacheable)
+        return self._finalize_response(response, request_id, timeline, debug)
+    
+    @staticmethod
+    def _is_cacheable(response: StructuredBriefingResponse) -> bool:
+        """获取文章或LLM调用失败时各维度总结均为空，这类降级结果不写入简报缓存"""
+        return response.article_count > 0 and any(
+            (response.positive_opinion, response.negative_concern, response.constructive_suggestion))
+    
+    @staticmethod
+    def _is_debug(request: BriefingRequest) -> bool:
+        """debug请求会跳过缓存并触发性能剖析，仅在服务端开启DEBUG_REQUESTS_ENABLED时生效"""
+        return request.debug and DEBUG_REQUESTS_ENABLED
+    
+    @staticmethod
+    def _finalize_response(response: StructuredBriefingResponse, request_id: str, timeline: StageTimeline, debug: bool) -> StructuredBriefingResponse:
+        """复制缓存的响应并填入本次请求ID，debug请求附带各阶段耗时明细"""
+        update = {"request_id": request_id}
+        if debug:
+            update["timings"] = timeline.summary()
+        return response.model_copy(update=update)
+    
+    async def _agenerate_structured_briefing(self, request: BriefingRequest, request_id: str) -> StructuredBriefingResponse:
+        """异步生成结构化舆情简报的内部方法，不经过缓存"""
+        logger.info(f"[{request_id}] 收到异步结构化简报请求，主题: {request.topic}, 最大文章数: {request.max_articles}")
+        start_time = time.time()
+        
+        try:
+            # 步骤一：获取新闻文章
+            try:
+                with span("fetch_articles"):
+                    articles = await self.news_service.aget_articles(request.topic, request.max_articles, request_id)
+            except Exception as e:
+                logger.error(f"[{request_id}] 获取新闻文章失败: {str(e)}")
+                raise
+            
+            # 步骤二：结构化提取三个核心维度
+            with span("extract"):
+                positive_opinions, negative_concerns, constructive_suggestions = \
+                    await self._aextract_structured_content(articles, request.topic, request_id)
+            
+            # 步骤三：对结构化内容进行总结
+            with span("summarize"):
+                positive_opinion, negative_concern, constructive_suggestion = \
+                    await self._asummarize_structured_content(positive_opinions, negative_concerns, constructive_suggestions, request.topic, request_id)
+            
+            # 计算处理时间
+            total_time = time.time() - start_time
+            logger.info(f"[{request_id}] 异步结构化简报处理完成，总耗时: {total_time:.2f} 秒")
+            
+            # 构建响应
+            return StructuredBriefingResponse(
+                request_id=request_id,
+                topic=request.topic,
+                article_count=len(articles),
+                positive_opinion=positive_opinion,
+                negative_concern=negative_concern,
+                constructive_suggestion=constructive_suggestion,
+                processing_time=f"{total_time:.2f}秒"
+            )
+        except Exception as e:
+            total_time = time.time() - start_time
+            logger.error(f"[{request_id}] 异步结构化简报处理异常，总耗时: {total_time:.2f} 秒, 错误: {str(e)}")
+            raise
+    
+    def stream_structured_briefing(self, request: BriefingRequest, request_id: str) -> Iterator[dict]:
+        """
+        以事件流形式生成结构化舆情简报，各阶段结果完成后立即产出
+        
+        事件类型：
+            articles: 文章获取完成，包含文章列表
+            article_result: 单篇文章提取完成，result为None表示该文章被跳过
+            summary_delta: 最终总结的增量文本，由LLM流式返回
+            summary: 三个维度的总结结果
+            done: 处理完成，包含文章数量和处理时间
+            error: 处理失败，流随即结束
+        
+        Args:
+            request: 简报请求对象
+            request_id: 请求ID，用于日志追踪
+            
+        Yields:
+            事件字典，event字段为事件类型
+        """
+        logger.info(f"[{request_id}] 收到流式结构化简报请求，主题: {request.topic}, 最大文章数: {request.max_articles}")
+        start_time = time.time()
+        
+        try:
+            # 步骤一：获取新闻文章
+            articles = self._get_news_articles(request.topic, request.max_articles, request_id)
+            yield {
+                "event": "articles",
+                "request_id": request_id,
+                "article_count": len(articles),
+                "articles": [
+                    {"index": idx, "title": article.title, "url": article.url, "source": article.source}
+                    for idx, article in enumerate(articles)
+                ]
+            }
+            
+            # 没有文章时直接产出空总结，不调用LLM
+            if not articles:
+                logger.warning(f"[{request_id}] 文章列表为空，跳过提取和总结")
+                yield {"event": "summary", "positive_opinion": "", "negative_concern": "", "constructive_suggestion": ""}
+                total_time = time.time() - start_time
+                yield {
+                    "event": "done",
+                    "request_id": request_id,
+                    "topic": request.topic,
+                    "article_count": 0,
+                    "processing_time": f"{total_time:.2f}秒"
+                }
+                return
+            
+            # 步骤二：结构化提取，每篇文章完成后立即产出
+            results = {}
+            for idx, result in self._iter_extraction_results(articles, request.topic, request_id):
+                results[idx] = result
+                yield {"event": "article_result", "index": idx, "result": result}
+            
+            positive_opinions, negative_concerns, constructive_suggestions = \
+                self._merge_extraction_results([results[idx] for idx in sorted(results)])
+            
+            # 步骤三：流式总结，内容超出token预算时先分块总结
+            positive_opinions, negative_concerns, constructive_suggestions = \
+                self._reduce_summary_input(positive_opinions, negative_concerns, constructive_suggestions, request.topic, request_id)
+            prompt = self._build_summary_prompt(positive_opinions, negative_concerns, constructive_suggestions, request.topic)
+            logger.info(f"[{request_id}] 调用LLM服务流式总结结构化内容")
+            chunks = []
+            for delta in llm.stream_text(prompt):
+                chunks.append(delta)
+                yield {"event": "summary_delta", "text": delta}
+            
+            try:
+                positive_opinion, negative_concern, constructive_suggestion = \
+                    self._parse_summary_response("".join(chunks), request_id)
+            except Exception as e:
+                logger.error(f"[{request_id}] 结构化内容总结过程中发生错误: {str(e)}")
+                positive_opinion, negative_concern, constructive_suggestion = "", "", ""
+            
+            yield {
+                "event": "summary",
+                "positive_opinion": positive_opinion,
+                "negative_concern": negative_concern,
+                "constructive_suggestion": constructive_suggestion
+            }
+            
+            total_time = time.time() - start_time
+            logger.info(f"[{request_id}] 流式结构化简报处理完成，总耗时: {total_time:.2f} 秒")
+            yield {
+                "event": "done",
+                "request_id": request_id,
+                "topic": request.topic,
+                "article_count": len(articles),
+                "processing_time": f"{total_time:.2f}秒"
+            }
+        except Exception as e:
+            total_time = time.time() - start_time
+            logger.error(f"[{request_id}] 流式结构化简报处理异常，总耗时: {total_time:.2f} 秒, 错误: {str(e)}")
+            yield {"event": "error", "detail": f"处理请求时发生错误: {str(e)}"}
+    
     def _get_news_articles(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
         """获取新闻文章的内部方法"""
         try:
@@ -76,11 +340,69 @@ class StructuredBriefingGenerator:
         """
         通过大语言模型从文章中结构化提取三个核心维度
         
+        各文章的LLM调用在线程池中并发执行，并发数由EXTRACTION_MAX_WORKERS控制，
+        结果按文章原有顺序合并，处理失败的文章会被跳过
+        
         Args:
             articles: 文章模型列表
             topic: 简报主题
             request_id: 请求ID，用于日志追踪
         
+        Returns:
+            包含正面意见、负面关切和建设性建议的元组
+        """
+        # 收集全部结果后按文章顺序合并
+        results = dict(self._iter_extraction_results(articles, topic, request_id))
+        positive_opinions, negative_concerns, constructive_suggestions = \
+            self._merge_extraction_results([results[idx] for idx in sorted(results)])
+        
+        logger.info(f"[{request_id}] LLM结构化提取完成，正面意见: {len(positive_opinions)}, 负面关切: {len(negative_concerns)}, 建设性建议: {len(constructive_suggestions)}")
+        
+        return positive_opinions, negative_concerns, constructive_suggestions
+    
+    def _iter_extraction_results(self, articles: List[ArticleModel], topic: str, request_id: str) -> Iterator[Tuple[int, Optional[dict]]]:
+        """
+        并发提取文章结构化内容，按完成顺序逐个产出结果
+        
+        Args:
+            articles: 文章模型列表
+            topic: 简报主题
+            request_id: 请求ID，用于日志追踪
+        
+        Yields:
+            (文章序号, 结构化结果)元组，处理失败的文章结果为None
+        """
+        # 按配置决定逐篇提取或打包提取，每个工作单元返回其文章的结果列表
+        if EXTRACTION_BATCH_ENABLED:
+            batches = self._pack_article_batches(articles, topic, request_id)
+            
+            def worker(batch: List[Tuple[int, ArticleModel]]) -> List[Optional[dict]]:
+                return self._extract_batch_by_llm(batch, len(articles), topic, request_id)
+        else:
+            batches = [[(idx, article)] for idx, article in enumerate(articles)]
+            
+            def worker(batch: List[Tuple[int, ArticleModel]]) -> List[Optional[dict]]:
+                return [self._extract_article_by_llm(batch[0][0], batch[0][1], len(articles), topic, request_id)]
+        
+        max_workers = max(1, min(EXTRACTION_MAX_WORKERS, len(batches)))
+        logger.info(f"[{request_id}] 并发提取文章结构化内容，工作单元: {len(batches)}, 并发数: {max_workers}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(propagate_context(worker), batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                for (idx, _), result in zip(batch, future.result()):
+                    yield idx, result
+    
+    @staticmethod
+    def _merge_extraction_results(results: List[Optional[dict]]) -> Tuple[List[str], List[str], List[str]]:
+        """
+        合并多篇文章的结构化结果并去重，开启OPINION_DEDUP_ENABLED时同时合并近似重复的意见
+        
+        去重后的意见按显著性排序：被越多文章提及（簇越大）的意见越靠前，提及次数相同时保持原有顺序
+        
+        Args:
+            results: 结构化结果列表，None表示该文章处理失败
+        
         Returns:
             包含正面意见、负面关切和建设性建议的元组
         """
@@ -89,76 +411,230 @@ class StructuredBriefingGenerator:
         negative_concerns = []
         constructive_suggestions = []
         
-        # 处理每篇文章
+        # 合并结果
+        for result in results:
+            if result is None:
+                continue
+            
+            if "positive_opinions" in result and isinstance(result["positive_opinions"], list):
+                positive_opinions.extend(result["positive_opinions"])
+            
+            if "negative_concerns" in result and isinstance(result["negative_concerns"], list):
+                negative_concerns.extend(result["negative_concerns"])
+            
+            if "constructive_suggestions" in result and isinstance(result["constructive_suggestions"], list):
+                constructive_suggestions.extend(result["constructive_suggestions"])
+        
+        # 去重处理，得到每条意见及其被提及的次数
+        if OPINION_DEDUP_ENABLED:
+            positive_opinions = dedup_service.cluster_texts(positive_opinions)
+            negative_concerns = dedup_service.cluster_texts(negative_concerns)
+            constructive_suggestions = dedup_service.cluster_texts(constructive_suggestions)
+        else:
+            positive_opinions = list(Counter(positive_opinions).items())
+            negative_concerns = list(Counter(negative_concerns).items())
+            constructive_suggestions = list(Counter(constructive_suggestions).items())
+        
+        # sorted是稳定排序，提及次数相同的意见保持原有顺序
+        def rank(clusters: List[Tuple[str, int]]) -> List[str]:
+            return [text for text, _ in sorted(clusters, key=lambda cluster: -cluster[1])]
+        
+        return rank(positive_opinions), rank(negative_concerns), rank(constructive_suggestions)
+    
+    def _extract_article_by_llm(self, idx: int, article: ArticleModel, total: int, topic: str, request_id: str) -> Optional[dict]:
+        """
+        通过大语言模型提取单篇文章的结构化内容
+        
+        Args:
+            idx: 文章序号
+            article: 文章模型
+            total: 文章总数，用于日志
+            topic: 简报主题
+            request_id: 请求ID，用于日志追踪
+        
+        Returns:
+            LLM返回的结构化结果字典，文章为空或处理失败时返回None
+        """
+        try:
+            # 获取文章标题和内容
+            title = article.title
+            description = article.description
+            
+            if not title and not description:
+                logger.warning(f"[{request_id}] 跳过空文章 {idx+1}/{total}")
+                return None
+            
+            # 调用LLM服务
+            logger.info(f"[{request_id}] 调用LLM服务处理文章 {idx+1}/{total}")
+            response = llm.generate_text(EXTRACTION_PROMPT.format(topic=topic, title=title, description=description))
+            return self._parse_extraction_response(response, idx, request_id)
+            
+        except Exception as e:
+            import traceback
+            logger.error(traceback.format_exc())
+            logger.error(f"[{request_id}] 处理文章 {idx+1} 时发生错误: {str(e)}")
+            return None
+    
+    async def _aextract_article_by_llm(self, idx: int, article: ArticleModel, total: int, topic: str, request_id: str) -> Optional[dict]:
+        """
+        异步提取单篇文章的结构化内容，参数和返回值与_extract_article_by_llm一致
+        """
+        try:
+            if not article.title and not article.description:
+                logger.warning(f"[{request_id}] 跳过空文章 {idx+1}/{total}")
+                return None
+            
+            logger.info(f"[{request_id}] 异步调用LLM服务处理文章 {idx+1}/{total}")
+            response = await llm.agenerate_text(EXTRACTION_PROMPT.format(topic=topic, title=article.title, description=article.description))
+            return self._parse_extraction_response(response, idx, request_id)
+            
+        except Exception as e:
+            logger.error(f"[{request_id}] 处理文章 {idx+1} 时发生错误: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _parse_extraction_response(response: str, idx: int, request_id: str) -> Optional[dict]:
+        """解析单篇文章的LLM响应JSON，解析失败时返回None"""
+        try:
+            # 清理响应内容，移除可能包含的```json ```标记
+            response = response.lstrip("```json").rstrip("```")
+            result = json.loads(response)
+            logger.info(result)
+            logger.info(f"[{request_id}] 成功解析文章 {idx+1} 的结构化内容")
+            return result
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"[{request_id}] 解析文章 {idx+1} 的响应JSON失败: {str(e)}, 响应内容: {response}")
+            return None
+    
+    def _pack_article_batches(self, articles: List[ArticleModel], topic: str, request_id: str) -> List[List[Tuple[int, ArticleModel]]]:
+        """
+        将文章按token预算打包成批次，每批文章放入同一个提示词中
+        
+        Args:
+            articles: 文章模型列表
+            topic: 简报主题
+            request_id: 请求ID，用于日志追踪
+        
+        Returns:
+            批次列表，每个批次为(文章序号, 文章)元组列表；单篇超出预算的文章独占一个批次
+        """
+        preamble_tokens = self._estimate_tokens(BATCH_EXTRACTION_PROMPT.format(count=0, topic=topic, articles=""))
+        batches = []
+        current_batch = []
+        current_tokens = preamble_tokens
+        
         for idx, article in enumerate(articles):
-            try:
-                # 获取文章标题和内容
-                title = article.title
-                description = article.description
-                
-                if not title and not description:
-                    logger.warning(f"[{request_id}] 跳过空文章 {idx+1}/{len(articles)}")
-                    continue
-                
-                # 构建提示词
-                prompt = """### 角色：你是一个专业的舆情分析师，负责从新闻文章中提取正面意见、负面关切和建设性建议。
-### 任务：请分析以下新闻文章，围绕#{topic}#主题，提取出其中的正面意见、负面关切和建设性建议。
-### 思考流程：
-1. 首先判断新闻主旨是属于提出正面意见、还是负面关切或者是提出建设性建议
-2. 如果是正面意见，将其添加到正面意见列表中
-3. 如果是负面关切，将其添加到负面关切列表中
-4. 如果是建设性建议，将其添加到建设性建议列表中
-5. 文章中可能同时包含以上三种维度的内容
-6. 和主题不相关的意见直接忽略，不要提取
-### 输出格式：
-{{"positive_opinions": [], "negative_concerns": [], "constructive_suggestions": []}}
-不要输出其他内容
-### 文章内容：
-# 标题：{title}
-# 摘要：{description}
-"""
-                
-                # 调用LLM服务
-                logger.info(f"[{request_id}] 调用LLM服务处理文章 {idx+1}/{len(articles)}")
-                response = llm.generate_text(prompt.format(topic=topic, title=title, description=description))
-                
-                # 解析JSON响应
-                try:
-                    # 清理响应内容，移除可能包含的```json ```标记
-                    response = response.lstrip("```json").rstrip("```")
-                    result = json.loads(response)
-                    logger.info(result)
-                    
-                    # 合并结果
-                    if "positive_opinions" in result and isinstance(result["positive_opinions"], list):
-                        positive_opinions.extend(result["positive_opinions"])
-                    
-                    if "negative_concerns" in result and isinstance(result["negative_concerns"], list):
-                        negative_concerns.extend(result["negative_concerns"])
-                    
-                    if "constructive_suggestions" in result and isinstance(result["constructive_suggestions"], list):
-                        constructive_suggestions.extend(result["constructive_suggestions"])
-                    
-                    logger.info(f"[{request_id}] 成功解析文章 {idx+1} 的结构化内容")
-                    
-                except json.JSONDecodeError as e:
-                    logger.error(f"[{request_id}] 解析文章 {idx+1} 的响应JSON失败: {str(e)}, 响应内容: {response}")
-                    continue
-                
-            except Exception as e:
-                import traceback
-                logger.error(traceback.format_exc())
-                logger.error(f"[{request_id}] 处理文章 {idx+1} 时发生错误: {str(e)}")
+            if not article.title and not article.description:
+                logger.warning(f"[{request_id}] 跳过空文章 {idx+1}/{len(articles)}")
                 continue
+            
+            article_tokens = self._estimate_tokens(BATCH_ARTICLE_TEMPLATE.format(
+                index=len(current_batch) + 1, title=article.title, description=article.description))
+            
+            if current_batch and current_tokens + article_tokens > EXTRACTION_BATCH_TOKEN_BUDGET:
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = preamble_tokens
+            
+            current_batch.append((idx, article))
+            current_tokens += article_tokens
         
-        # 去重处理
-        positive_opinions = list(set(positive_opinions))
-        negative_concerns = list(set(negative_concerns))
-        constructive_suggestions = list(set(constructive_suggestions))
+        if current_batch:
+            batches.append(current_batch)
         
-        logger.info(f"[{request_id}] LLM结构化提取完成，正面意见: {len(positive_opinions)}, 负面关切: {len(negative_concerns)}, 建设性建议: {len(constructive_suggestions)}")
+        logger.info(f"[{request_id}] {len(articles)} 篇文章打包为 {len(batches)} 个批次，token预算: {EXTRACTION_BATCH_TOKEN_BUDGET}")
+        return batches
+    
+    def _extract_batch_by_llm(self, batch: List[Tuple[int, ArticleModel]], total: int, topic: str, request_id: str) -> List[Optional[dict]]:
+        """
+        通过一次大语言模型调用提取一批文章的结构化内容，解析失败时回退为逐篇调用
         
-        return positive_opinions, negative_concerns, constructive_suggestions
+        Args:
+            batch: (文章序号, 文章)元组列表
+            total: 文章总数，用于日志
+            topic: 简报主题
+            request_id: 请求ID，用于日志追踪
+        
+        Returns:
+            与批次中文章顺序一致的结构化结果列表，处理失败的位置为None
+        """
+        if len(batch) == 1:
+            idx, article = batch[0]
+            return [self._extract_article_by_llm(idx, article, total, topic, request_id)]
+        
+        article_numbers = ", ".join(str(idx + 1) for idx, _ in batch)
+        try:
+            logger.info(f"[{request_id}] 调用LLM服务批量处理文章 {article_numbers}")
+            response = llm.generate_text(self._build_batch_prompt(batch, topic))
+            results = self._parse_batch_response(response, len(batch))
+            
+            logger.info(f"[{request_id}] 成功解析文章 {article_numbers} 的批量结构化内容")
+            return results
+            
+        except Exception as e:
+            logger.warning(f"[{request_id}] 批量处理文章 {article_numbers} 失败，回退为逐篇处理: {str(e)}")
+            return [self._extract_article_by_llm(idx, article, total, topic, request_id) for idx, article in batch]
+    
+    async def _aextract_batch_by_llm(self, batch: List[Tuple[int, ArticleModel]], total: int, topic: str, request_id: str) -> List[Optional[dict]]:
+        """
+        异步提取一批文章的结构化内容，参数和返回值与_extract_batch_by_llm一致
+        """
+        if len(batch) == 1:
+            idx, article = batch[0]
+            return [await self._aextract_article_by_llm(idx, article, total, topic, request_id)]
+        
+        article_numbers = ", ".join(str(idx + 1) for idx, _ in batch)
+        try:
+            logger.info(f"[{request_id}] 异步调用LLM服务批量处理文章 {article_numbers}")
+            response = await llm.agenerate_text(self._build_batch_prompt(batch, topic))
+            results = self._parse_batch_response(response, len(batch))
+            
+            logger.info(f"[{request_id}] 成功解析文章 {article_numbers} 的批量结构化内容")
+            return results
+            
+        except Exception as e:
+            logger.warning(f"[{request_id}] 批量处理文章 {article_numbers} 失败，回退为逐篇处理: {str(e)}")
+            return list(await asyncio.gather(*(
+                self._aextract_article_by_llm(idx, article, total, topic, request_id) for idx, article in batch
+            )))
+    
+    @staticmethod
+    def _build_batch_prompt(batch: List[Tuple[int, ArticleModel]], topic: str) -> str:
+        """构建多篇文章打包提取的提示词"""
+        articles_text = "\n".join(
+            BATCH_ARTICLE_TEMPLATE.format(index=position + 1, title=article.title, description=article.description)
+            for position, (_, article) in enumerate(batch)
+        )
+        return BATCH_EXTRACTION_PROMPT.format(count=len(batch), topic=topic, articles=articles_text)
+    
+    @staticmethod
+    def _parse_batch_response(response: str, count: int) -> List[dict]:
+        """
+        解析批量提取的LLM响应，按文章顺序返回结构化结果
+        
+        Raises:
+            ValueError: 当响应不是合法JSON、元素个数不符或index不是1到count的排列时
+        """
+        # 清理响应内容，移除可能包含的```json ```标记
+        response = response.strip().lstrip("```json").rstrip("```")
+        results = json.loads(response)
+        
+        if not isinstance(results, list) or len(results) != count or \
+                not all(isinstance(result, dict) for result in results):
+            raise ValueError(f"批量响应格式不符，期望 {count} 个对象")
+        
+        # 按index字段对齐文章，缺失、重复或越界时无法确定对应关系
+        indices = [result.get("index") for result in results]
+        if not all(type(index) is int for index in indices) or sorted(indices) != list(range(1, count + 1)):
+            raise ValueError(f"批量响应的index应为1到{count}的排列，实际为 {indices}")
+        
+        return sorted(results, key=lambda result: result["index"])
+    
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """统计文本token数，未配置PROMPT_TOKENIZER时按每字符一个token估算"""
+        return prompt_builder.count_tokens(text)
     
     def _extract_structured_content(self, articles: List[ArticleModel], topic: str, request_id: str) -> Tuple[List[str], List[str], List[str]]:
         """
@@ -191,6 +667,44 @@ class StructuredBriefingGenerator:
             # 提取失败时返回空列表
             return [], [], []
         
+    async def _aextract_structured_content(self, articles: List[ArticleModel], topic: str, request_id: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        异步从文章中结构化提取三个核心维度，参数和返回值与_extract_structured_content一致
+        
+        LLM调用以协程并发执行，同时进行的调用数不超过EXTRACTION_MAX_WORKERS
+        """
+        if not articles:
+            logger.warning(f"[{request_id}] 文章列表为空")
+            return [], [], []
+        
+        logger.info(f"[{request_id}] 开始异步从 {len(articles)} 篇文章中结构化提取内容")
+        
+        try:
+            if EXTRACTION_BATCH_ENABLED:
+                batches = self._pack_article_batches(articles, topic, request_id)
+            else:
+                batches = [[(idx, article)] for idx, article in enumerate(articles)]
+            
+            semaphore = asyncio.Semaphore(EXTRACTION_MAX_WORKERS)
+            
+            async def extract(batch: List[Tuple[int, ArticleModel]]) -> List[Optional[dict]]:
+                async with semaphore:
+                    return await self._aextract_batch_by_llm(batch, len(articles), topic, request_id)
+            
+            # gather按批次顺序返回，展开后即为文章顺序
+            batch_results = await asyncio.gather(*(extract(batch) for batch in batches))
+            positive_opinions, negative_concerns, constructive_suggestions = \
+                self._merge_extraction_results([result for results in batch_results for result in results])
+            
+            logger.info(f"[{request_id}] 异步结构化提取完成，正面意见: {len(positive_opinions)}, 负面关切: {len(negative_concerns)}, 建设性建议: {len(constructive_suggestions)}")
+            
+            return positive_opinions, negative_concerns, constructive_suggestions
+            
+        except Exception as e:
+            logger.error(f"[{request_id}] 异步结构化内容提取过程中发生错误: {str(e)}")
+            # 提取失败时返回空列表
+            return [], [], []
+    
     def _summarize_structured_content(self, positive_opinions: List[str], negative_concerns: List[str], constructive_suggestions: List[str], topic: str, request_id: str) -> Tuple[str, str, str]:
         """
         对结构化提取的内容进行总结
@@ -207,61 +721,155 @@ class StructuredBriefingGenerator:
         """
         logger.info(f"[{request_id}] 开始对结构化内容进行总结")
         
-        # 初始化总结结果
-        positive_opinion_summary = ""
-        negative_concern_summary = ""
-        constructive_suggestion_summary = ""
-
-        prompt = """### 角色：你是一个专业的舆情分析师。
-### 任务：请围绕#{topic}#主题，对以内容进行总结，生成一段简洁明了的总结文字。
-### 思考流程：
-1. 对正面意见、负面关切和建设性建议分别进行总结
-2. 如果列表为空，直接返回空字符串
-### 要求：
-1. 总结要涵盖主要观点
-2. 语言简洁，避免重复
-3. 保持原有的情感色彩
-4. 直接输出总结结果，不要添加其他说明
-### 输出格式：
-{{"positive_opinions": "xxx", "negative_concerns": "xxx", "constructive_suggestions": "xxx"}}
-### 需要总结的内容：
-# 正面意见：{positive_opinions}
-# 负面关切：{negative_concerns}
-# 建设性建议：{constructive_suggestions}
-"""
-
         try:
+            # 内容超出token预算时先分块总结，保证最终提示词有界
+            positive_opinions, negative_concerns, constructive_suggestions = \
+                self._reduce_summary_input(positive_opinions, negative_concerns, constructive_suggestions, topic, request_id)
+            
             # 格式化提示词
-            formatted_prompt = prompt.format(
-                topic=topic,
-                positive_opinions="\n".join([f"- {item}" for item in positive_opinions]) if positive_opinions else "无",
-                negative_concerns="\n".join([f"- {item}" for item in negative_concerns]) if negative_concerns else "无",
-                constructive_suggestions="\n".join([f"- {item}" for item in constructive_suggestions]) if constructive_suggestions else "无"
-            )
+            formatted_prompt = self._build_summary_prompt(positive_opinions, negative_concerns, constructive_suggestions, topic)
             
             # 调用LLM服务
             logger.info(f"[{request_id}] 调用LLM服务进行结构化内容总结")
             response = llm.generate_text(formatted_prompt)
             
-            # 清理响应结果
-            response_clean = response.strip()
-            logger.info(f"[{request_id}] LLM服务返回总结结果: {response_clean}")
+            return self._parse_summary_response(response, request_id)
             
-            # 解析JSON格式结果
-            summary_data = json.loads(response_clean)
+        except Exception as e:
+            logger.error(f"[{request_id}] 结构化内容总结过程中发生错误: {str(e)}")
+            # 总结失败时返回空字符串
+            return "", "", ""
+    
+    async def _asummarize_structured_content(self, positive_opinions: List[str], negative_concerns: List[str], constructive_suggestions: List[str], topic: str, request_id: str) -> Tuple[str, str, str]:
+        """
+        异步对结构化提取的内容进行总结，参数和返回值与_summarize_structured_content一致
+        """
+        logger.info(f"[{request_id}] 开始异步对结构化内容进行总结")
+        
+        try:
+            positive_opinions, negative_concerns, constructive_suggestions = \
+                await self._areduce_summary_input(positive_opinions, negative_concerns, constructive_suggestions, topic, request_id)
+            formatted_prompt = self._build_summary_prompt(positive_opinions, negative_concerns, constructive_suggestions, topic)
+            response = await llm.agenerate_text(formatted_prompt)
+            return self._parse_summary_response(response, request_id)
             
-            # 提取各个总结结果
-            positive_opinion_summary = summary_data.get("positive_opinions", "")
-            negative_concern_summary = summary_data.get("negative_concerns", "")
-            constructive_suggestion_summary = summary_data.get("constructive_suggestions", "")
+        except Exception as e:
+            logger.error(f"[{request_id}] 异步结构化内容总结过程中发生错误: {str(e)}")
+            # 总结失败时返回空字符串
+            return "", "", ""
+    
+    def _reduce_summary_input(self, positive_opinions: List[str], negative_concerns: List[str], constructive_suggestions: List[str], topic: str, request_id: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        将总结输入压缩到SUMMARY_PROMPT_TOKEN_BUDGET以内
+        
+        输入能放入一个提示词时原样返回；否则按显著性分块，并行总结各块，以各块的部分总结作为下一层的输入，
+        重复直到能放入一个提示词，达到SUMMARY_PROMPT_MAX_LEVELS层后舍弃放不下的低显著性部分总结
+        
+        Args:
+            positive_opinions: 按显著性排序的正面意见列表
+            negative_concerns: 按显著性排序的负面关切列表
+            constructive_suggestions: 按显著性排序的建设性建议列表
+            topic: 简报主题
+            request_id: 请求ID，用于日志追踪
             
-            logger.info(f"[{request_id}] 结构化内容总结完成")
+        Returns:
+            可放入一个总结提示词的正面意见、负面关切和建设性建议列表
+        """
+        sections = [positive_opinions, negative_concerns, constructive_suggestions]
+        for level in range(SUMMARY_PROMPT_MAX_LEVELS):
+            chunks = self._pack_summary_input(sections, topic, SUMMARY_PROMPT_MAX_CHUNKS, request_id)
+            if len(chunks) == 1:
+                return tuple(chunks[0])
+            
+            logger.info(f"[{request_id}] 总结内容超出token预算，第 {level+1} 层分为 {len(chunks)} 块分层总结")
+            with ThreadPoolExecutor(max_workers=min(EXTRACTION_MAX_WORKERS, len(chunks))) as executor:
+                partials = list(executor.map(propagate_context(lambda chunk: self._summarize_chunk(chunk, topic, request_id)), chunks))
+            sections = self._collect_partials(partials)
+        
+        return tuple(self._pack_summary_input(sections, topic, 1, request_id)[0])
+    
+    async def _areduce_summary_input(self, positive_opinions: List[str], negative_concerns: List[str], constructive_suggestions: List[str], topic: str, request_id: str) -> Tuple[List[str], List[str], List[str]]:
+        """
+        异步将总结输入压缩到token预算以内，参数和返回值与_reduce_summary_input一致
+        """
+        semaphore = asyncio.Semaphore(EXTRACTION_MAX_WORKERS)
+        
+        async def summarize(chunk: List[List[str]]) -> Tuple[str, str, str]:
+            async with semaphore:
+                return await self._asummarize_chunk(chunk, topic, request_id)
+        
+        sections = [positive_opinions, negative_concerns, constructive_suggestions]
+        for level in range(SUMMARY_PROMPT_MAX_LEVELS):
+            chunks = self._pack_summary_input(sections, topic, SUMMARY_PROMPT_MAX_CHUNKS, request_id)
+            if len(chunks) == 1:
+                return tuple(chunks[0])
             
+            logger.info(f"[{request_id}] 总结内容超出token预算，第 {level+1} 层分为 {len(chunks)} 块异步分层总结")
+            partials = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+            sections = self._collect_partials(partials)
+        
+        return tuple(self._pack_summary_input(sections, topic, 1, request_id)[0])
+    
+    def _pack_summary_input(self, sections: List[List[str]], topic: str, max_chunks: int, request_id: str) -> List[List[List[str]]]:
+        """按SUMMARY_PROMPT_TOKEN_BUDGET将三个维度的内容装入不超过max_chunks个总结提示词"""
+        overhead_tokens = prompt_builder.count_tokens(self._build_summary_prompt([], [], [], topic))
+        return prompt_builder.pack(sections, overhead_tokens, SUMMARY_PROMPT_TOKEN_BUDGET, max_chunks, request_id)
+    
+    def _summarize_chunk(self, chunk: List[List[str]], topic: str, request_id: str) -> Tuple[str, str, str]:
+        """总结一块内容，生成长度受SUMMARY_PARTIAL_MAX_TOKENS限制，失败时返回空字符串"""
+        try:
+            response = llm.generate_text(self._build_summary_prompt(*chunk, topic), max_tokens=SUMMARY_PARTIAL_MAX_TOKENS)
+            return self._parse_summary_response(response, request_id)
         except Exception as e:
-            logger.error(f"[{request_id}] 结构化内容总结过程中发生错误: {str(e)}")
-            # 总结失败时返回空字符串
+            logger.error(f"[{request_id}] 分块总结过程中发生错误: {str(e)}")
             return "", "", ""
-                
+    
+    async def _asummarize_chunk(self, chunk: List[List[str]], topic: str, request_id: str) -> Tuple[str, str, str]:
+        """异步总结一块内容，参数和返回值与_summarize_chunk一致"""
+        try:
+            response = await llm.agenerate_text(self._build_summary_prompt(*chunk, topic), max_tokens=SUMMARY_PARTIAL_MAX_TOKENS)
+            return self._parse_summary_response(response, request_id)
+        except Exception as e:
+            logger.error(f"[{request_id}] 异步分块总结过程中发生错误: {str(e)}")
+            return "", "", ""
+    
+    @staticmethod
+    def _collect_partials(partials: List[Tuple[str, str, str]]) -> List[List[str]]:
+        """将各块的部分总结按维度收集，块的顺序即显著性顺序，空总结被忽略"""
+        return [[partial[position] for partial in partials if partial[position]] for position in range(3)]
+    
+    @staticmethod
+    def _build_summary_prompt(positive_opinions: List[str], negative_concerns: List[str], constructive_suggestions: List[str], topic: str) -> str:
+        """构建结构化内容总结的提示词"""
+        return SUMMARY_PROMPT.format(
+            topic=topic,
+            positive_opinions="\n".join([f"- {item}" for item in positive_opinions]) if positive_opinions else "无",
+            negative_concerns="\n".join([f"- {item}" for item in negative_concerns]) if negative_concerns else "无",
+            constructive_suggestions="\n".join([f"- {item}" for item in constructive_suggestions]) if constructive_suggestions else "无"
+        )
+    
+    @staticmethod
+    def _parse_summary_response(response: str, request_id: str) -> Tuple[str, str, str]:
+        """
+        解析LLM返回的总结结果
+        
+        Raises:
+            json.JSONDecodeError: 当响应不是合法JSON时
+        """
+        # 清理响应结果
+        response_clean = response.strip()
+        logger.info(f"[{request_id}] LLM服务返回总结结果: {response_clean}")
+        
+        # 解析JSON格式结果
+        summary_data = json.loads(response_clean)
+        
+        # 提取各个总结结果
+        positive_opinion_summary = summary_data.get("positive_opinions", "")
+        negative_concern_summary = summary_data.get("negative_concerns", "")
+        constructive_suggestion_summary = summary_data.get("constructive_suggestions", "")
+        
+        logger.info(f"[{request_id}] 结构化内容总结完成")
+        
         return positive_opinion_summary, negative_concern_summary, constructive_suggestion_summary
 
 
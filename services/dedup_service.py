@@ -0,0 +1,203 @@
+# 去重服务 - 负责识别并合并语义相近的重复文本
+
+import re
+import unicodedata
+import zlib
+from collections import Counter, defaultdict
+from typing import List, Optional, Tuple
+import numpy as np
+from core.config import (
+    logger, DEDUP_NGRAM_SIZE, DEDUP_HASH_DIM, OPINION_DEDUP_THRESHOLD,
+    ARTICLE_DEDUP_THRESHOLD, MINHASH_NUM_PERM, MINHASH_BANDS, MINHASH_NGRAM_SIZE
+)
+
+# 去除空白和标点，只保留文字和数字参与比较
+NON_WORD_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+
+# 文章描述中可能夹带的HTML标签
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# MinHash哈希函数参数使用固定种子生成，保证已保存的签名在重启后仍可比较
+MINHASH_SEED = 20240917
+
+
+class DedupService:
+    """去重服务类，基于字符n-gram向量的余弦相似度聚类短文本，基于MinHash-LSH过滤近似重复的文章"""
+
+    def __init__(self, ngram_size: int = DEDUP_NGRAM_SIZE, hash_dim: int = DEDUP_HASH_DIM):
+        """
+        初始化去重服务
+
+        Args:
+            ngram_size: 字符n-gram长度，中文短句使用2效果较好
+            hash_dim: n-gram哈希到的向量维度
+        """
+        self.ngram_size = ngram_size
+        self.hash_dim = hash_dim
+        
+        # MinHash使用(a * x + b) mod 2^32形式的哈希族，a取奇数
+        rng = np.random.default_rng(MINHASH_SEED)
+        self._minhash_a = rng.integers(1, 2 ** 32, size=MINHASH_NUM_PERM, dtype=np.uint64) | np.uint64(1)
+        self._minhash_b = rng.integers(0, 2 ** 32, size=MINHASH_NUM_PERM, dtype=np.uint64)
+
+    def dedupe_texts(self, texts: List[str], threshold: float = OPINION_DEDUP_THRESHOLD, request_id: str = "") -> List[str]:
+        """
+        对文本列表进行近似重复聚类，每个簇保留一个代表文本
+
+        先去除完全相同的文本，再将相似度不低于threshold的文本归为一簇，
+        代表文本为簇内与其他成员平均相似度最高的一条，结果按各簇首次出现的顺序排列
+
+        Args:
+            texts: 文本列表
+            threshold: 余弦相似度阈值，取值0到1，越低合并越激进
+            request_id: 请求ID，用于日志追踪
+
+        Returns:
+            去重后的文本列表
+        """
+        return [text for text, _ in self.cluster_texts(texts, threshold, request_id)]
+
+    def cluster_texts(self, texts: List[str], threshold: float = OPINION_DEDUP_THRESHOLD, request_id: str = "") -> List[Tuple[str, int]]:
+        """
+        对文本列表进行近似重复聚类，返回各簇的代表文本和簇大小，参数与dedupe_texts一致
+
+        Returns:
+            (代表文本, 簇内文本条数)元组列表，簇大小包含完全相同的重复文本，按各簇首次出现的顺序排列
+        """
+        counts = Counter(text for text in texts if text)
+        texts = list(counts)
+        if len(texts) <= 1:
+            return list(counts.items())
+
+        vectors = self.vectorize(texts)
+        similarity = vectors @ vectors.T
+
+        clusters = [
+            (texts[representative], sum(counts[texts[member]] for member in members))
+            for representative, members in self._cluster(similarity, threshold)
+        ]
+        if len(clusters) < len(texts):
+            logger.info(f"[{request_id}] 近似重复去重: {len(texts)} 条合并为 {len(clusters)} 条")
+        return clusters
+
+    def vectorize(self, texts: List[str]) -> np.ndarray:
+        """
+        将文本转换为L2归一化的字符n-gram计数向量，n-gram通过CRC32哈希到固定维度
+
+        Returns:
+            形状为(len(texts), hash_dim)的float32矩阵，空文本对应零向量
+        """
+        vectors = np.zeros((len(texts), self.hash_dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            ngrams = self._ngrams(text)
+            if not ngrams:
+                continue
+            columns = [zlib.crc32(ngram.encode("utf-8")) % self.hash_dim for ngram in ngrams]
+            np.add.at(vectors[row], columns, 1.0)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def minhash_signatures(self, texts: List[str]) -> np.ndarray:
+        """
+        计算文本字符n-gram集合的MinHash签名，HTML标签会被去除
+
+        Returns:
+            形状为(len(texts), MINHASH_NUM_PERM)的uint32矩阵，两行相等位置的比例即Jaccard相似度的估计值
+        """
+        signatures = np.full((len(texts), MINHASH_NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+        for row, text in enumerate(texts):
+            shingles = set(self._ngrams(TAG_PATTERN.sub(" ", text), MINHASH_NGRAM_SIZE))
+            if not shingles:
+                continue
+            values = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+            # 乘法结果不超过2^64，加法溢出只影响高位，取低32位即为mod 2^32
+            hashes = (values[:, None] * self._minhash_a + self._minhash_b) & np.uint64(0xFFFFFFFF)
+            signatures[row] = hashes.min(axis=0)
+        return signatures
+
+    @staticmethod
+    def find_near_duplicates(signatures: np.ndarray, threshold: float = ARTICLE_DEDUP_THRESHOLD) -> List[int]:
+        """
+        使用LSH分段筛选候选对，再按签名估计的Jaccard相似度确认近似重复
+
+        Args:
+            signatures: MinHash签名矩阵，行顺序即优先级
+            threshold: Jaccard相似度阈值
+
+        Returns:
+            保留的行下标：每组近似重复中只保留排在最前的一行
+        """
+        count, num_perm = signatures.shape
+        rows_per_band = max(1, num_perm // MINHASH_BANDS)
+
+        # 任一分段完全相同的两行成为候选对
+        candidates = defaultdict(set)
+        for start in range(0, num_perm, rows_per_band):
+            buckets = defaultdict(list)
+            for index in range(count):
+                buckets[signatures[index, start:start + rows_per_band].tobytes()].append(index)
+            for members in buckets.values():
+                for position, index in enumerate(members):
+                    candidates[index].update(members[:position])
+
+        keep = []
+        for index in range(count):
+            earlier = [other for other in candidates[index] if other in keep]
+            if earlier:
+                similarity = (signatures[earlier] == signatures[index]).mean(axis=1)
+                if similarity.max() >= threshold:
+                    continue
+            keep.append(index)
+        return keep
+
+    @staticmethod
+    def encode_signature(signature: np.ndarray) -> str:
+        """将MinHash签名编码为十六进制字符串，便于保存到数据库"""
+        return signature.astype(np.uint32).tobytes().hex()
+
+    @staticmethod
+    def decode_signature(encoded: Optional[str]) -> Optional[np.ndarray]:
+        """解码十六进制签名，格式不符或长度与当前MINHASH_NUM_PERM不一致时返回None"""
+        try:
+            signature = np.frombuffer(bytes.fromhex(encoded), dtype=np.uint32)
+        except (TypeError, ValueError):
+            return None
+        return signature if len(signature) == MINHASH_NUM_PERM else None
+
+    def _ngrams(self, text: str, ngram_size: Optional[int] = None) -> List[str]:
+        """规范化文本后切分字符n-gram，文本短于n时整体作为一个n-gram"""
+        ngram_size = ngram_size or self.ngram_size
+        normalized = NON_WORD_PATTERN.sub("", unicodedata.normalize("NFKC", text).casefold())
+        if len(normalized) <= ngram_size:
+            return [normalized] if normalized else []
+        return [normalized[start:start + ngram_size] for start in range(len(normalized) - ngram_size + 1)]
+
+    @staticmethod
+    def _cluster(similarity: np.ndarray, threshold: float) -> List[Tuple[int, np.ndarray]]:
+        """
+        按输入顺序贪心聚类：未归簇的文本作为新簇中心，吸收所有与其相似度不低于阈值的未归簇文本
+
+        Returns:
+            (代表文本下标, 簇成员下标数组)元组列表，按簇首次出现的顺序排列
+        """
+        assigned = np.zeros(len(similarity), dtype=bool)
+        representatives = []
+
+        for index in range(len(similarity)):
+            if assigned[index]:
+                continue
+            # 留出float32舍入误差，使阈值为1时完全相同的文本仍能合并
+            members = np.flatnonzero(~assigned & (similarity[index] >= threshold - 1e-6))
+            members = np.union1d(members, [index])
+            assigned[members] = True
+
+            # 选取簇内平均相似度最高的成员作为代表
+            within = similarity[np.ix_(members, members)].sum(axis=1)
+            representatives.append((int(members[np.argmax(within)]), members))
+
+        return representatives
+
+
+# 创建单例实例供其他模块使用
+dedup_service = DedupService()
@@ -0,0 +1,170 @@
+# 正文提取服务 - 负责从网页HTML中提取干净的正文文本
+
+import hashlib
+import re
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from core.config import logger, EXTRACT_MIN_BLOCK_CHARS, EXTRACT_MAX_LINK_DENSITY
+
+# 整个子树都不包含正文的标签
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "aside", "form", "button", "select"}
+
+# 块级标签，遇到时切分文本块
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "br", "hr", "dd", "dt", "figcaption"
+}
+
+# 正文容器标签，页面中存在时只保留其中的文本块
+CONTENT_TAGS = {"article", "main"}
+
+# 不需要结束标签的空元素
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class _MainContentParser(HTMLParser):
+    """流式解析HTML，按块级标签切分文本并统计每块的链接文本长度"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        # (文本, 链接文本长度, 是否在正文容器内, 是否为标题)
+        self.blocks: List[Tuple[str, int, bool, bool]] = []
+        self._buffer: List[str] = []
+        self._link_chars = 0
+        self._skip_depth = 0
+        self._link_depth = 0
+        self._content_depth = 0
+        self._heading_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._skip_depth:
+            if tag in SKIP_TAGS and tag not in VOID_TAGS:
+                self._skip_depth += 1
+            return
+
+        if tag in SKIP_TAGS:
+            self._flush()
+            self._skip_depth = 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "a":
+            self._link_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+            if tag in CONTENT_TAGS:
+                self._content_depth += 1
+            if tag in HEADING_TAGS:
+                self._heading_depth += 1
+
+    def handle_endtag(self, tag):
+        if self._skip_depth:
+            if tag in SKIP_TAGS:
+                self._skip_depth -= 1
+            return
+
+        if tag == "title":
+            self._in_title = False
+        elif tag == "a":
+            self._link_depth = max(0, self._link_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+            if tag in CONTENT_TAGS:
+                self._content_depth = max(0, self._content_depth - 1)
+            if tag in HEADING_TAGS:
+                self._heading_depth = max(0, self._heading_depth - 1)
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+
+        if self._in_title:
+            self.title += data
+            return
+
+        self._buffer.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def _flush(self):
+        """将缓冲区内容作为一个文本块保存"""
+        text = WHITESPACE_PATTERN.sub(" ", "".join(self._buffer)).strip()
+        if text:
+            self.blocks.append((text, self._link_chars, self._content_depth > 0, self._heading_depth > 0))
+        self._buffer = []
+        self._link_chars = 0
+
+
+class ExtractService:
+    """正文提取服务类，基于标准库HTMLParser实现的轻量级readability风格提取"""
+
+    def extract_text(self, html: Optional[str], request_id: str = "") -> Optional[str]:
+        """
+        从网页HTML中提取正文文本
+
+        跳过脚本、样式、导航等非正文区域，过滤过短或链接密度过高的文本块；
+        页面含有<article>或<main>时只保留其中的内容
+
+        Args:
+            html: 网页HTML
+            request_id: 请求ID，用于日志追踪
+
+        Returns:
+            正文文本，段落之间以换行分隔；无法提取时返回None
+        """
+        if not html:
+            return None
+
+        try:
+            parser = _MainContentParser()
+            parser.feed(html)
+            parser.close()
+        except Exception as e:
+            logger.error(f"[{request_id}] 解析网页HTML失败: {str(e)}")
+            return None
+
+        blocks = parser.blocks
+        if any(in_content for _, _, in_content, _ in blocks):
+            blocks = [block for block in blocks if block[2]]
+
+        paragraphs = []
+        for text, link_chars, _, is_heading in blocks:
+            if link_chars / len(text) > EXTRACT_MAX_LINK_DENSITY:
+                continue
+            if len(text) < EXTRACT_MIN_BLOCK_CHARS and not is_heading:
+                continue
+            paragraphs.append(text)
+
+        title = WHITESPACE_PATTERN.sub(" ", parser.title).strip()
+        if title and (not paragraphs or paragraphs[0] != title):
+            paragraphs.insert(0, title)
+
+        if not paragraphs:
+            return None
+
+        text = "\n".join(paragraphs)
+        logger.info(f"[{request_id}] 正文提取完成，原始大小: {len(html)} 字符，正文大小: {len(text)} 字符")
+        return text
+
+    @staticmethod
+    def hash_page(html: str) -> str:
+        """
+        计算原始网页的紧凑哈希，用于判断网页内容是否变化
+
+        Returns:
+            32位十六进制BLAKE2b摘要
+        """
+        return hashlib.blake2b(html.encode("utf-8", errors="ignore"), digest_size=16).hexdigest()
+
+
+# 创建单例实例供其他模块使用
+extract_service = ExtractService()
@@ -0,0 +1,246 @@
+# 推理进程池 - 在独立的工作进程中运行摘要模型，避免推理占用API进程的GIL和CPU线程
+
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+from core.config import logger, SUMMARY_PROCESS_TASK_TIMEOUT, SUMMARY_PROCESS_CHECK_INTERVAL
+
+
+def _worker_main(index: int, backend: str, task_queue, result_queue, current_tasks) -> None:
+    """
+    工作进程入口：加载并预热一次模型，之后循环从任务队列取任务推理，结果经管道返回主进程
+
+    正在处理的任务ID写入共享数组current_tasks，进程异常退出时主进程据此使该任务失败；收到None时退出
+    """
+    from services.summary_service import SummaryService
+
+    service = SummaryService(backend=backend, process_workers=0)
+    try:
+        service.warm_up(f"worker-{index}")
+    except Exception as e:
+        result_queue.put(("failed", index, str(e)))
+        return
+    result_queue.put(("ready", index, service.backend))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        task_id, texts, kwargs = task
+        # 共享内存同步写入；经结果队列发送的消息由后台线程写出，进程崩溃时可能丢失
+        current_tasks[index] = task_id
+        try:
+            result_queue.put(("done", index, task_id, service.summarizer(texts, **kwargs)))
+        except Exception as e:
+            result_queue.put(("error", index, task_id, f"{type(e).__name__}: {str(e)}"))
+        current_tasks[index] = -1
+
+
+class InferenceProcessPool:
+    """
+    摘要模型推理进程池：每个工作进程加载一次模型，从共享任务队列领取任务，
+    结果通过结果队列返回后由后台线程分发给等待的调用方
+
+    工作进程异常退出时，其正在处理的任务以异常结束并自动重启该进程
+    """
+
+    def __init__(self, num_workers: int, backend: str, start_method: str = "spawn"):
+        """
+        初始化推理进程池，工作进程在首次start或submit时启动
+
+        Args:
+            num_workers: 工作进程数
+            backend: 工作进程使用的推理后端
+            start_method: 进程启动方式，默认spawn以避免继承主进程的线程和锁状态
+        """
+        self.num_workers = num_workers
+        self.backend = backend
+        self._context = multiprocessing.get_context(start_method)
+        self._task_queue = None
+        self._result_queue = None
+        self._processes: List = []
+        self._pending: Dict[int, Future] = {}
+        self._current_tasks = None  # 共享数组：工作进程序号 -> 正在处理的任务ID，空闲时为-1
+        self._ready_workers = set()
+        self._ready = threading.Event()
+        self._load_error: Optional[str] = None
+        self._task_ids = itertools.count()
+        self._collector = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self, request_id: str = "") -> None:
+        """启动工作进程和结果收集线程，已启动时不做任何操作"""
+        with self._lock:
+            if self._processes:
+                return
+
+            logger.info(f"[{request_id}] 启动 {self.num_workers} 个摘要推理进程，推理后端: {self.backend}")
+            self._closed = False
+            self._task_queue = self._context.Queue()
+            self._result_queue = self._context.Queue()
+            self._current_tasks = self._context.Array("q", [-1] * self.num_workers, lock=False)
+            self._processes = [self._spawn(index) for index in range(self.num_workers)]
+            self._collector = threading.Thread(target=self._collect, name="inference-pool-collector", daemon=True)
+            self._collector.start()
+
+    @property
+    def load_failed(self) -> bool:
+        """工作进程是否加载模型失败"""
+        return self._load_error is not None
+
+    def restart(self, request_id: str = "") -> None:
+        """关闭现有工作进程，清除加载失败状态后重新启动，用于加载失败后重试"""
+        logger.info(f"[{request_id}] 重启摘要推理进程池")
+        self.close()
+        self._load_error = None
+        self.start(request_id)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有工作进程完成模型加载和预热
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            是否在超时前全部就绪
+
+        Raises:
+            RuntimeError: 当工作进程加载模型失败时
+        """
+        ready = self._ready.wait(timeout)
+        if self._load_error:
+            raise RuntimeError(f"推理进程加载模型失败: {self._load_error}")
+        return ready
+
+    def submit(self, texts: List[str], timeout: Optional[float] = SUMMARY_PROCESS_TASK_TIMEOUT, **kwargs) -> List[dict]:
+        """
+        提交一组文本到工作进程推理并阻塞等待结果
+
+        Args:
+            texts: 待推理的文本列表
+            timeout: 最长等待时间（秒），None表示一直等待
+            **kwargs: 生成参数
+
+        Returns:
+            与texts一一对应的结果列表
+
+        Raises:
+            RuntimeError: 当工作进程加载模型失败、推理出错、异常退出或等待超时时
+        """
+        self.start()
+        if self._load_error:
+            raise RuntimeError(f"推理进程加载模型失败: {self._load_error}")
+
+        future = Future()
+        with self._lock:
+            task_id = next(self._task_ids)
+            self._pending[task_id] = future
+        self._task_queue.put((task_id, texts, kwargs))
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._pending.pop(task_id, None)
+            raise RuntimeError(f"推理任务在 {timeout} 秒内未完成")
+
+    def close(self) -> None:
+        """通知工作进程退出并等待结束，未完成的任务以异常结束"""
+        with self._lock:
+            processes = self._processes
+            if not processes:
+                return
+            self._closed = True
+            self._processes = []
+
+        for _ in processes:
+            self._task_queue.put(None)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout=5)
+
+        self._fail_pending(RuntimeError("推理进程池已关闭"))
+        self._ready_workers.clear()
+        self._ready.clear()
+        logger.info("摘要推理进程池已关闭")
+
+    def _spawn(self, index: int):
+        """启动一个工作进程"""
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.backend, self._task_queue, self._result_queue, self._current_tasks),
+            name=f"summary-worker-{index}",
+            daemon=True
+        )
+        process.start()
+        return process
+
+    def _collect(self) -> None:
+        """后台线程：接收工作进程消息，分发推理结果，并按固定间隔检查进程存活"""
+        next_check = time.monotonic() + SUMMARY_PROCESS_CHECK_INTERVAL
+        while not self._closed:
+            # 持续有消息时不会等到队列超时，存活检查按间隔独立执行
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + SUMMARY_PROCESS_CHECK_INTERVAL
+            try:
+                message = self._result_queue.get(timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                continue
+
+            kind, index = message[0], message[1]
+            if kind == "ready":
+                logger.info(f"摘要推理进程 {index} 就绪，推理后端: {message[2]}")
+                self._ready_workers.add(index)
+                if len(self._ready_workers) >= self.num_workers:
+                    self._ready.set()
+            elif kind == "failed":
+                logger.error(f"摘要推理进程 {index} 加载模型失败: {message[2]}")
+                self._load_error = message[2]
+                self._ready.set()
+                self._fail_pending(RuntimeError(f"推理进程加载模型失败: {message[2]}"))
+            else:
+                task_id, payload = message[2], message[3]
+                with self._lock:
+                    future = self._pending.pop(task_id, None)
+                if future is None:
+                    continue
+                if kind == "done":
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+
+    def _check_workers(self) -> None:
+        """重启异常退出的工作进程，并使其正在处理的任务以异常结束"""
+        if self._load_error:
+            return
+
+        with self._lock:
+            for index, process in enumerate(self._processes):
+                if self._closed or process.is_alive():
+                    continue
+
+                logger.error(f"摘要推理进程 {index} 异常退出，退出码: {process.exitcode}，正在重启")
+                task_id = self._current_tasks[index]
+                self._current_tasks[index] = -1
+                future = self._pending.pop(task_id, None)
+                if future is not None:
+                    future.set_exception(RuntimeError(f"推理进程 {index} 异常退出"))
+                self._ready_workers.discard(index)
+                self._processes[index] = self._spawn(index)
+
+    def _fail_pending(self, error: Exception) -> None:
+        """使所有等待中的任务以指定异常结束"""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(error)
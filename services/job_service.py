@@ -0,0 +1,300 @@
+# 任务服务 - 负责简报任务的排队、后台执行、状态持久化和完成回调
+
+import ipaddress
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+from urllib.parse import urlsplit
+import requests
+from core.config import (logger, JOB_MAX_WORKERS, JOB_WEBHOOK_TIMEOUT, JOB_WEBHOOK_RETRIES,
+                         JOB_WEBHOOK_MAX_WORKERS, JOB_WEBHOOK_ALLOWED_HOSTS)
+from core.db_service import SQLiteConnectionManager
+from core.models import BriefingRequest, JobRequest
+from core.briefing_generator import briefing_generator
+from core.structured_briefing_generator import structured_briefing_generator
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    检查回调地址是否允许访问
+
+    配置了JOB_WEBHOOK_ALLOWED_HOSTS时只允许列表中的主机；否则主机解析出的所有地址都必须是公网地址
+
+    Args:
+        url: 回调地址
+
+    Raises:
+        ValueError: 当回调地址不允许访问或主机无法解析时
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError(f"回调地址只支持http/https: {url}")
+
+    if JOB_WEBHOOK_ALLOWED_HOSTS:
+        if host.lower() not in (allowed.lower() for allowed in JOB_WEBHOOK_ALLOWED_HOSTS):
+            raise ValueError(f"回调地址主机不在允许列表中: {host}")
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or None, proto=socket.IPPROTO_TCP)}
+    except socket.gaierror as e:
+        raise ValueError(f"无法解析回调地址主机 {host}: {str(e)}")
+
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        # IPv4映射的IPv6地址按其IPv4地址判断
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"回调地址主机 {host} 解析到非公网地址: {ip}")
+
+
+class JobService:
+    """简报任务服务类，任务状态保存在SQLite中，由有界的后台线程池执行，服务重启后恢复未完成的任务"""
+
+    def __init__(self, db_path: str = None, max_workers: int = JOB_MAX_WORKERS):
+        """
+        初始化任务服务，后台线程池在start时创建
+
+        Args:
+            db_path: 任务数据库文件路径，默认使用应用根目录下的jobs.db（与articles.db同目录）
+            max_workers: 同时执行的最大任务数
+        """
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "jobs.db")
+
+        self.db_path = db_path
+        self.connections = SQLiteConnectionManager(db_path, initializer=self._init_db)
+        self.max_workers = max_workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.webhook_executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _init_db(self, conn: sqlite3.Connection) -> None:
+        """创建任务表，由连接池在首次建立连接时调用"""
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                max_articles INTEGER NOT NULL,
+                webhook_url TEXT,
+                status TEXT NOT NULL,
+                partial TEXT,
+                result TEXT,
+                error TEXT,
+                created_at TEXT,
+                updated_at TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
+        conn.commit()
+        logger.info(f"任务数据库初始化成功，文件路径: {self.db_path}")
+
+    def start(self) -> None:
+        """创建任务和回调线程池，并将上次运行时未完成的任务重新排队"""
+        with self._lock:
+            if self.executor is not None:
+                return
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="briefing-job")
+            self.webhook_executor = ThreadPoolExecutor(max_workers=JOB_WEBHOOK_MAX_WORKERS, thread_name_prefix="job-webhook")
+
+        # 上次中断时运行中的任务从头重新执行
+        with self.connections.get_connection() as conn:
+            rows = conn.execute(
+                'SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at',
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        if rows:
+            logger.info(f"恢复 {len(rows)} 个未完成的简报任务")
+        for row in rows:
+            self._update(row["id"], status=JOB_QUEUED)
+            self.executor.submit(self._run_job, row["id"])
+
+    def stop(self) -> None:
+        """关闭任务和回调线程池，排队中的任务保留在数据库中，下次启动时恢复"""
+        with self._lock:
+            executors = (self.executor, self.webhook_executor)
+            self.executor = None
+            self.webhook_executor = None
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit_job(self, request: JobRequest) -> dict:
+        """
+        创建简报任务并放入后台队列
+
+        Args:
+            request: 任务请求对象
+
+        Returns:
+            新建的任务字典
+
+        Raises:
+            ValueError: 当回调地址不允许访问时
+        """
+        webhook_url = str(request.webhook_url) if request.webhook_url else None
+        if webhook_url:
+            check_webhook_url(webhook_url)
+
+        self.start()
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+
+        with self.connections.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO jobs (id, type, topic, max_articles, webhook_url, status, partial, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (job_id, request.type, request.topic, request.max_articles, webhook_url,
+                  JOB_QUEUED, "{}", now, now))
+
+        logger.info(f"[job_{job_id}] 创建简报任务，类型: {request.type}, 主题: {request.topic}")
+        self.executor.submit(self._run_job, job_id)
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        """
+        获取任务状态
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            任务字典，partial和result已解析为字典；任务不存在时返回None
+        """
+        with self.connections.get_connection() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["job_id"] = job.pop("id")
+        job["partial"] = json.loads(job["partial"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _run_job(self, job_id: str) -> None:
+        """后台线程：执行任务并记录结果，结束后发送完成回调"""
+        job = self.get_job(job_id)
+        if job is None or job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+            return
+
+        request_id = f"job_{job_id}"
+        request = BriefingRequest(topic=job["topic"], max_articles=job["max_articles"])
+        self._update(job_id, status=JOB_RUNNING, partial={})
+
+        try:
+            if job["type"] == "summary":
+                result = briefing_generator.generate_briefing(request, request_id).model_dump()
+            else:
+                result = self._run_structured_job(job_id, request, request_id)
+            self._update(job_id, status=JOB_SUCCEEDED, result=result)
+            logger.info(f"[{request_id}] 简报任务完成")
+        except Exception as e:
+            self._update(job_id, status=JOB_FAILED, error=str(e))
+            logger.error(f"[{request_id}] 简报任务失败: {str(e)}")
+
+        if job["webhook_url"]:
+            webhook_executor = self.webhook_executor
+            if webhook_executor is None:
+                logger.warning(f"[{request_id}] 任务服务已停止，跳过完成回调")
+            else:
+                webhook_executor.submit(self._send_webhook, job["webhook_url"], self.get_job(job_id), request_id)
+
+    def _run_structured_job(self, job_id: str, request: BriefingRequest, request_id: str) -> dict:
+        """
+        以流式方式生成结构化简报，文章获取和每篇文章提取完成后更新部分结果，
+        部分结果的extractions按完成顺序记录每篇文章的提取结果，result为None表示该文章被跳过
+
+        Returns:
+            结构化简报结果字典
+
+        Raises:
+            RuntimeError: 当生成过程产出错误事件时
+        """
+        partial = {"article_count": 0, "extracted_count": 0, "articles": [], "extractions": []}
+        summary = {}
+
+        for event in structured_briefing_generator.stream_structured_briefing(request, request_id):
+            if event["event"] == "articles":
+                partial["article_count"] = event["article_count"]
+                partial["articles"] = event["articles"]
+                self._update(job_id, partial=partial)
+            elif event["event"] == "article_result":
+                partial["extracted_count"] += 1
+                partial["extractions"].append({"index": event["index"], "result": event["result"]})
+                self._update(job_id, partial=partial)
+            elif event["event"] == "summary":
+                summary = {key: value for key, value in event.items() if key != "event"}
+            elif event["event"] == "done":
+                return {
+                    "request_id": event["request_id"],
+                    "topic": event["topic"],
+                    "article_count": event["article_count"],
+                    **summary,
+                    "processing_time": event["processing_time"]
+                }
+            elif event["event"] == "error":
+                raise RuntimeError(event["detail"])
+
+        raise RuntimeError("结构化简报生成未正常结束")
+
+    def _update(self, job_id: str, **fields) -> None:
+        """更新任务字段，partial和result以JSON保存"""
+        for key in ("partial", "result"):
+            if key in fields:
+                fields[key] = json.dumps(fields[key], ensure_ascii=False)
+        fields["updated_at"] = datetime.now().isoformat()
+
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self.connections.get_connection() as conn:
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+
+    def _send_webhook(self, url: str, job: dict, request_id: str) -> bool:
+        """
+        以POST方式将任务最终状态发送到回调地址，失败时按指数退避重试
+
+        发送前重新检查回调地址，主机解析结果可能在创建任务后发生变化；不跟随重定向
+
+        Returns:
+            是否发送成功
+        """
+        try:
+            check_webhook_url(url)
+        except ValueError as e:
+            logger.error(f"[{request_id}] 拒绝发送任务完成回调: {str(e)}")
+            return False
+
+        for attempt in range(JOB_WEBHOOK_RETRIES):
+            try:
+                response = requests.post(url, json=job, timeout=JOB_WEBHOOK_TIMEOUT, allow_redirects=False)
+                response.raise_for_status()
+                logger.info(f"[{request_id}] 任务完成回调发送成功: {url}")
+                return True
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"[{request_id}] 任务完成回调发送失败（第 {attempt + 1} 次）: {str(e)}")
+                if attempt + 1 < JOB_WEBHOOK_RETRIES:
+                    time.sleep(0.5 * 2 ** attempt)
+
+        logger.error(f"[{request_id}] 任务完成回调最终失败: {url}")
+        return False
+
+
+# 创建单例实例供其他模块使用
+job_service = JobService()
@@ -1,10 +1,18 @@
 import os
 import sys 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+import asyncio
 import logging
-from typing import Dict, List, Optional, Union
-from openai import OpenAI, OpenAIError
-from core.config import OPENAI_API_KEY, OPENAI_BASE_URL, DEFAULT_OPENAI_MODEL
+from typing import Dict, Iterator, List, Optional, Union
+import httpx
+from openai import OpenAI, AsyncOpenAI, OpenAIError, DefaultHttpxClient, DefaultAsyncHttpxClient
+from core.config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, DEFAULT_OPENAI_MODEL,
+    LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_MAX_CONCURRENCY, LLM_CACHE_ENABLED, METRICS_ENABLED
+)
+from core.cache_service import llm_cache_service
+from core.profiling import span
+from core.metrics import llm_calls, llm_tokens
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -31,13 +39,29 @@ class LLMService:
         self.base_url = base_url or OPENAI_BASE_URL
         self.default_model = default_model or DEFAULT_OPENAI_MODEL
         
+        # 同步与异步客户端共用相同的连接池配置，复用HTTP长连接
+        self.limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+        )
+        
         # 初始化OpenAI客户端
-        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        self.client = OpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=DefaultHttpxClient(limits=self.limits)
+        )
+        
+        # 初始化异步OpenAI客户端
+        self.async_client = self._create_async_client()
+        
+        # 响应缓存（按需启用）
+        self.cache = llm_cache_service
         
         logger.info(f"LLM服务已初始化，默认模型: {self.default_model}")
     
     def generate_text(self, prompt: str, model: Optional[str] = None, max_tokens: int = 10240,
-                     temperature: float = 0.7, **kwargs) -> str:
+                     temperature: float = 0.7, use_cache: Optional[bool] = None, **kwargs) -> str:
         """
         生成文本内容
         
@@ -46,31 +70,196 @@ class LLMService:
             model: 使用的模型名称，默认为None（使用默认模型）
             max_tokens: 最大生成token数
             temperature: 生成温度，值越高越随机
+            use_cache: 是否使用响应缓存，默认为None（使用配置LLM_CACHE_ENABLED）
             **kwargs: 其他传递给OpenAI API的参数
         
         Returns:
             生成的文本内容
         """
+        cache_key = self._get_cache_key(prompt, model, max_tokens, temperature, use_cache, **kwargs)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"命中LLM响应缓存，使用模型: {model or self.default_model}")
+                self._record_call(model, "cache_hit")
+                return cached
+        
         try:
-            response = self.client.chat.completions.create(
+            with span("llm.generate"):
+                response = self.client.chat.completions.create(
+                    model=model or self.default_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **kwargs
+                )
+            
+            # 提取生成的文本
+            text = response.choices[0].message.content.strip()
+            logger.info(f"文本生成成功，使用模型: {model or self.default_model}")
+            self._record_call(model, "success", response)
+            if cache_key:
+                self.cache.set(cache_key, text, model or self.default_model)
+            return text
+            
+        except OpenAIError as e:
+            logger.error(f"OpenAI API调用失败: {str(e)}")
+            self._record_call(model, "error")
+            raise
+        except Exception as e:
+            logger.error(f"文本生成过程中发生错误: {str(e)}")
+            self._record_call(model, "error")
+            raise
+
+    def stream_text(self, prompt: str, model: Optional[str] = None, max_tokens: int = 10240,
+                    temperature: float = 0.7, **kwargs) -> Iterator[str]:
+        """
+        流式生成文本内容，逐段返回模型输出
+        
+        Args:
+            prompt: 提示文本
+            model: 使用的模型名称，默认为None（使用默认模型）
+            max_tokens: 最大生成token数
+            temperature: 生成温度，值越高越随机
+            **kwargs: 其他传递给OpenAI API的参数
+        
+        Yields:
+            增量文本片段
+        """
+        try:
+            stream = self.client.chat.completions.create(
                 model=model or self.default_model,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=max_tokens,
                 temperature=temperature,
+                stream=True,
                 **kwargs
             )
             
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            
+            logger.info(f"流式文本生成完成，使用模型: {model or self.default_model}")
+            self._record_call(model, "success")
+            
+        except OpenAIError as e:
+            logger.error(f"OpenAI API流式调用失败: {str(e)}")
+            self._record_call(model, "error")
+            raise
+        except Exception as e:
+            logger.error(f"流式文本生成过程中发生错误: {str(e)}")
+            self._record_call(model, "error")
+            raise
+    
+    async def agenerate_text(self, prompt: str, model: Optional[str] = None, max_tokens: int = 10240,
+                             temperature: float = 0.7, use_cache: Optional[bool] = None, **kwargs) -> str:
+        """
+        异步生成文本内容，参数与generate_text一致
+        
+        Args:
+            prompt: 提示文本
+            model: 使用的模型名称，默认为None（使用默认模型）
+            max_tokens: 最大生成token数
+            temperature: 生成温度，值越高越随机
+            use_cache: 是否使用响应缓存，默认为None（使用配置LLM_CACHE_ENABLED）
+            **kwargs: 其他传递给OpenAI API的参数
+        
+        Returns:
+            生成的文本内容
+        """
+        cache_key = self._get_cache_key(prompt, model, max_tokens, temperature, use_cache, **kwargs)
+        if cache_key:
+            # SQLite缓存读写是同步操作，放到线程中执行以免阻塞事件循环
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"命中LLM响应缓存，使用模型: {model or self.default_model}")
+                self._record_call(model, "cache_hit")
+                return cached
+        
+        try:
+            with span("llm.generate"):
+                response = await self.async_client.chat.completions.create(
+                    model=model or self.default_model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **kwargs
+                )
+            
             # 提取生成的文本
             text = response.choices[0].message.content.strip()
-            logger.info(f"文本生成成功，使用模型: {model or self.default_model}")
+            logger.info(f"异步文本生成成功，使用模型: {model or self.default_model}")
+            self._record_call(model, "success", response)
+            if cache_key:
+                await asyncio.to_thread(self.cache.set, cache_key, text, model or self.default_model)
             return text
             
         except OpenAIError as e:
-            logger.error(f"OpenAI API调用失败: {str(e)}")
+            logger.error(f"OpenAI API异步调用失败: {str(e)}")
+            self._record_call(model, "error")
             raise
         except Exception as e:
-            logger.error(f"文本生成过程中发生错误: {str(e)}")
+            logger.error(f"异步文本生成过程中发生错误: {str(e)}")
+            self._record_call(model, "error")
             raise
+    
+    async def agenerate_batch(self, prompts: List[str], max_concurrency: Optional[int] = None,
+                              **kwargs) -> List[Optional[str]]:
+        """
+        异步批量生成文本内容，并发数受信号量限制
+        
+        Args:
+            prompts: 提示文本列表
+            max_concurrency: 最大并发请求数，默认使用配置LLM_MAX_CONCURRENCY
+            **kwargs: 传递给agenerate_text的其他参数
+        
+        Returns:
+            与prompts顺序一致的生成结果列表，调用失败的位置为None
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or LLM_MAX_CONCURRENCY)
+        
+        async def _generate(prompt: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    return await self.agenerate_text(prompt, **kwargs)
+                except Exception:
+                    return None
+        
+        return await asyncio.gather(*(_generate(prompt) for prompt in prompts))
+    
+    def _record_call(self, model: Optional[str], status: str, response=None) -> None:
+        """记录LLM调用次数，以及响应usage字段中的输入和输出token数"""
+        if not METRICS_ENABLED:
+            return
+        model = model or self.default_model
+        llm_calls.inc(model=model, status=status)
+        usage = getattr(response, "usage", None)
+        for token_type in ("prompt", "completion"):
+            tokens = getattr(usage, f"{token_type}_tokens", None)
+            if isinstance(tokens, int):
+                llm_tokens.inc(tokens, model=model, type=token_type)
+    
+    def _get_cache_key(self, prompt: str, model: Optional[str], max_tokens: int, temperature: float,
+                       use_cache: Optional[bool], **kwargs) -> Optional[str]:
+        """计算响应缓存键，未启用缓存时返回None"""
+        if not (LLM_CACHE_ENABLED if use_cache is None else use_cache):
+            return None
+        return self.cache.make_key(prompt, model or self.default_model, temperature, max_tokens, **kwargs)
+    
+    async def aclose(self) -> None:
+        """关闭异步客户端持有的连接池，在应用关闭时调用；随后换上新的客户端，以便应用再次启动时继续使用"""
+        client = self.async_client
+        self.async_client = self._create_async_client()
+        await client.close()
+    
+    def _create_async_client(self) -> AsyncOpenAI:
+        """创建异步OpenAI客户端"""
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=DefaultAsyncHttpxClient(limits=self.limits)
+        )
 
 llm = LLMService()
 
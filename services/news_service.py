@@ -1,9 +1,20 @@
 # 新闻服务 - 负责调用新闻API获取相关文章
 
+import asyncio
+import httpx
 import requests
+from datetime import datetime, timedelta
 from typing import List, Optional
-from core.config import NEWS_API_KEY, NEWS_API_URL, logger, FETCH_FULL_TEXT
+import numpy as np
+from core.config import (
+    NEWS_API_KEY, NEWS_API_URL, logger, FETCH_FULL_TEXT, NEWS_LOCAL_FIRST, NEWS_LOCAL_MAX_AGE_HOURS,
+    ARTICLE_DEDUP_ENABLED, ARTICLE_DEDUP_THRESHOLD
+)
 from core.models import ArticleModel
+from core.db_service import db_service
+from services.dedup_service import dedup_service
+from services.spider_service import discard_async_client
+from core.profiling import span
 
 class NewsService:
     """新闻服务类，负责获取和处理新闻数据"""
@@ -11,8 +22,125 @@ class NewsService:
     def __init__(self):
         self.api_key = NEWS_API_KEY
         self.api_url = NEWS_API_URL
+        
+        # 异步客户端绑定创建时的事件循环，在首次异步调用时创建
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
     
     def get_articles(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
+        """
+        获取与指定主题相关的文章
+        
+        开启NEWS_LOCAL_FIRST时优先从本地文章库检索足够新鲜的文章，数量不足时再调用新闻API补充，
+        两者按URL和内容近似重复去重合并；否则直接调用新闻API
+        
+        Args:
+            topic: 搜索主题
+            max_articles: 最大文章数量
+            request_id: 请求ID，用于日志追踪
+            
+        Returns:
+            文章模型列表
+        
+        Raises:
+            requests.exceptions.RequestException: 当API调用失败且本地没有可用文章时
+        """
+        if not NEWS_LOCAL_FIRST:
+            return self.get_articles_from_api(topic, max_articles, request_id)
+        
+        local_articles = self.get_articles_from_local(topic, max_articles, request_id)
+        if len(local_articles) >= max_articles:
+            logger.info(f"[{request_id}] 本地文章库已满足需求，跳过News API调用")
+            return local_articles[:max_articles]
+        
+        try:
+            api_articles = self.get_articles_from_api(topic, max_articles, request_id)
+        except Exception:
+            if local_articles:
+                logger.warning(f"[{request_id}] News API调用失败，仅返回本地文章库中的 {len(local_articles)} 篇文章")
+                return local_articles
+            raise
+        
+        # 新获取的文章写入本地文章库，供后续请求复用
+        db_service.save_articles([article.model_dump() for article in api_articles])
+        return self._merge_articles(local_articles, api_articles, max_articles, request_id)
+    
+    async def aget_articles(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
+        """
+        异步获取与指定主题相关的文章，逻辑与get_articles一致，本地文章库读写在线程池中执行
+        
+        Raises:
+            httpx.HTTPError: 当API调用失败且本地没有可用文章时
+        """
+        if not NEWS_LOCAL_FIRST:
+            return await self.aget_articles_from_api(topic, max_articles, request_id)
+        
+        local_articles = await asyncio.to_thread(self.get_articles_from_local, topic, max_articles, request_id)
+        if len(local_articles) >= max_articles:
+            logger.info(f"[{request_id}] 本地文章库已满足需求，跳过News API调用")
+            return local_articles[:max_articles]
+        
+        try:
+            api_articles = await self.aget_articles_from_api(topic, max_articles, request_id)
+        except Exception:
+            if local_articles:
+                logger.warning(f"[{request_id}] News API调用失败，仅返回本地文章库中的 {len(local_articles)} 篇文章")
+                return local_articles
+            raise
+        
+        # 新获取的文章写入本地文章库，供后续请求复用
+        await asyncio.to_thread(db_service.save_articles, [article.model_dump() for article in api_articles])
+        return await asyncio.to_thread(self._merge_articles, local_articles, api_articles, max_articles, request_id)
+    
+    def _merge_articles(self, local_articles: List[ArticleModel], api_articles: List[ArticleModel],
+                        max_articles: int, request_id: str) -> List[ArticleModel]:
+        """按URL去重合并本地文章和API文章，本地文章在前，再过滤两者之间的近似重复文章"""
+        articles = list(local_articles)
+        seen_urls = {article.url for article in local_articles if article.url}
+        for article in api_articles:
+            if article.url and article.url in seen_urls:
+                continue
+            seen_urls.add(article.url)
+            articles.append(article)
+        articles = self._filter_near_duplicates(articles, request_id)
+        
+        logger.info(f"[{request_id}] 合并本地文章 {len(local_articles)} 篇与API文章 {len(api_articles)} 篇，共 {min(len(articles), max_articles)} 篇")
+        return articles[:max_articles]
+    
+    @span("news.local")
+    def get_articles_from_local(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
+        """
+        从本地文章库检索在NEWS_LOCAL_MAX_AGE_HOURS内更新过的相关文章
+        
+        Args:
+            topic: 搜索主题
+            max_articles: 最大文章数量
+            request_id: 请求ID，用于日志追踪
+            
+        Returns:
+            文章模型列表
+        """
+        updated_after = (datetime.now() - timedelta(hours=NEWS_LOCAL_MAX_AGE_HOURS)).isoformat()
+        rows = db_service.get_articles_by_topic(topic, limit=max_articles, updated_after=updated_after)
+        
+        articles = [
+            ArticleModel(
+                title=row.get("title"),
+                description=row.get("description"),
+                content=row.get("content"),
+                url=row.get("url"),
+                source=row.get("source"),
+                full_text=row.get("full_text"),
+                minhash=row.get("minhash")
+            )
+            for row in rows
+        ]
+        articles = self._filter_near_duplicates(articles, request_id)
+        
+        logger.info(f"[{request_id}] 从本地文章库获取到 {len(articles)} 篇文章")
+        return articles
+    
+    def get_articles_from_api(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
         """
         从新闻API获取与指定主题相关的文章
         
@@ -37,24 +165,17 @@ class NewsService:
         }
         
         try:
-            response = requests.get(self.api_url, params=params, timeout=10)
+            with span("news.api"):
+                response = requests.get(self.api_url, params=params, timeout=10)
             response.raise_for_status()  # 抛出HTTP错误
-            articles_data = response.json().get("articles", [])
+            articles = self._parse_articles(response.json().get("articles", []))
             
-            # 转换为ArticleModel对象
-            articles = []
-            for article_data in articles_data:
-                article = ArticleModel(
-                    title=article_data.get("title"),
-                    description=article_data.get("description"),
-                    content=article_data.get("content"),
-                    url=article_data.get("url"),
-                    source=article_data.get("source", {}).get("name")
-                )
-                # 根据配置决定是否调用fetch_full_text获取完整网页内容
-                if FETCH_FULL_TEXT:
-                    article.fetch_full_text(request_id)
-                articles.append(article)
+            # 在爬取网页和调用LLM之前过滤近似重复的文章
+            articles = self._filter_near_duplicates(articles, request_id)
+            
+            # 根据配置决定是否批量获取完整网页内容
+            if FETCH_FULL_TEXT:
+                ArticleModel.fetch_full_texts(articles, request_id)
             
             logger.info(f"[{request_id}] 成功获取到 {len(articles)} 篇文章")
             return articles
@@ -66,6 +187,126 @@ class NewsService:
             logger.error(f"[{request_id}] 处理News API响应失败: {str(e)}")
             raise
     
+    async def aget_articles_from_api(self, topic: str, max_articles: int, request_id: str) -> List[ArticleModel]:
+        """
+        异步从新闻API获取与指定主题相关的文章，参数和返回值与get_articles_from_api一致
+        
+        Raises:
+            httpx.HTTPError: 当API调用失败时
+        """
+        logger.debug(f"[{request_id}] 准备异步调用News API，URL: {self.api_url}")
+        
+        params = {
+            "q": topic,
+            "apiKey": self.api_key,
+            "pageSize": max_articles,
+            "language": "zh"
+        }
+        
+        try:
+            with span("news.api"):
+                response = await self._get_async_client().get(self.api_url, params=params, timeout=10)
+            response.raise_for_status()  # 抛出HTTP错误
+            articles = self._parse_articles(response.json().get("articles", []))
+            
+            # 在爬取网页和调用LLM之前过滤近似重复的文章，签名读写涉及数据库，放到线程池中执行
+            articles = await asyncio.to_thread(self._filter_near_duplicates, articles, request_id)
+            
+            # 根据配置决定是否批量获取完整网页内容
+            if FETCH_FULL_TEXT:
+                await ArticleModel.afetch_full_texts(articles, request_id)
+            
+            logger.info(f"[{request_id}] 成功获取到 {len(articles)} 篇文章")
+            return articles
+            
+        except httpx.HTTPError as e:
+            logger.error(f"[{request_id}] 异步调用News API失败: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"[{request_id}] 处理News API响应失败: {str(e)}")
+            raise
+    
+    @span("news.dedup")
+    def _filter_near_duplicates(self, articles: List[ArticleModel], request_id: str) -> List[ArticleModel]:
+        """
+        基于标题和描述的MinHash签名过滤近似重复的文章，每组只保留排在最前的一篇
+        
+        文章库中已有且标题、描述未变化的文章直接复用保存的签名，新计算的签名写回文章库
+        
+        Args:
+            articles: 文章模型列表，顺序即保留的优先级
+            request_id: 请求ID，用于日志追踪
+            
+        Returns:
+            过滤后的文章模型列表
+        """
+        if not ARTICLE_DEDUP_ENABLED or len(articles) <= 1:
+            return articles
+        
+        stored = db_service.get_article_signatures([article.url for article in articles if not article.minhash])
+        signatures = [dedup_service.decode_signature(article.minhash) for article in articles]
+        for index, article in enumerate(articles):
+            row = stored.get(article.url)
+            if signatures[index] is None and row and row["title"] == article.title and row["description"] == article.description:
+                signatures[index] = dedup_service.decode_signature(row["minhash"])
+        
+        missing = [index for index, signature in enumerate(signatures) if signature is None]
+        if missing:
+            computed = dedup_service.minhash_signatures([
+                f"{articles[index].title or ''}\n{articles[index].description or ''}" for index in missing
+            ])
+            for index, signature in zip(missing, computed):
+                signatures[index] = signature
+            # 只更新文章库中已存在的文章，新文章的签名随文章一起保存
+            db_service.save_article_signatures({
+                articles[index].url: dedup_service.encode_signature(signatures[index])
+                for index in missing if articles[index].url in stored
+            })
+        
+        for article, signature in zip(articles, signatures):
+            article.minhash = dedup_service.encode_signature(signature)
+        
+        keep = dedup_service.find_near_duplicates(np.stack(signatures), ARTICLE_DEDUP_THRESHOLD)
+        if len(keep) < len(articles):
+            logger.info(f"[{request_id}] 过滤近似重复文章 {len(articles) - len(keep)} 篇，保留 {len(keep)} 篇")
+        return [articles[index] for index in keep]
+    
+    async def aclose(self) -> None:
+        """关闭异步HTTP客户端，在应用关闭时调用"""
+        client, loop = self._async_client, self._async_loop
+        self._async_client = None
+        self._async_loop = None
+        if client is None:
+            return
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            discard_async_client(client, loop)
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环的异步HTTP客户端，事件循环变化时关闭旧客户端并重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                discard_async_client(self._async_client, self._async_loop)
+            self._async_client = httpx.AsyncClient()
+            self._async_loop = loop
+        return self._async_client
+    
+    @staticmethod
+    def _parse_articles(articles_data: List[dict]) -> List[ArticleModel]:
+        """将News API返回的文章数据转换为ArticleModel对象"""
+        return [
+            ArticleModel(
+                title=article_data.get("title"),
+                description=article_data.get("description"),
+                content=article_data.get("content"),
+                url=article_data.get("url"),
+                source=(article_data.get("source") or {}).get("name")
+            )
+            for article_data in articles_data
+        ]
+    
     def get_articles_from_mock(self, file_path: str, request_id: str) -> List[ArticleModel]:
         """
         从本地mock文件获取文章数据（用于测试）
@@ -94,11 +335,15 @@ class NewsService:
                         url=article_data.get("url"),
                         source=article_data.get("source", {}).get("name")
                     )
-                    # 根据配置决定是否调用fetch_full_text获取完整网页内容
-                    if FETCH_FULL_TEXT:
-                        article.fetch_full_text(request_id)
                     articles.append(article)
                 
+                # 在爬取网页和调用LLM之前过滤近似重复的文章
+                articles = self._filter_near_duplicates(articles, request_id)
+                
+                # 根据配置决定是否批量获取完整网页内容
+                if FETCH_FULL_TEXT:
+                    ArticleModel.fetch_full_texts(articles, request_id)
+                
                 logger.info(f"[{request_id}] 从mock文件成功获取到 {len(articles)} 篇文章")
                 return articles
         except Exception as e:
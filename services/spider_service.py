@@ -1,12 +1,35 @@
 # 爬虫服务 - 负责获取网页内容
 
+import asyncio
+import httpx
 import requests
 import json
-from typing import Optional
-from core.config import logger
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from core.config import (
+    logger, SPIDER_MAX_WORKERS, SPIDER_PER_HOST_LIMIT, SPIDER_BATCH_DEADLINE, SPIDER_POOL_MAXSIZE,
+    SPIDER_FRESHNESS_SECONDS, SPIDER_DOMAIN_FRESHNESS
+)
+from core.profiling import span, propagate_context
 from requests.adapters import HTTPAdapter
+from requests.compat import chardet
 from urllib3.util.retry import Retry
 
+
+def discard_async_client(client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """
+    关闭被替换的异步HTTP客户端
+
+    客户端的连接绑定在创建它的事件循环上，只能在该循环中关闭：循环仍在运行时提交到该循环异步关闭；
+    循环已结束时无法再执行关闭，连接随客户端对象回收时释放
+    """
+    if loop is not None and loop.is_running() and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
 class SpiderService:
     """爬虫服务类，负责获取网页内容"""
     
@@ -19,7 +42,8 @@ class SpiderService:
             backoff_factor=0.3,
             status_forcelist=[500, 502, 503, 504]
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        # 连接池在批量并发爬取时共享，每个主机最多保持SPIDER_POOL_MAXSIZE个连接
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=SPIDER_POOL_MAXSIZE, pool_maxsize=SPIDER_POOL_MAXSIZE)
         self.session.mount('http://', adapter)
         self.session.mount('https://', adapter)
         
@@ -30,6 +54,18 @@ class SpiderService:
             'Accept-Language': 'zh-CN,zh;q=0.9',
             'Connection': 'keep-alive'
         }
+        
+        # 按主机限制并发请求数
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+        
+        # 异步客户端绑定创建时的事件循环，在首次异步爬取时创建
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop = None
+        
+        # 异步爬取的主机信号量同样绑定事件循环，在同一循环的多次调用间共享
+        self._async_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._async_semaphore_loop = None
     
     def get_page_content(self, url: str, request_id: str = "", timeout: int = 10) -> Optional[str]:
         """
@@ -43,13 +79,58 @@ class SpiderService:
         Returns:
             网页内容字符串，如果失败则返回None
         """
+        page = self.fetch_page(url, request_id, timeout)
+        return page["content"] if page else None
+    
+    @span("spider.fetch_page")
+    def fetch_page(self, url: str, request_id: str = "", timeout: int = 10,
+                   validator: Optional[dict] = None) -> Optional[dict]:
+        """
+        获取指定URL的网页，提供缓存校验信息时发送条件请求
+        
+        Args:
+            url: 要爬取的网页URL
+            request_id: 请求ID，用于日志追踪
+            timeout: 请求超时时间（秒）
+            validator: 上次获取时记录的校验信息，包含etag和last_modified字段
+            
+        Returns:
+            包含status、content、etag、last_modified的字典，status为304时content为None；
+            如果失败则返回None
+        """
         try:
             logger.info(f"[{request_id}] 开始爬取网页: {url}")
             
+            # 携带上次的校验信息发送条件请求
+            headers = dict(self.headers)
+            if validator:
+                if validator.get("etag"):
+                    headers["If-None-Match"] = validator["etag"]
+                if validator.get("last_modified"):
+                    headers["If-Modified-Since"] = validator["last_modified"]
+            
             # 发送请求获取网页内容
-            response = self.session.get(url, headers=self.headers, timeout=timeout)
+            response = self.session.get(url, headers=headers, timeout=timeout)
             response.raise_for_status()  # 抛出HTTP错误
             
+            page = {
+                "status": response.status_code,
+                "content": None,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+            
+            if response.status_code == 304:
+                if not validator:
+                    # 未发送条件请求却收到304，没有可沿用的缓存内容
+                    logger.warning(f"[{request_id}] 未携带校验信息却收到304响应，视为获取失败: {url}")
+                    return None
+                # 网页未修改，沿用原有校验信息
+                page["etag"] = page["etag"] or validator.get("etag")
+                page["last_modified"] = page["last_modified"] or validator.get("last_modified")
+                logger.info(f"[{request_id}] 网页未修改，使用缓存内容: {url}")
+                return page
+            
             # 根据响应头设置编码
             if 'charset' in response.headers.get('content-type', '').lower():
                 response.encoding = response.apparent_encoding
@@ -58,7 +139,8 @@ class SpiderService:
             logger.info(f"{content[:500]}")
             logger.info(f"[{request_id}] 成功获取网页内容，大小: {len(content)} 字符")
             
-            return content
+            page["content"] = content
+            return page
             
         except requests.exceptions.RequestException as e:
             logger.error(f"[{request_id}] 爬取网页失败: {str(e)}, URL: {url}")
@@ -67,6 +149,232 @@ class SpiderService:
             logger.error(f"[{request_id}] 处理网页内容时发生错误: {str(e)}, URL: {url}")
             return None
     
+    def get_pages_content(self, urls: List[str], request_id: str = "", timeout: int = 10,
+                          deadline: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """
+        并发获取多个URL的网页内容，参数与fetch_pages一致
+        
+        Returns:
+            以URL为键的网页内容字典，失败或超时的URL值为None
+        """
+        pages = self.fetch_pages(urls, request_id, timeout=timeout, deadline=deadline)
+        return {url: page["content"] if page else None for url, page in pages.items()}
+    
+    @span("spider.fetch_pages")
+    def fetch_pages(self, urls: List[str], request_id: str = "", timeout: int = 10,
+                    deadline: Optional[float] = None, validators: Optional[Dict[str, dict]] = None) -> Dict[str, Optional[dict]]:
+        """
+        并发获取多个URL的网页
+        
+        同一主机的并发请求数不超过SPIDER_PER_HOST_LIMIT，整体耗时不超过deadline，
+        截止时仍未完成的URL结果为None，不再等待
+        
+        Args:
+            urls: 要爬取的网页URL列表
+            request_id: 请求ID，用于日志追踪
+            timeout: 单个请求超时时间（秒）
+            deadline: 整批爬取的截止时间（秒），默认使用配置SPIDER_BATCH_DEADLINE
+            validators: 以URL为键的缓存校验信息，存在时对该URL发送条件请求
+            
+        Returns:
+            以URL为键的网页字典（格式同fetch_page），失败或超时的URL值为None
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+        
+        validators = validators or {}
+        deadline = SPIDER_BATCH_DEADLINE if deadline is None else deadline
+        expires_at = time.monotonic() + deadline
+        logger.info(f"[{request_id}] 开始并发爬取 {len(urls)} 个网页，截止时间: {deadline} 秒")
+        
+        def fetch(url: str) -> Optional[dict]:
+            with self._get_host_semaphore(url):
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    return None
+                return self.fetch_page(url, request_id, timeout=min(timeout, remaining), validator=validators.get(url))
+        
+        executor = ThreadPoolExecutor(max_workers=min(SPIDER_MAX_WORKERS, len(urls)))
+        try:
+            futures = {executor.submit(propagate_context(fetch), url): url for url in urls}
+            done, not_done = wait(futures, timeout=deadline)
+        finally:
+            # 不等待超时的请求结束，尚未开始的请求直接取消
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = {url: None for url in urls}
+        for future in done:
+            results[futures[future]] = future.result()
+        
+        if not_done:
+            logger.warning(f"[{request_id}] {len(not_done)} 个网页在截止时间内未完成爬取")
+        logger.info(f"[{request_id}] 并发爬取完成，成功 {sum(1 for page in results.values() if page)}/{len(urls)}")
+        return results
+    
+    async def afetch_page(self, url: str, request_id: str = "", timeout: float = 10,
+                          validator: Optional[dict] = None) -> Optional[dict]:
+        """
+        异步获取指定URL的网页，参数和返回值与fetch_page一致
+        """
+        try:
+            logger.info(f"[{request_id}] 开始异步爬取网页: {url}")
+            
+            # 携带上次的校验信息发送条件请求
+            headers = dict(self.headers)
+            if validator:
+                if validator.get("etag"):
+                    headers["If-None-Match"] = validator["etag"]
+                if validator.get("last_modified"):
+                    headers["If-Modified-Since"] = validator["last_modified"]
+            
+            with span("spider.fetch_page"):
+                response = await self._get_async_client().get(url, headers=headers, timeout=timeout)
+            if response.status_code != 304:
+                response.raise_for_status()  # 抛出HTTP错误，httpx对304同样会抛出
+            
+            page = {
+                "status": response.status_code,
+                "content": None,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            }
+            
+            if response.status_code == 304:
+                if not validator:
+                    # 未发送条件请求却收到304，没有可沿用的缓存内容
+                    logger.warning(f"[{request_id}] 未携带校验信息却收到304响应，视为获取失败: {url}")
+                    return None
+                # 网页未修改，沿用原有校验信息
+                page["etag"] = page["etag"] or validator.get("etag")
+                page["last_modified"] = page["last_modified"] or validator.get("last_modified")
+                logger.info(f"[{request_id}] 网页未修改，使用缓存内容: {url}")
+                return page
+            
+            # 与同步版本一致，根据响应头设置编码
+            if 'charset' in response.headers.get('content-type', '').lower():
+                response.encoding = chardet.detect(response.content)["encoding"] or response.encoding
+            
+            page["content"] = response.text
+            logger.info(f"[{request_id}] 成功异步获取网页内容，大小: {len(page['content'])} 字符")
+            return page
+            
+        except httpx.HTTPError as e:
+            logger.error(f"[{request_id}] 异步爬取网页失败: {str(e)}, URL: {url}")
+            return None
+        except Exception as e:
+            logger.error(f"[{request_id}] 处理网页内容时发生错误: {str(e)}, URL: {url}")
+            return None
+    
+    async def afetch_pages(self, urls: List[str], request_id: str = "", timeout: float = 10,
+                           deadline: Optional[float] = None, validators: Optional[Dict[str, dict]] = None) -> Dict[str, Optional[dict]]:
+        """
+        异步并发获取多个URL的网页，参数、并发限制和返回值与fetch_pages一致
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+        
+        validators = validators or {}
+        deadline = SPIDER_BATCH_DEADLINE if deadline is None else deadline
+        logger.info(f"[{request_id}] 开始异步并发爬取 {len(urls)} 个网页，截止时间: {deadline} 秒")
+        
+        # 总并发数按调用限制，与fetch_pages的线程池一致；主机并发数在同一事件循环的所有调用间共享
+        semaphore = asyncio.Semaphore(SPIDER_MAX_WORKERS)
+        
+        async def fetch(url: str) -> Optional[dict]:
+            async with semaphore, self._get_async_host_semaphore(url):
+                return await self.afetch_page(url, request_id, timeout=timeout, validator=validators.get(url))
+        
+        tasks = {asyncio.ensure_future(fetch(url)): url for url in urls}
+        with span("spider.fetch_pages"):
+            done, not_done = await asyncio.wait(tasks, timeout=deadline)
+        for task in not_done:
+            task.cancel()
+        
+        results = {url: None for url in urls}
+        for task in done:
+            results[tasks[task]] = task.result()
+        
+        if not_done:
+            logger.warning(f"[{request_id}] {len(not_done)} 个网页在截止时间内未完成爬取")
+        logger.info(f"[{request_id}] 异步并发爬取完成，成功 {sum(1 for page in results.values() if page)}/{len(urls)}")
+        return results
+    
+    async def aclose(self) -> None:
+        """关闭异步HTTP客户端，在应用关闭时调用"""
+        client, loop = self._async_client, self._async_loop
+        self._async_client = None
+        self._async_loop = None
+        self._async_host_semaphores = {}
+        self._async_semaphore_loop = None
+        if client is None:
+            return
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            discard_async_client(client, loop)
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环的异步HTTP客户端，事件循环变化时关闭旧客户端并重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                discard_async_client(self._async_client, self._async_loop)
+            # 传输层重试仅覆盖连接失败，与同步会话的Retry配置相比不重试5xx响应
+            transport = httpx.AsyncHTTPTransport(
+                retries=3,
+                limits=httpx.Limits(max_connections=SPIDER_POOL_MAXSIZE, max_keepalive_connections=SPIDER_POOL_MAXSIZE)
+            )
+            self._async_client = httpx.AsyncClient(follow_redirects=True, transport=transport)
+            self._async_loop = loop
+        return self._async_client
+    
+    def is_fresh(self, url: str, validator: Optional[dict]) -> bool:
+        """
+        根据域名新鲜度策略判断缓存的网页是否仍可直接使用，无需重新校验
+        
+        Args:
+            url: 网页URL
+            validator: 缓存校验信息，需包含checked_at字段（ISO格式的上次校验时间）
+            
+        Returns:
+            缓存是否新鲜
+        """
+        if not validator or not validator.get("checked_at"):
+            return False
+        
+        checked_at = datetime.fromisoformat(validator["checked_at"])
+        return datetime.now() - checked_at < timedelta(seconds=self._get_freshness(url))
+    
+    @staticmethod
+    def _get_freshness(url: str) -> int:
+        """获取URL所属域名的新鲜期（秒），按域名后缀匹配SPIDER_DOMAIN_FRESHNESS"""
+        host = urlparse(url).hostname or ""
+        for domain, seconds in SPIDER_DOMAIN_FRESHNESS.items():
+            if host == domain or host.endswith("." + domain):
+                return seconds
+        return SPIDER_FRESHNESS_SECONDS
+    
+    def _get_host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """获取URL所属主机的并发信号量"""
+        host = urlparse(url).netloc
+        with self._host_lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(SPIDER_PER_HOST_LIMIT)
+            return self._host_semaphores[host]
+    
+    def _get_async_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """获取URL所属主机在当前事件循环中的并发信号量，事件循环变化时重新创建"""
+        loop = asyncio.get_running_loop()
+        if self._async_semaphore_loop is not loop:
+            self._async_host_semaphores = {}
+            self._async_semaphore_loop = loop
+        host = urlparse(url).netloc
+        if host not in self._async_host_semaphores:
+            self._async_host_semaphores[host] = asyncio.Semaphore(SPIDER_PER_HOST_LIMIT)
+        return self._async_host_semaphores[host]
+    
     def get_json_content(self, url: str, request_id: str = "", timeout: int = 10) -> Optional[dict]:
         """
         获取指定URL的JSON内容
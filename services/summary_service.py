@@ -1,19 +1,163 @@
 # 摘要服务 - 负责使用大模型生成文本摘要
 
-from typing import List
-from transformers import pipeline
-from core.config import MODEL_PATH, SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH, logger
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import os
+from typing import Callable, List, Optional
+from transformers import pipeline, AutoModelForSeq2SeqLM, AutoTokenizer
+from core.config import (
+    MODEL_PATH, SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH, logger,
+    SUMMARY_MAP_REDUCE, SUMMARY_CHUNK_TOKENS, SUMMARY_PARTIAL_MAX_LENGTH, SUMMARY_BATCH_SIZE, SUMMARY_MAX_REDUCE_LEVELS,
+    WARMUP_TEXT, SUMMARY_MICRO_BATCHING, SUMMARY_BATCH_WAIT_MS,
+    SUMMARY_BACKEND, SUMMARY_USE_FAST_TOKENIZER, SUMMARY_TORCH_THREADS, SUMMARY_ONNX_PATH,
+    SUMMARY_PROCESS_WORKERS
+)
+from services.inference_pool import InferenceProcessPool
+from core.profiling import span
+
+class MicroBatcher:
+    """
+    动态微批处理队列：在短时间窗口内收集并发请求，合并为一个批次调用模型后将结果分发给各调用方
+    
+    生成参数不同的请求不会合并到同一次调用中
+    """
+    
+    def __init__(self, run_batch: Callable[..., List[dict]], max_batch_size: int, max_wait_ms: float, workers: int = 1):
+        """
+        初始化微批处理队列
+        
+        Args:
+            run_batch: 批量推理函数，接收文本列表和生成参数，返回与文本一一对应的结果列表
+            max_batch_size: 每批最多合并的文本数
+            max_wait_ms: 收到首个请求后等待更多请求的最长时间（毫秒）
+            workers: 并行组批和推理的工作线程数，推理在多个进程中运行时应与进程数一致
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.workers = workers
+        self._queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+    
+    def submit(self, texts: List[str], **kwargs) -> List[dict]:
+        """
+        提交一组文本并阻塞等待结果
+        
+        Args:
+            texts: 待推理的文本列表
+            **kwargs: 生成参数
+            
+        Returns:
+            与texts一一对应的结果列表
+            
+        Raises:
+            Exception: 当所在批次推理失败时
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((texts, kwargs, future))
+        return future.result()
+    
+    def _ensure_worker(self) -> None:
+        """首次提交时启动后台工作线程"""
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.workers:
+                worker = threading.Thread(target=self._run, name=f"summary-micro-batcher-{len(self._workers)}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+    
+    def _run(self) -> None:
+        """后台工作线程：收集请求、按生成参数分组并批量推理，单个批次出错时只让该批次的请求失败"""
+        while True:
+            batch = self._collect_batch()
+            try:
+                self._process_batch(batch)
+            except Exception as e:
+                logger.error(f"微批处理失败，合并请求数: {len(batch)}, 错误: {str(e)}")
+                for item in batch:
+                    if not item[2].done():
+                        item[2].set_exception(e)
+    
+    def _collect_batch(self) -> list:
+        """阻塞等待首个请求，之后在等待窗口内继续收集，直到达到批大小"""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        expires_at = time.monotonic() + self.max_wait_ms / 1000
+        
+        while size < self.max_batch_size:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+    
+    def _process_batch(self, batch: list) -> None:
+        """
+        按生成参数分组，同组请求合并为一次调用并将结果分发给各请求
+        
+        Raises:
+            Exception: 当分组失败时；单组推理失败只设置该组请求的异常
+        """
+        groups = {}
+        for item in batch:
+            groups.setdefault(tuple(sorted(item[1].items())), []).append(item)
+        
+        for key, items in groups.items():
+            texts = [text for item in items for text in item[0]]
+            try:
+                results = self.run_batch(texts, **dict(key))
+                if len(results) != len(texts):
+                    raise ValueError(f"批量推理结果数 {len(results)} 与文本数 {len(texts)} 不一致")
+            except Exception as e:
+                for item in items:
+                    item[2].set_exception(e)
+                continue
+            
+            logger.debug(f"微批处理完成，合并请求数: {len(items)}, 文本数: {len(texts)}")
+            offset = 0
+            for item in items:
+                item[2].set_result(results[offset:offset + len(item[0])])
+                offset += len(item[0])
 
 class SummaryService:
     """摘要服务类，负责加载模型并生成文本摘要"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None, process_workers: Optional[int] = None):
+        """
+        初始化摘要服务
+        
+        Args:
+            backend: 推理后端，可选eager、int8、compile、onnx，默认使用配置SUMMARY_BACKEND
+            process_workers: 推理进程数，为0时在当前进程内推理，默认使用配置SUMMARY_PROCESS_WORKERS
+        """
         self.model_path = MODEL_PATH
+        self.backend = backend or SUMMARY_BACKEND
         self.summarizer = None
+        self.tokenizer = None
+        self.warmed_up = False
+        self._load_lock = threading.Lock()
+        
+        process_workers = SUMMARY_PROCESS_WORKERS if process_workers is None else process_workers
+        self.pool = InferenceProcessPool(process_workers, self.backend) if process_workers > 0 else None
+        self.batcher = MicroBatcher(
+            self._run_batch,
+            max_batch_size=SUMMARY_BATCH_SIZE,
+            max_wait_ms=SUMMARY_BATCH_WAIT_MS,
+            workers=max(1, process_workers)
+        )
     
     def load_model(self, request_id: str) -> None:
         """
-        加载摘要模型
+        加载摘要模型，并发调用时只加载一次
         
         Args:
             request_id: 请求ID，用于日志追踪
@@ -21,20 +165,123 @@ class SummaryService:
         Raises:
             Exception: 当模型加载失败时
         """
+        if self.summarizer is not None or (self.pool is not None and self.tokenizer is not None):
+            return
+        
+        with self._load_lock:
+            self._load_model(request_id)
+    
+    def _load_model(self, request_id: str) -> None:
+        """加载摘要模型的内部方法，调用方需持有_load_lock"""
+        if self.pool is not None:
+            # 模型在推理进程中加载，当前进程只需tokenizer用于分块
+            if self.tokenizer is None:
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, use_fast=SUMMARY_USE_FAST_TOKENIZER)
+                self.pool.start(request_id)
+            return
+        
         if self.summarizer is None:
             logger.info(f"[{request_id}] 正在加载摘要模型...")
             try:
-                self.summarizer = pipeline(
-                    "summarization", 
-                    model=self.model_path, 
-                    tokenizer=self.model_path, 
-                    use_fast=False
-                )
-                logger.info(f"[{request_id}] 模型加载成功")
+                if SUMMARY_TORCH_THREADS:
+                    import torch
+                    torch.set_num_threads(SUMMARY_TORCH_THREADS)
+                
+                if self.backend == "eager":
+                    self.summarizer = self._load_eager_pipeline()
+                else:
+                    try:
+                        self.summarizer = self._load_optimized_pipeline(request_id)
+                    except Exception as e:
+                        # 优化后端不可用时回退到默认后端
+                        logger.error(f"[{request_id}] {self.backend}推理后端加载失败，回退到eager: {str(e)}")
+                        self.backend = "eager"
+                        self.summarizer = self._load_eager_pipeline()
+                logger.info(f"[{request_id}] 模型加载成功，推理后端: {self.backend}")
             except Exception as e:
                 logger.error(f"[{request_id}] 模型加载失败: {str(e)}")
                 raise
     
+    def _load_eager_pipeline(self):
+        """以默认的fp32 eager模式加载摘要pipeline"""
+        return pipeline(
+            "summarization", 
+            model=self.model_path, 
+            tokenizer=self.model_path, 
+            use_fast=SUMMARY_USE_FAST_TOKENIZER
+        )
+    
+    def _load_optimized_pipeline(self, request_id: str):
+        """
+        按self.backend加载优化后的摘要pipeline
+        
+        int8: 对Linear层进行动态int8量化
+        compile: 使用torch.compile编译模型前向计算
+        onnx: 导出为ONNX并使用ONNX Runtime推理，导出结果缓存在SUMMARY_ONNX_PATH
+        
+        Raises:
+            ValueError: 当后端名称未知时
+            ImportError: 当后端依赖未安装时
+        """
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path, use_fast=SUMMARY_USE_FAST_TOKENIZER)
+        
+        if self.backend == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            except ImportError:
+                raise ImportError("onnx推理后端需要安装optimum[onnxruntime]")
+            
+            if os.path.isdir(SUMMARY_ONNX_PATH) and os.listdir(SUMMARY_ONNX_PATH):
+                logger.info(f"[{request_id}] 加载已缓存的ONNX模型: {SUMMARY_ONNX_PATH}")
+                model = ORTModelForSeq2SeqLM.from_pretrained(SUMMARY_ONNX_PATH)
+            else:
+                logger.info(f"[{request_id}] 导出ONNX模型到: {SUMMARY_ONNX_PATH}")
+                model = ORTModelForSeq2SeqLM.from_pretrained(self.model_path, export=True)
+                model.save_pretrained(SUMMARY_ONNX_PATH)
+                tokenizer.save_pretrained(SUMMARY_ONNX_PATH)
+            return pipeline("summarization", model=model, tokenizer=tokenizer)
+        
+        import torch
+        model = AutoModelForSeq2SeqLM.from_pretrained(self.model_path)
+        model.eval()
+        
+        if self.backend == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif self.backend == "compile":
+            model.forward = torch.compile(model.forward, dynamic=True)
+        else:
+            raise ValueError(f"未知的推理后端: {self.backend}")
+        
+        return pipeline("summarization", model=model, tokenizer=tokenizer)
+    
+    def warm_up(self, request_id: str = "startup") -> None:
+        """
+        预加载摘要模型并执行一次预热推理，使首个请求无需等待模型加载
+        
+        Args:
+            request_id: 请求ID，用于日志追踪
+            
+        Raises:
+            Exception: 当模型加载或预热推理失败时
+        """
+        self.load_model(request_id)
+        
+        if self.pool is not None:
+            # 上次加载失败的工作进程已退出，重试时重新启动
+            if self.pool.load_failed:
+                self.pool.restart(request_id)
+            # 各推理进程在启动时自行预热
+            self.pool.wait_ready()
+            self.warmed_up = True
+            logger.info(f"[{request_id}] 推理进程预热完成")
+            return
+        
+        logger.info(f"[{request_id}] 开始模型预热推理...")
+        self.summarizer(WARMUP_TEXT, max_length=16, min_length=1, do_sample=False)
+        self.warmed_up = True
+        logger.info(f"[{request_id}] 模型预热完成")
+    
+    @span("summarizer.generate")
     def generate_summary(self, articles: List[dict], request_id: str) -> str:
         """
         为一组文章生成摘要
@@ -54,11 +301,13 @@ class SummaryService:
         
         # 准备用于摘要的文本
         full_text = ""
+        texts = []
         for idx, article in enumerate(articles):
             try:
                 content = article.get("description", "")
                 if content:
                     full_text += content + "\n\n"
+                    texts.append(content)
                     logger.debug(f"[{request_id}] 成功处理文章 {idx+1}/{len(articles)}")
             except Exception as e:
                 logger.warning(f"[{request_id}] 处理文章 {idx+1} 时出错: {str(e)}")
@@ -70,22 +319,132 @@ class SummaryService:
         
         logger.info(f"[{request_id}] 准备摘要的文本长度: {len(full_text)} 字符")
         
+        # 超出模型输入窗口时先分块摘要，再对部分摘要进行总结
+        if SUMMARY_MAP_REDUCE and self._count_tokens([full_text])[0] > SUMMARY_CHUNK_TOKENS:
+            full_text = self._map_reduce(texts, request_id)
+        
         # 生成摘要
         logger.info(f"[{request_id}] 开始生成摘要...")
         try:
-            summary_result = self.summarizer(
-                full_text, 
+            summary_result = self._summarize(
+                [full_text], 
                 max_length=SUMMARY_MAX_LENGTH, 
                 min_length=SUMMARY_MIN_LENGTH, 
-                do_sample=False
+                do_sample=False,
+                truncation=True
             )
             
             final_summary = summary_result[0]['summary_text']
             logger.info(f"[{request_id}] 摘要生成成功，摘要长度: {len(final_summary)} 字符")
+            # 启动预热失败时，首个成功的请求已完成模型加载和推理，视为预热完成
+            self.warmed_up = True
             return final_summary
         except Exception as e:
             logger.error(f"[{request_id}] 摘要生成失败: {str(e)}")
             raise
 
+    def _summarize(self, texts: List[str], **kwargs) -> List[dict]:
+        """
+        对一组文本执行摘要推理，开启微批处理时与其他并发请求合并为同一批次
+        
+        Args:
+            texts: 待摘要的文本列表
+            **kwargs: 生成参数
+            
+        Returns:
+            与texts一一对应的摘要结果列表
+        """
+        if SUMMARY_MICRO_BATCHING:
+            return self.batcher.submit(texts, **kwargs)
+        return self._run_batch(texts, **kwargs)
+    
+    def _run_batch(self, texts: List[str], **kwargs) -> List[dict]:
+        """调用模型批量推理，开启推理进程池时交给工作进程执行"""
+        with span("summarizer.inference"):
+            if self.pool is not None:
+                return self.pool.submit(texts, batch_size=SUMMARY_BATCH_SIZE, **kwargs)
+            return self.summarizer(texts, batch_size=SUMMARY_BATCH_SIZE, **kwargs)
+    
+    def close(self) -> None:
+        """关闭推理进程池"""
+        if self.pool is not None:
+            self.pool.close()
+    
+    def _map_reduce(self, texts: List[str], request_id: str) -> str:
+        """
+        将文本按token数分块，以一次批量调用生成各块摘要，重复直到结果可放入单个分块
+        
+        Args:
+            texts: 待摘要的文本列表
+            request_id: 请求ID，用于日志追踪
+            
+        Returns:
+            不超过一个分块长度的合并文本，供最终摘要使用
+        """
+        for level in range(SUMMARY_MAX_REDUCE_LEVELS):
+            chunks = self._chunk_texts(texts)
+            if len(chunks) <= 1:
+                break
+            
+            logger.info(f"[{request_id}] 第 {level+1} 轮分块摘要，分块数: {len(chunks)}")
+            partial_results = self._summarize(
+                chunks,
+                max_length=SUMMARY_PARTIAL_MAX_LENGTH,
+                min_length=min(SUMMARY_MIN_LENGTH, SUMMARY_PARTIAL_MAX_LENGTH),
+                do_sample=False,
+                truncation=True
+            )
+            texts = [result['summary_text'] for result in partial_results]
+        
+        return "\n\n".join(texts)
+    
+    def _chunk_texts(self, texts: List[str]) -> List[str]:
+        """
+        按tokenizer计数将文本贪心打包为不超过SUMMARY_CHUNK_TOKENS的分块，超长文本按token切分
+        
+        Args:
+            texts: 文本列表
+            
+        Returns:
+            分块文本列表
+        """
+        tokenizer = self._get_tokenizer()
+        chunks = []
+        current_texts = []
+        current_tokens = 0
+        
+        for text, token_ids in zip(texts, tokenizer(texts, add_special_tokens=False)["input_ids"]):
+            if len(token_ids) > SUMMARY_CHUNK_TOKENS:
+                # 单篇超长文本独立切分为多个分块
+                pieces = [
+                    tokenizer.decode(token_ids[start:start + SUMMARY_CHUNK_TOKENS], skip_special_tokens=True)
+                    for start in range(0, len(token_ids), SUMMARY_CHUNK_TOKENS)
+                ]
+                token_counts = [min(SUMMARY_CHUNK_TOKENS, len(token_ids) - start) for start in range(0, len(token_ids), SUMMARY_CHUNK_TOKENS)]
+            else:
+                pieces = [text]
+                token_counts = [len(token_ids)]
+            
+            for piece, token_count in zip(pieces, token_counts):
+                if current_texts and current_tokens + token_count > SUMMARY_CHUNK_TOKENS:
+                    chunks.append("\n\n".join(current_texts))
+                    current_texts = []
+                    current_tokens = 0
+                current_texts.append(piece)
+                current_tokens += token_count
+        
+        if current_texts:
+            chunks.append("\n\n".join(current_texts))
+        
+        return chunks
+    
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """使用模型tokenizer统计每段文本的token数"""
+        return [len(token_ids) for token_ids in self._get_tokenizer()(texts, add_special_tokens=False)["input_ids"]]
+    
+    def _get_tokenizer(self):
+        """获取分块计数使用的tokenizer，进程内推理时使用pipeline自带的tokenizer"""
+        return self.summarizer.tokenizer if self.summarizer is not None else self.tokenizer
+
 # 创建单例实例供其他模块使用
 summary_service = SummaryService()
\ No newline at end of file
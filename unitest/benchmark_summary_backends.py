@@ -0,0 +1,143 @@
+# 摘要模型推理后端基准测试 - 对比各后端的延迟、内存和摘要质量
+#
+# 用法：python unitest/benchmark_summary_backends.py [--backends eager int8 compile onnx] [--runs 5]
+# 每个后端在独立子进程中运行，以便准确统计峰值内存；质量以与eager后端输出的字符二元组F1衡量
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MOCK_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mock", "mock_newsapi.json")
+
+
+def load_texts(count: int):
+    """从mock数据中读取文章描述作为测试输入"""
+    with open(MOCK_FILE, "r", encoding="utf-8") as f:
+        articles = json.load(f).get("articles", [])
+    return [article["description"] for article in articles if article.get("description")][:count]
+
+
+def bigram_f1(candidate: str, reference: str) -> float:
+    """计算两段文本的字符二元组F1，用于粗略衡量摘要一致性"""
+    candidate_bigrams = [candidate[i:i + 2] for i in range(len(candidate) - 1)]
+    reference_bigrams = [reference[i:i + 2] for i in range(len(reference) - 1)]
+    if not candidate_bigrams or not reference_bigrams:
+        return 0.0
+
+    remaining = list(reference_bigrams)
+    overlap = 0
+    for bigram in candidate_bigrams:
+        if bigram in remaining:
+            remaining.remove(bigram)
+            overlap += 1
+
+    precision = overlap / len(candidate_bigrams)
+    recall = overlap / len(reference_bigrams)
+    return 2 * precision * recall / (precision + recall) if overlap else 0.0
+
+
+def run_backend(backend: str, texts, runs: int, result_queue):
+    """在子进程中加载指定后端并测量延迟"""
+    from core.config import SUMMARY_MAX_LENGTH, SUMMARY_MIN_LENGTH
+    from services.summary_service import SummaryService
+
+    service = SummaryService(backend=backend)
+    load_start = time.perf_counter()
+    service.load_model(f"bench_{backend}")
+    load_time = time.perf_counter() - load_start
+
+    # 预热一次，排除编译和首次分配的开销
+    service.summarizer(texts[0], max_length=SUMMARY_MAX_LENGTH, min_length=SUMMARY_MIN_LENGTH, do_sample=False)
+
+    latencies = []
+    outputs = []
+    for run in range(runs):
+        for text in texts:
+            start = time.perf_counter()
+            result = service.summarizer(text, max_length=SUMMARY_MAX_LENGTH, min_length=SUMMARY_MIN_LENGTH, do_sample=False)
+            latencies.append(time.perf_counter() - start)
+            if run == 0:
+                outputs.append(result[0]["summary_text"])
+
+    result_queue.put({
+        "backend": service.backend,
+        "load_time": load_time,
+        "latencies": latencies,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "outputs": outputs,
+    })
+
+
+def collect_result(process, result_queue, timeout: float):
+    """等待子进程的结果，子进程异常退出或超时时返回None，避免主进程永久阻塞"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return result_queue.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                # 子进程正常退出前放入的结果可能仍在管道中
+                try:
+                    return result_queue.get(timeout=1)
+                except queue.Empty:
+                    return None
+
+    process.terminate()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="摘要模型推理后端基准测试")
+    parser.add_argument("--backends", nargs="+", default=["eager", "int8", "compile", "onnx"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--texts", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=1800, help="单个后端的最长运行时间（秒）")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts)
+    backends = ["eager"] + [backend for backend in args.backends if backend != "eager"]
+
+    results = []
+    failed = []
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        result_queue = context.Queue()
+        process = context.Process(target=run_backend, args=(backend, texts, args.runs, result_queue))
+        process.start()
+        result = collect_result(process, result_queue, args.timeout)
+        process.join()
+        if result is None:
+            failed.append((backend, process.exitcode))
+        else:
+            results.append((backend, result))
+
+    # eager后端失败时没有参照输出，不计算质量
+    reference = results[0][1]["outputs"] if results and results[0][0] == "eager" else None
+    print(f"{'后端':<10}{'加载(s)':>10}{'平均(ms)':>12}{'P50(ms)':>12}{'P95(ms)':>12}{'峰值内存(MB)':>16}{'质量F1':>10}")
+    for backend, result in results:
+        latencies = sorted(result["latencies"])
+        quality = statistics.mean(bigram_f1(output, ref) for output, ref in zip(result["outputs"], reference)) \
+            if reference else float("nan")
+        # 回退到eager的后端会显示实际使用的后端
+        name = backend if result["backend"] == backend else f"{backend}->{result['backend']}"
+        print(f"{name:<10}{result['load_time']:>10.2f}{statistics.mean(latencies) * 1000:>12.1f}"
+              f"{latencies[len(latencies) // 2] * 1000:>12.1f}{latencies[int(len(latencies) * 0.95)] * 1000:>12.1f}"
+              f"{result['peak_rss_mb']:>16.1f}{quality:>10.3f}")
+
+    for backend, exitcode in failed:
+        # 超时被终止时退出码为负的信号值
+        print(f"{backend:<10}运行失败，子进程退出码: {exitcode}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# 测试缓存服务
+
+from core.cache_service import LLMCacheService
+
+
+def test_llm_cache_database_is_created_on_first_use(tmp_path):
+    """测试构造LLM缓存服务时不创建数据库文件，首次使用时才建表"""
+    cache = LLMCacheService(db_path=str(tmp_path / "llm_cache.db"))
+    assert not any(tmp_path.iterdir())
+
+    assert cache.get("missing") is None
+    assert (tmp_path / "llm_cache.db").exists()
+    cache.connections.close_all()
@@ -1,7 +1,9 @@
 # 测试数据库服务功能
 
 import uuid
-from core.db_service import db_service
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from core.db_service import db_service, DatabaseService
 from core.models import ArticleModel
 
 
@@ -103,5 +105,158 @@ def test_database_persistence():
     print("\n测试完成！")
 
 
+
+def test_connection_pragmas_and_concurrent_writes(tmp_path):
+    """测试连接池的PRAGMA设置以及多线程并发读写"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    with service.connections.get_connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+    
+    # 归还的连接被后续借用复用
+    with service.connections.get_connection() as reused:
+        assert reused is conn
+    
+    def save(index):
+        url = f"https://www.example.com/concurrent/{index}"
+        assert service.save_article({'url': url, 'title': f'标题{index}', 'full_text': f'全文{index}'})
+        return service.check_article_exists(url)['full_text']
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        full_texts = list(executor.map(save, range(40)))
+    
+    assert full_texts == [f'全文{index}' for index in range(40)]
+    service.close()
+
+
+
+def test_bulk_save_and_lookup(tmp_path):
+    """测试批量保存（插入与更新）和批量查询"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    urls = [f"https://www.example.com/bulk/{index}" for index in range(3)]
+    
+    assert service.save_articles([
+        {'url': urls[0], 'title': '标题0', 'full_text': '全文0'},
+        {'url': urls[1], 'title': '标题1'},
+    ])
+    original_id = service.check_article_exists(urls[0])['id']
+    
+    # 第二次保存更新已有文章并插入新文章
+    assert service.save_articles([
+        {'url': urls[0], 'title': '新标题0', 'full_text': '新全文0'},
+        {'url': urls[1], 'title': '标题1', 'full_text': '全文1'},
+        {'url': urls[2], 'title': '标题2'},
+    ])
+    
+    articles = service.get_articles_by_urls(urls + ["https://www.example.com/missing"])
+    assert set(articles) == set(urls)
+    assert articles[urls[0]]['id'] == original_id
+    assert articles[urls[0]]['title'] == '新标题0'
+    assert articles[urls[0]]['full_text'] == '新全文0'
+    assert articles[urls[1]]['full_text'] == '全文1'
+    assert articles[urls[2]]['full_text'] is None
+    
+    with service.connections.get_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM full_texts').fetchone()[0] == 2
+    service.close()
+
+
+def test_topic_search_uses_fts_index(tmp_path):
+    """测试主题搜索走全文索引、随数据变更同步并按相关度排序"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    
+    service.save_articles([
+        {'url': 'https://www.example.com/fts/1', 'title': '市场周报', 'description': '人工智能板块上涨'},
+        {'url': 'https://www.example.com/fts/2', 'title': '人工智能产业发展报告', 'description': '人工智能'},
+        {'url': 'https://www.example.com/fts/3', 'title': '环境保护', 'description': '无关内容'},
+    ])
+    # 全文索引在首次使用数据库时创建
+    assert service.fts_enabled
+    service.save_article({'url': 'https://www.example.com/fts/4', 'title': '快讯', 'full_text': '正文提到人工智能'})
+    
+    titles = [article['title'] for article in service.get_articles_by_topic('人工智能')]
+    assert titles[0] == '人工智能产业发展报告'
+    assert set(titles) == {'人工智能产业发展报告', '市场周报', '快讯'}
+    
+    # 更新后索引同步
+    service.save_article({'url': 'https://www.example.com/fts/1', 'title': '市场周报', 'description': '板块回调'})
+    titles = [article['title'] for article in service.get_articles_by_topic('人工智能')]
+    assert '市场周报' not in titles
+    
+    # 少于3个字符时使用二元分词索引
+    assert [article['title'] for article in service.get_articles_by_topic('环境')] == ['环境保护']
+    service.close()
+
+
+def test_short_topic_search_uses_bigram_index(tmp_path):
+    """测试两个字的主题走二元分词索引并检索完整内容，单个汉字回退为包含完整内容的LIKE查询"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    
+    service.save_articles([
+        {'url': 'https://www.example.com/short/1', 'title': '芯片出口管制升级', 'description': '半导体'},
+        {'url': 'https://www.example.com/short/2', 'title': '市场快讯', 'description': '新能源汽车销量增长'},
+        {'url': 'https://www.example.com/short/3', 'title': 'AI芯片新品发布', 'description': '产品'},
+    ])
+    service.save_full_text('https://www.example.com/short/2', '正文提到国产芯片和猫')
+    assert service.bigram_enabled
+    
+    titles = {article['title'] for article in service.get_articles_by_topic('芯片')}
+    assert titles == {'芯片出口管制升级', '市场快讯', 'AI芯片新品发布'}
+    assert [article['title'] for article in service.get_articles_by_topic('AI')] == ['AI芯片新品发布']
+    
+    # 更新后索引同步
+    service.save_article({'url': 'https://www.example.com/short/1', 'title': '出口管制升级', 'description': '半导体'})
+    titles = {article['title'] for article in service.get_articles_by_topic('芯片')}
+    assert titles == {'市场快讯', 'AI芯片新品发布'}
+    
+    # 单个汉字无法由二字组匹配，LIKE查询同样检索完整内容
+    assert [article['title'] for article in service.get_articles_by_topic('猫')] == ['市场快讯']
+    
+    # 没有二元分词索引的旧数据库首次打开时回填已有文章
+    with service.connections.get_connection() as conn:
+        for event in ("insert", "update", "delete"):
+            conn.execute(f'DROP TRIGGER articles_bigram_{event}')
+            conn.execute(f'DROP TRIGGER full_texts_bigram_{event}')
+        conn.execute('DROP TABLE articles_bigram')
+    service.close()
+    reopened = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    assert {article['title'] for article in reopened.get_articles_by_topic('芯片')} == {'市场快讯', 'AI芯片新品发布'}
+    reopened.close()
+
+
+def test_connections_do_not_grow_with_short_lived_threads(tmp_path):
+    """测试大量短生命周期线程访问数据库后，连接数不超过池的空闲上限"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    service.save_article({'url': "https://www.example.com/pool", 'title': '标题'})
+    
+    connect = service.connections._connect
+    created = []
+    
+    def counting_connect():
+        created.append(connect())
+        return created[-1]
+    
+    with patch.object(service.connections, "_connect", side_effect=counting_connect):
+        for _ in range(20):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(lambda _: service.check_article_exists("https://www.example.com/pool"), range(8)))
+    
+    # 新建连接数只取决于并发量，与线程池创建的线程总数无关
+    assert len(created) <= 4
+    service.close()
+    assert service.connections._idle.qsize() == 0
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    """测试构造数据库服务时不创建数据库文件，首次使用时才建表"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    assert not any(tmp_path.iterdir())
+    
+    assert service.get_articles_by_urls(["https://www.example.com/missing"]) == {}
+    assert (tmp_path / "articles.db").exists()
+    service.close()
+
+
 if __name__ == "__main__":
-    test_database_persistence()
\ No newline at end of file
+    test_database_persistence()
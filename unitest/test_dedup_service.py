@@ -0,0 +1,31 @@
+# 测试去重服务
+
+from services.dedup_service import DedupService
+
+
+def test_near_duplicate_opinions_are_clustered():
+    """测试近似重复的意见合并为一条，不相关的意见保留，结果保持原有顺序"""
+    service = DedupService(ngram_size=2, hash_dim=4096)
+    opinions = [
+        "政策支持新能源发展",
+        "政策大力支持新能源产业发展",
+        "新能源汽车充电设施不足",
+        "新能源汽车的充电设施仍然不足。",
+        "电池回收体系有待完善",
+        "政策支持新能源发展",
+    ]
+
+    result = service.dedupe_texts(opinions, threshold=0.6)
+
+    assert len(result) == 3
+    assert result[0] in opinions[:2]
+    assert result[1] in opinions[2:4]
+    assert result[2] == "电池回收体系有待完善"
+
+
+def test_threshold_controls_merging():
+    """测试阈值为1时只去除规范化后完全相同的意见"""
+    service = DedupService(ngram_size=2, hash_dim=4096)
+    opinions = ["政策支持新能源发展", "政策大力支持新能源产业发展", "政策支持新能源发展！"]
+
+    assert service.dedupe_texts(opinions, threshold=1.0) == ["政策支持新能源发展", "政策大力支持新能源产业发展"]
@@ -0,0 +1,41 @@
+# 测试网页正文提取服务
+
+from services.extract_service import extract_service
+
+
+SAMPLE_HTML = """<html><head><title>测试标题</title><style>.a{color:red}</style><script>var x = "<p>脚本</p>";</script></head>
+<body><nav><a href="/">首页</a><a href="/tech">科技</a></nav>
+<div class="side"><a href="/1">推荐阅读推荐阅读推荐阅读推荐阅读推荐阅读</a></div>
+<article><h1>人工智能产业发展</h1>
+<p>人工智能产业在2025年继续保持高速增长，多家企业发布了新的大模型产品。&nbsp;</p>
+<p>专家认为<a href="#">行业</a>需要加强监管，确保技术健康发展，同时保护用户隐私。</p>
+<p>短句</p></article>
+<footer>版权所有 © 2025 某某网站 保留所有权利 联系我们</footer></body></html>"""
+
+
+def test_extract_text_keeps_main_content_only():
+    """测试正文提取去除脚本、样式、导航和页脚，只保留正文容器内的段落"""
+    text = extract_service.extract_text(SAMPLE_HTML, "test_extract")
+
+    assert text.split("\n") == [
+        "测试标题",
+        "人工智能产业发展",
+        "人工智能产业在2025年继续保持高速增长，多家企业发布了新的大模型产品。",
+        "专家认为行业需要加强监管，确保技术健康发展，同时保护用户隐私。",
+    ]
+
+
+def test_extract_text_without_article_filters_link_heavy_blocks():
+    """测试没有正文容器时按链接密度和长度过滤文本块"""
+    html = """<body><div><a href="/1">相关链接相关链接相关链接相关链接相关链接相关链接</a></div>
+    <div>这是一段没有正文容器包裹的正文内容，应当被完整保留下来。</div></body>"""
+
+    assert extract_service.extract_text(html) == "这是一段没有正文容器包裹的正文内容，应当被完整保留下来。"
+    assert extract_service.extract_text("") is None
+
+
+def test_hash_page_is_compact_and_stable():
+    """测试原始网页哈希长度固定且内容变化时改变"""
+    assert len(extract_service.hash_page(SAMPLE_HTML)) == 32
+    assert extract_service.hash_page(SAMPLE_HTML) == extract_service.hash_page(SAMPLE_HTML)
+    assert extract_service.hash_page(SAMPLE_HTML) != extract_service.hash_page(SAMPLE_HTML + " ")
@@ -0,0 +1,117 @@
+# 测试简报任务服务
+
+import socket
+import time
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+from core.models import JobRequest
+from services.job_service import JobService, JOB_SUCCEEDED, JOB_FAILED
+
+
+def _fake_stream(request, request_id):
+    yield {"event": "articles", "request_id": request_id, "article_count": 1,
+           "articles": [{"index": 0, "title": "标题", "url": None, "source": None}]}
+    yield {"event": "article_result", "index": 0, "result": {"positive_opinions": ["观点"]}}
+    yield {"event": "summary", "positive_opinion": "正面总结", "negative_concern": "", "constructive_suggestion": ""}
+    yield {"event": "done", "request_id": request_id, "topic": request.topic, "article_count": 1, "processing_time": "0.01秒"}
+
+
+def _wait_for(service, job_id, statuses=(JOB_SUCCEEDED, JOB_FAILED)):
+    for _ in range(100):
+        job = service.get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.02)
+    return job
+
+
+def _fake_getaddrinfo(address):
+    """构造返回固定地址的getaddrinfo"""
+    return lambda host, port, **kwargs: [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port or 80))]
+
+
+def test_job_runs_in_background_and_fires_webhook(tmp_path):
+    """测试任务在后台执行，记录部分结果和最终结果，并在完成后发送回调"""
+    service = JobService(db_path=str(tmp_path / "jobs.db"), max_workers=2)
+
+    with patch("services.job_service.structured_briefing_generator.stream_structured_briefing", side_effect=_fake_stream), \
+            patch("services.job_service.socket.getaddrinfo", _fake_getaddrinfo("93.184.216.34")), \
+            patch("services.job_service.requests.post") as mock_post:
+        job = service.submit_job(JobRequest(topic="测试", max_articles=1, webhook_url="http://hook.example.com"))
+        job = _wait_for(service, job["job_id"])
+        for _ in range(50):
+            if mock_post.called:
+                break
+            time.sleep(0.02)
+    service.stop()
+
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["partial"]["extracted_count"] == 1
+    assert job["partial"]["extractions"] == [{"index": 0, "result": {"positive_opinions": ["观点"]}}]
+    assert job["result"]["positive_opinion"] == "正面总结"
+    assert mock_post.call_args.kwargs["json"]["status"] == JOB_SUCCEEDED
+    assert mock_post.call_args.kwargs["allow_redirects"] is False
+
+
+@pytest.mark.parametrize("address", ["127.0.0.1", "10.0.0.5", "169.254.169.254", "::1", "::ffff:192.168.1.1"])
+def test_webhook_to_internal_address_is_rejected(tmp_path, address):
+    """测试解析到回环、内网或链路本地地址的回调地址在创建任务时被拒绝"""
+    service = JobService(db_path=str(tmp_path / "jobs.db"))
+
+    with patch("services.job_service.socket.getaddrinfo", _fake_getaddrinfo(address)):
+        with pytest.raises(ValueError):
+            service.submit_job(JobRequest(topic="测试", max_articles=1, webhook_url="http://hook.example.com"))
+    service.stop()
+
+    with service.connections.get_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+
+
+def test_webhook_url_scheme_and_allowlist():
+    """测试回调地址只允许http/https，配置允许列表后只允许列表中的主机"""
+    from services.job_service import check_webhook_url
+
+    with pytest.raises(ValidationError):
+        JobRequest(topic="测试", webhook_url="file:///etc/passwd")
+    with pytest.raises(ValidationError):
+        JobRequest(topic="测试", webhook_url="gopher://hook.example.com")
+
+    with patch("services.job_service.JOB_WEBHOOK_ALLOWED_HOSTS", ["hooks.internal"]):
+        check_webhook_url("http://hooks.internal/notify")
+        with pytest.raises(ValueError):
+            check_webhook_url("http://hook.example.com/notify")
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    """测试服务重启后恢复上次中断的任务"""
+    db_path = str(tmp_path / "jobs.db")
+    service = JobService(db_path=db_path)
+    job_id = "interrupted"
+    with service.connections.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, type, topic, max_articles, status, partial, created_at, updated_at) "
+            "VALUES (?, 'structured', '测试', 1, 'running', '{}', '2024-01-01', '2024-01-01')",
+            (job_id,)
+        )
+
+    restarted = JobService(db_path=db_path)
+    with patch("services.job_service.structured_briefing_generator.stream_structured_briefing", side_effect=_fake_stream):
+        restarted.start()
+        job = _wait_for(restarted, job_id)
+    restarted.stop()
+
+    assert job["status"] == JOB_SUCCEEDED
+
+
+def test_job_database_is_created_on_first_use(tmp_path):
+    """测试构造任务服务时不创建数据库文件，首次使用时才建表"""
+    service = JobService(db_path=str(tmp_path / "jobs.db"))
+    assert not any(tmp_path.iterdir())
+
+    assert service.get_job("missing") is None
+    assert (tmp_path / "jobs.db").exists()
+    service.stop()
+    service.connections.close_all()
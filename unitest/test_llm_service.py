@@ -0,0 +1,112 @@
+# 测试LLM服务
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from services.llm_service import llm
+
+
+def _completion(text: str):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+def _time_after(seconds: float) -> float:
+    return time.time() + seconds
+
+
+def test_agenerate_batch_keeps_order_and_bounds_concurrency():
+    """测试异步批量生成保持顺序、限制并发并将失败位置置为None"""
+    active = 0
+    peak = 0
+
+    async def fake_create(**kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        prompt = kwargs["messages"][0]["content"]
+        if prompt == "失败":
+            raise RuntimeError("调用失败")
+        return _completion(f" {prompt}的回答 ")
+
+    with patch.object(llm.async_client.chat.completions, "create", AsyncMock(side_effect=fake_create)):
+        results = asyncio.run(llm.agenerate_batch(["问题1", "失败", "问题3", "问题4"], max_concurrency=2))
+
+    assert results == ["问题1的回答", None, "问题3的回答", "问题4的回答"]
+    assert peak == 2
+
+
+def test_cache_ttl_and_lru_eviction(tmp_path):
+    """测试响应缓存的过期、LRU淘汰和命中统计"""
+    from core.cache_service import LLMCacheService
+
+    cache = LLMCacheService(db_path=str(tmp_path / "llm_cache.db"), ttl=60, max_entries=2)
+    cache.set("a", "响应a")
+    cache.set("b", "响应b")
+    assert cache.get("a") == "响应a"
+
+    # 写入第三条时淘汰最久未访问的b
+    with patch("core.cache_service.time.time", return_value=_time_after(1)):
+        cache.set("c", "响应c")
+    assert cache.get("b") is None
+    assert cache.get("c") == "响应c"
+
+    # 超过TTL后视为未命中
+    with patch("core.cache_service.time.time", return_value=_time_after(120)):
+        assert cache.get("a") is None
+
+    assert cache.get_stats() == {"hits": 2, "misses": 2, "hit_ratio": 0.5}
+
+
+def test_cache_tracks_size_without_counting_on_write(tmp_path):
+    """测试覆盖写入不增加条目数，重新打开缓存时从已有条目恢复条目数"""
+    from core.cache_service import LLMCacheService
+
+    db_path = str(tmp_path / "llm_cache.db")
+    cache = LLMCacheService(db_path=db_path, ttl=60, max_entries=2)
+    cache.set("a", "响应a")
+    cache.set("a", "新响应a")
+    cache.set("b", "响应b")
+    assert cache.get("a") == "新响应a"
+    assert cache.get("b") == "响应b"
+    cache.connections.close_all()
+
+    reopened = LLMCacheService(db_path=db_path, ttl=60, max_entries=2)
+    with patch("core.cache_service.time.time", return_value=_time_after(1)):
+        reopened.set("c", "响应c")
+    assert reopened.get("c") == "响应c"
+    assert [reopened.get(key) for key in ("a", "b")].count(None) == 1
+    reopened.connections.close_all()
+
+
+def test_generate_text_uses_cache(tmp_path):
+    """测试开启缓存后相同参数的请求只调用一次模型"""
+    from core.cache_service import LLMCacheService
+
+    cache = LLMCacheService(db_path=str(tmp_path / "llm_cache.db"))
+    with patch.object(llm, "cache", cache), \
+            patch.object(llm.client.chat.completions, "create", return_value=_completion("回答")) as mock_create:
+        assert llm.generate_text("问题", use_cache=True) == "回答"
+        assert llm.generate_text("问题", use_cache=True) == "回答"
+        assert llm.generate_text("问题", use_cache=True, temperature=0.1) == "回答"
+        assert llm.generate_text("问题") == "回答"
+
+    assert mock_create.call_count == 3
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_app_shutdown_closes_async_client():
+    """测试应用关闭时关闭LLM异步客户端，并换上新客户端供再次启动使用"""
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    client = llm.async_client
+    with patch("api.main.PRELOAD_MODELS", False), patch("api.main.job_service"):
+        with TestClient(app):
+            pass
+
+    assert client.is_closed()
+    assert not llm.async_client.is_closed()
@@ -0,0 +1,51 @@
+# 测试指标注册表和/metrics端点
+
+from types import SimpleNamespace
+
+from core.metrics import MetricsRegistry
+
+
+def test_registry_renders_prometheus_text_format():
+    """测试计数器按标签累加、直方图分桶累计，标签值中的特殊字符被转义"""
+    registry = MetricsRegistry()
+    counter = registry.counter("demo_total", "示例计数器", ("route",))
+    histogram = registry.histogram("demo_seconds", "示例直方图", buckets=(0.1, 1))
+
+    counter.inc(route='/a"b')
+    counter.inc(2, route='/a"b')
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE demo_total counter" in lines
+    assert 'demo_total{route="/a\\"b"} 3' in lines
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1"} 2' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+    assert "demo_seconds_sum 5.55" in lines
+    assert "demo_seconds_count 3" in lines
+
+
+def test_metrics_endpoint_exports_http_llm_and_cache_metrics():
+    """测试/metrics导出按路由模板统计的HTTP指标、LLM token用量和缓存命中率"""
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from services.llm_service import llm
+
+    client = TestClient(app)
+    client.get("/")
+    client.get("/no-such-path")
+    llm._record_call("test-model", "success", SimpleNamespace(usage=SimpleNamespace(prompt_tokens=120, completion_tokens=30)))
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in body
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/"}' in body
+    assert 'http_requests_in_flight{route="/metrics"} 1' in body
+    assert 'llm_tokens_total{model="test-model",type="prompt"} 120' in body
+    assert 'llm_calls_total{model="test-model",status="success"} 1' in body
+    assert 'cache_hit_ratio{cache="briefing"}' in body
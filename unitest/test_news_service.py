@@ -0,0 +1,91 @@
+# 测试新闻服务的文章获取策略
+
+from unittest.mock import patch, MagicMock
+
+from core.db_service import DatabaseService
+from core.models import ArticleModel
+from services.news_service import news_service
+
+
+def _api_response(urls):
+    response = MagicMock()
+    response.json.return_value = {
+        "articles": [
+            {"title": f"人工智能新闻{url[-1]}", "description": "人工智能", "url": url, "source": {"name": "API"}}
+            for url in urls
+        ]
+    }
+    return response
+
+
+def test_local_first_skips_api_when_archive_is_sufficient(tmp_path):
+    """测试本地文章库足够时不调用新闻API"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    titles = ["人工智能芯片出口管制升级", "高校开设人工智能通识课程", "医疗影像引入人工智能辅助诊断"]
+    service.save_articles([
+        {"url": f"https://www.example.com/local/{index}", "title": title, "source": "本地"}
+        for index, title in enumerate(titles)
+    ])
+
+    with patch("services.news_service.db_service", service), \
+            patch("services.news_service.NEWS_LOCAL_FIRST", True), \
+            patch("services.news_service.requests.get") as mock_get:
+        articles = news_service.get_articles("人工智能", 2, "test_local_first")
+
+    mock_get.assert_not_called()
+    assert len(articles) == 2
+    assert all(article.source == "本地" for article in articles)
+    service.close()
+
+
+def test_local_first_merges_and_dedupes_api_results(tmp_path):
+    """测试本地文章不足时调用新闻API并按URL去重合并、写回本地文章库"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    service.save_articles([{"url": "https://www.example.com/news/1", "title": "人工智能本地1", "source": "本地"}])
+    api_urls = ["https://www.example.com/news/1", "https://www.example.com/news/2", "https://www.example.com/news/3"]
+
+    with patch("services.news_service.db_service", service), \
+            patch("services.news_service.NEWS_LOCAL_FIRST", True), \
+            patch("services.news_service.requests.get", return_value=_api_response(api_urls)):
+        articles = news_service.get_articles("人工智能", 3, "test_merge")
+
+    assert [article.url for article in articles] == api_urls
+    assert articles[0].source == "本地"
+    assert set(service.get_articles_by_urls(api_urls)) == set(api_urls)
+    service.close()
+
+
+def test_near_duplicate_articles_are_collapsed_and_signatures_reused(tmp_path):
+    """测试转载的近似重复文章只保留第一篇，签名写入文章库后被后续请求复用"""
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    description = "多家科技公司宣布联合成立人工智能安全联盟，将共同制定大模型评测标准和风险披露规范。"
+    response = MagicMock()
+    response.json.return_value = {"articles": [
+        {"title": "科技公司联合成立人工智能安全联盟", "description": description,
+         "url": "https://www.example.com/news/1", "source": {"name": "甲"}},
+        {"title": "科技公司联合成立人工智能安全联盟（转载）", "description": description + "<p>来源：甲</p>",
+         "url": "https://www.example.com/news/2", "source": {"name": "乙"}},
+        {"title": "新能源汽车销量创新高", "description": "上月新能源汽车销量同比增长三成。",
+         "url": "https://www.example.com/news/3", "source": {"name": "丙"}},
+    ]}
+
+    with patch("services.news_service.db_service", service), \
+            patch("services.news_service.NEWS_LOCAL_FIRST", True), \
+            patch("services.news_service.requests.get", return_value=response):
+        articles = news_service.get_articles("人工智能", 3, "test_dedup")
+
+    assert [article.url for article in articles] == ["https://www.example.com/news/1", "https://www.example.com/news/3"]
+    stored = service.get_article_signatures(["https://www.example.com/news/1"])
+    assert stored["https://www.example.com/news/1"]["minhash"] == articles[0].minhash
+
+    # 相同URL的新文章对象不带签名，签名须从文章库读取而不是重新计算
+    fresh = [ArticleModel(title=article.title, description=article.description, url=article.url, source=article.source)
+             for article in articles]
+    with patch("services.news_service.db_service", service), \
+            patch("services.news_service.dedup_service.minhash_signatures") as mock_minhash, \
+            patch.object(service, "get_article_signatures", wraps=service.get_article_signatures) as mock_signatures:
+        reused = news_service._filter_near_duplicates(fresh, "test_reuse")
+    mock_minhash.assert_not_called()
+    mock_signatures.assert_called_once_with([article.url for article in articles])
+    assert [article.minhash for article in reused] == [article.minhash for article in articles]
+    service.close()
@@ -0,0 +1,38 @@
+# 测试请求耗时统计和性能剖析
+
+import os
+import pstats
+from unittest.mock import patch
+
+from core.profiling import collect_timings, span
+
+
+def test_spans_outside_a_request_are_ignored():
+    """测试不在collect_timings范围内时span不记录耗时，嵌套的请求各自独立"""
+    with span("db.save_articles"):
+        pass
+
+    with collect_timings("test_outer") as outer:
+        with span("news.api"):
+            pass
+        with collect_timings("test_inner") as inner:
+            with span("llm.generate"):
+                pass
+        with span("news.api"):
+            pass
+
+    assert outer.summary()["news.api"]["count"] == 2
+    assert "llm.generate" not in outer.summary()
+    assert set(inner.summary()) == {"llm.generate", "total"}
+
+
+def test_cprofile_output_is_saved_per_request(tmp_path):
+    """测试配置cProfile时剖析结果按请求ID保存"""
+    with patch("core.profiling.REQUEST_PROFILER", "cprofile"), \
+            patch("core.profiling.PROFILE_OUTPUT_DIR", str(tmp_path)):
+        with collect_timings("test_profile", profile=True):
+            sum(range(1000))
+
+    path = tmp_path / "test_profile.prof"
+    assert os.path.exists(path)
+    assert pstats.Stats(str(path)).total_calls > 0
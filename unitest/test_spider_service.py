@@ -1,6 +1,9 @@
 # 爬虫服务测试脚本
 
+import threading
+import time
 import uuid
+from unittest.mock import patch
 from services.spider_service import spider_service
 from core.config import logger
 
@@ -79,6 +82,186 @@ def test_spider_service():
         "results": results
     }
 
+def test_get_pages_content_limits_per_host_and_honours_deadline():
+    """测试批量爬取的单主机并发限制和整体截止时间"""
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+    
+    def fake_fetch_page(url, request_id="", timeout=10, validator=None):
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(2 if "slow" in url else 0.05)
+        with lock:
+            active[host] -= 1
+        return {"status": 200, "content": f"content of {url}", "etag": None, "last_modified": None}
+    
+    urls = [f"https://a.example.com/{index}" for index in range(6)] + ["https://slow.example.com/1"]
+    
+    with patch.object(spider_service, "fetch_page", side_effect=fake_fetch_page), \
+            patch("services.spider_service.SPIDER_PER_HOST_LIMIT", 2):
+        spider_service._host_semaphores.clear()
+        start = time.monotonic()
+        results = spider_service.get_pages_content(urls, "test_batch", deadline=0.5)
+        elapsed = time.monotonic() - start
+    spider_service._host_semaphores.clear()
+    
+    assert elapsed < 1.5
+    assert peak["a.example.com"] == 2
+    assert results["https://slow.example.com/1"] is None
+    assert all(results[url] == f"content of {url}" for url in urls[:6])
+
+
+def test_fetch_full_texts_revalidates_stale_pages(tmp_path):
+    """测试过期网页发送条件请求，304时沿用数据库内容，新鲜期内不发请求"""
+    from unittest.mock import MagicMock
+    from core.db_service import DatabaseService
+    from core.models import ArticleModel
+    
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    url = "https://news.example.com/article/1"
+    service.save_article({'url': url, 'title': '标题', 'full_text': '数据库中的正文'})
+    service.save_page_validators([{'url': url, 'etag': '"v1"', 'last_modified': 'Wed, 01 Jan 2025 00:00:00 GMT'}])
+    
+    not_modified = MagicMock(status_code=304, headers={})
+    with patch("core.db_service.db_service", service), \
+            patch.object(spider_service.session, "get", return_value=not_modified) as mock_get:
+        # 新鲜期内直接使用数据库内容
+        article = ArticleModel(url=url)
+        article.fetch_full_text("test_fresh")
+        mock_get.assert_not_called()
+        assert article.full_text == '数据库中的正文'
+        
+        # 过期后发送条件请求，304时沿用数据库内容并刷新校验时间
+        with patch("services.spider_service.SPIDER_DOMAIN_FRESHNESS", {"example.com": 0}):
+            article = ArticleModel(url=url)
+            article.fetch_full_text("test_stale")
+    
+    headers = mock_get.call_args.kwargs["headers"]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == 'Wed, 01 Jan 2025 00:00:00 GMT'
+    assert article.full_text == '数据库中的正文'
+    assert service.get_page_validators([url])[url]['etag'] == '"v1"'
+    service.close()
+
+def test_full_text_without_validator_uses_stored_time(tmp_path):
+    """测试没有校验信息的已存内容按更新时间判断新鲜度，未携带校验信息时收到的304视为失败"""
+    from unittest.mock import MagicMock
+    from core.db_service import DatabaseService
+    from core.models import ArticleModel
+    
+    service = DatabaseService(db_path=str(tmp_path / "articles.db"))
+    url = "https://news.example.com/article/2"
+    service.save_article({'url': url, 'title': '标题', 'full_text': '数据库中的正文'})
+    
+    not_modified = MagicMock(status_code=304, headers={})
+    with patch("core.db_service.db_service", service), \
+            patch.object(spider_service.session, "get", return_value=not_modified) as mock_get:
+        article = ArticleModel(url=url)
+        article.fetch_full_text("test_no_validator")
+        mock_get.assert_not_called()
+        assert article.full_text == '数据库中的正文'
+        
+        # 过期后没有可用的校验信息，发送普通请求
+        with patch("services.spider_service.SPIDER_DOMAIN_FRESHNESS", {"example.com": 0}):
+            article = ArticleModel(url=url)
+            article.fetch_full_text("test_no_validator_stale")
+        assert "If-None-Match" not in mock_get.call_args.kwargs["headers"]
+        assert spider_service.fetch_page(url, "test_unsolicited_304") is None
+    
+    assert article.full_text == '数据库中的正文'
+    service.close()
+
+def test_async_client_is_closed_when_replaced_and_on_shutdown():
+    """测试事件循环变化时关闭旧的异步客户端，应用关闭时关闭当前客户端"""
+    import asyncio
+    from services.spider_service import SpiderService
+    
+    service = SpiderService()
+    
+    async def get_client():
+        return service._get_async_client()
+    
+    async def replace_in_running_loop(stale_loop):
+        # 模拟旧客户端所在的事件循环仍在运行
+        with patch.object(stale_loop, "is_running", return_value=True), \
+                patch("services.spider_service.asyncio.run_coroutine_threadsafe") as mock_submit:
+            service._async_loop = stale_loop
+            client = service._get_async_client()
+        return client, mock_submit
+    
+    first = asyncio.run(get_client())
+    stale_loop = asyncio.new_event_loop()
+    try:
+        second, mock_submit = asyncio.run(replace_in_running_loop(stale_loop))
+    finally:
+        stale_loop.close()
+    
+    assert second is not first
+    mock_submit.assert_called_once()
+    assert mock_submit.call_args.args[1] is stale_loop
+    mock_submit.call_args.args[0].close()
+    
+    async def shutdown():
+        client = service._get_async_client()
+        await service.aclose()
+        return client
+    
+    client = asyncio.run(shutdown())
+    assert client.is_closed
+    assert service._async_client is None
+
+
+def test_afetch_page_detects_encoding_like_sync_fetch():
+    """测试异步爬取与同步爬取一致，按内容检测网页编码"""
+    import asyncio
+    import httpx
+    
+    html = "<html><body>人工智能技术正在快速发展，应用领域越来越广泛。</body></html>"
+    
+    def handler(request):
+        # 响应头声明的编码与实际内容不符
+        return httpx.Response(200, content=html.encode("gbk"), headers={"Content-Type": "text/html; charset=iso-8859-1"})
+    
+    async def fetch():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            with patch.object(spider_service, "_get_async_client", return_value=client):
+                return await spider_service.afetch_page("https://news.example.com/gbk", "test_encoding")
+    
+    page = asyncio.run(fetch())
+    assert page["content"] == html
+
+
+def test_afetch_pages_limits_per_host_across_calls():
+    """测试同一事件循环中并发的多次异步批量爬取共享单主机并发限制"""
+    import asyncio
+    from services.spider_service import SpiderService
+    
+    service = SpiderService()
+    active = 0
+    peak = 0
+    
+    async def fake_afetch_page(url, request_id="", timeout=10, validator=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return {"status": 200, "content": f"content of {url}", "etag": None, "last_modified": None}
+    
+    async def run():
+        batches = [[f"https://a.example.com/{batch}/{index}" for index in range(3)] for batch in range(3)]
+        return await asyncio.gather(*(service.afetch_pages(urls, f"test_batch_{index}") for index, urls in enumerate(batches)))
+    
+    with patch.object(service, "afetch_page", side_effect=fake_afetch_page), \
+            patch("services.spider_service.SPIDER_PER_HOST_LIMIT", 2):
+        results = asyncio.run(run())
+    
+    assert peak == 2
+    assert all(page for pages in results for page in pages.values())
+
 if __name__ == "__main__":
     result = test_spider_service()
     if result["success"]:
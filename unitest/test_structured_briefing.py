@@ -0,0 +1,418 @@
+# 测试结构化简报生成器
+
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from core.models import ArticleModel
+from core.structured_briefing_generator import structured_briefing_generator
+
+
+ARTICLE_RESPONSE = json.dumps({"positive_opinions": ["观点"], "negative_concerns": [], "constructive_suggestions": []})
+SUMMARY_RESPONSE = json.dumps({"positive_opinions": "正面总结", "negative_concerns": "", "constructive_suggestions": ""})
+
+
+def _make_articles(count: int):
+    return [ArticleModel(title=f"标题{i}", description=f"摘要{i}") for i in range(count)]
+
+
+def _fake_response(prompt: str) -> str:
+    """总结提示词返回固定的总结结果，其余提示词返回固定的单篇提取结果"""
+    return SUMMARY_RESPONSE if "需要总结的内容" in prompt else ARTICLE_RESPONSE
+
+
+def test_extract_runs_concurrently_and_keeps_order():
+    """测试文章提取并发执行，并按文章顺序合并结果"""
+    articles = _make_articles(4)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_generate_text(prompt, **kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        idx = prompt.split("# 标题：标题")[1].split("\n")[0]
+        return json.dumps({"positive_opinions": [f"观点{idx}"], "negative_concerns": [], "constructive_suggestions": []})
+
+    with patch("core.structured_briefing_generator.llm.generate_text", side_effect=fake_generate_text), \
+            patch("core.structured_briefing_generator.EXTRACTION_MAX_WORKERS", 2):
+        positive, negative, suggestions = structured_briefing_generator._extract_structured_content_by_llm(
+            articles, "测试", "test_concurrent")
+
+    assert peak == 2
+    assert positive == ["观点0", "观点1", "观点2", "观点3"]
+    assert negative == [] and suggestions == []
+
+
+def test_extract_skips_failed_articles():
+    """测试单篇文章失败时跳过该文章"""
+    articles = _make_articles(3)
+    responses = {
+        "标题0": json.dumps({"positive_opinions": [], "negative_concerns": ["关切0"], "constructive_suggestions": []}),
+        "标题1": "不是JSON",
+    }
+
+    def fake_generate_text(prompt, **kwargs):
+        for title, response in responses.items():
+            if f"# 标题：{title}\n" in prompt:
+                return response
+        raise RuntimeError("LLM调用失败")
+
+    with patch("core.structured_briefing_generator.llm.generate_text", side_effect=fake_generate_text):
+        positive, negative, suggestions = structured_briefing_generator._extract_structured_content_by_llm(
+            articles, "测试", "test_failed")
+
+    assert positive == [] and suggestions == []
+    assert negative == ["关切0"]
+
+
+def test_batch_extraction_packs_articles_into_one_prompt():
+    """测试打包模式下按token预算打包文章并按文章顺序返回结果"""
+    articles = _make_articles(3)
+    batch_response = json.dumps([
+        {"index": 2, "positive_opinions": ["观点1"], "negative_concerns": [], "constructive_suggestions": []},
+        {"index": 1, "positive_opinions": ["观点0"], "negative_concerns": [], "constructive_suggestions": []},
+        {"index": 3, "positive_opinions": [], "negative_concerns": [], "constructive_suggestions": ["建议2"]},
+    ])
+
+    with patch("core.structured_briefing_generator.llm.generate_text", return_value=batch_response) as mock_generate, \
+            patch("core.structured_briefing_generator.EXTRACTION_BATCH_ENABLED", True):
+        positive, negative, suggestions = structured_briefing_generator._extract_structured_content_by_llm(
+            articles, "测试", "test_batch")
+
+    assert mock_generate.call_count == 1
+    assert "## 文章3" in mock_generate.call_args[0][0]
+    assert sorted(positive) == ["观点0", "观点1"]
+    assert suggestions == ["建议2"]
+
+
+def test_batch_response_requires_index_permutation():
+    """测试批量响应的index缺失、重复或越界时视为解析失败"""
+    import pytest
+
+    def make_response(indices):
+        return json.dumps([{"index": index, "positive_opinions": []} for index in indices])
+
+    assert [result["index"] for result in structured_briefing_generator._parse_batch_response(make_response([2, 1]), 2)] == [1, 2]
+    for indices in ([1, 1], [0, 1], [1, 3], [1, None], ["1", "2"]):
+        with pytest.raises(ValueError):
+            structured_briefing_generator._parse_batch_response(make_response(indices), 2)
+
+
+def test_batch_extraction_respects_token_budget():
+    """测试超出token预算时拆分为多个批次"""
+    articles = _make_articles(4)
+
+    with patch("core.structured_briefing_generator.EXTRACTION_BATCH_TOKEN_BUDGET", 0):
+        batches = structured_briefing_generator._pack_article_batches(articles, "测试", "test_budget")
+
+    assert [[idx for idx, _ in batch] for batch in batches] == [[0], [1], [2], [3]]
+
+
+def test_batch_extraction_falls_back_to_single_articles():
+    """测试批量响应无法解析时回退为逐篇调用"""
+    articles = _make_articles(2)
+    single_response = json.dumps({"positive_opinions": [], "negative_concerns": ["关切"], "constructive_suggestions": []})
+
+    with patch("core.structured_briefing_generator.llm.generate_text",
+               side_effect=["不是JSON数组", single_response, single_response]) as mock_generate, \
+            patch("core.structured_briefing_generator.EXTRACTION_BATCH_ENABLED", True):
+        positive, negative, suggestions = structured_briefing_generator._extract_structured_content_by_llm(
+            articles, "测试", "test_fallback")
+
+    assert mock_generate.call_count == 3
+    assert negative == ["关切"]
+
+
+def test_stream_structured_briefing_emits_incremental_events():
+    """测试流式简报依次产出文章、逐篇结果、总结增量、总结和完成事件"""
+    from core.models import BriefingRequest
+
+    articles = _make_articles(2)
+    summary_chunks = ['{"positive_opinions": "正面', '总结", "negative_concerns": "", ', '"constructive_suggestions": ""}']
+
+    with patch.object(structured_briefing_generator.news_service, "get_articles", return_value=articles), \
+            patch("core.structured_briefing_generator.llm.generate_text", return_value=ARTICLE_RESPONSE), \
+            patch("core.structured_briefing_generator.llm.stream_text", return_value=iter(summary_chunks)):
+        events = list(structured_briefing_generator.stream_structured_briefing(
+            BriefingRequest(topic="测试", max_articles=2), "test_stream"))
+
+    event_types = [event["event"] for event in events]
+    assert event_types == ["articles", "article_result", "article_result",
+                           "summary_delta", "summary_delta", "summary_delta", "summary", "done"]
+    assert events[0]["article_count"] == 2
+    assert sorted(event["index"] for event in events if event["event"] == "article_result") == [0, 1]
+    assert events[-2]["positive_opinion"] == "正面总结"
+
+
+def test_stream_without_articles_skips_llm():
+    """测试流式简报没有获取到文章时直接产出空总结并结束，不调用LLM"""
+    from core.models import BriefingRequest
+
+    with patch.object(structured_briefing_generator.news_service, "get_articles", return_value=[]), \
+            patch("core.structured_briefing_generator.llm.generate_text") as mock_generate, \
+            patch("core.structured_briefing_generator.llm.stream_text") as mock_stream:
+        events = list(structured_briefing_generator.stream_structured_briefing(
+            BriefingRequest(topic="测试", max_articles=2), "test_stream_empty"))
+
+    assert [event["event"] for event in events] == ["articles", "summary", "done"]
+    assert events[1]["positive_opinion"] == ""
+    assert events[-1]["article_count"] == 0
+    mock_generate.assert_not_called()
+    mock_stream.assert_not_called()
+
+
+def test_async_structured_route_runs_extractions_concurrently():
+    """测试异步结构化简报端点并发执行各文章的LLM调用"""
+    import asyncio
+    from unittest.mock import AsyncMock
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    articles = _make_articles(4)
+    active = 0
+    peak = 0
+
+    async def fake_agenerate_text(prompt, **kwargs):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        return _fake_response(prompt)
+
+    with patch.object(structured_briefing_generator.news_service, "aget_articles", AsyncMock(return_value=articles)), \
+            patch("core.structured_briefing_generator.llm.agenerate_text", side_effect=fake_agenerate_text), \
+            patch("core.structured_briefing_generator.EXTRACTION_BATCH_ENABLED", False), \
+            patch("core.structured_briefing_generator.briefing_cache_service.enabled", False):
+        response = TestClient(app).post("/briefing/structured", json={"topic": "测试", "max_articles": 4})
+
+    assert response.status_code == 200
+    assert response.json()["positive_opinion"] == "正面总结"
+    # 四次提取同时进行
+    assert peak == 4
+
+
+def test_identical_requests_share_one_computation_and_cache():
+    """测试并发的相同请求合并为一次生成，规范化后相同的主题在有效期内命中缓存"""
+    import asyncio
+    from unittest.mock import AsyncMock
+    from core.cache_service import BriefingCacheService
+    from core.models import BriefingRequest
+
+    articles = _make_articles(2)
+    mock_aget_articles = AsyncMock(return_value=articles)
+
+    async def fake_agenerate_text(prompt, **kwargs):
+        await asyncio.sleep(0.05)
+        return _fake_response(prompt)
+
+    async def run():
+        requests = [BriefingRequest(topic=topic, max_articles=2) for topic in ["新能源", "新能源", " 新能源 "]]
+        responses = await asyncio.gather(*(
+            structured_briefing_generator.agenerate_structured_briefing(request, f"req_{index}")
+            for index, request in enumerate(requests)
+        ))
+        cached = structured_briefing_generator.generate_structured_briefing(BriefingRequest(topic="新能源", max_articles=2), "req_cached")
+        return responses, cached
+
+    cache = BriefingCacheService(ttl=60, max_entries=10, enabled=True)
+    with patch("core.structured_briefing_generator.briefing_cache_service", cache), \
+            patch.object(structured_briefing_generator.news_service, "aget_articles", mock_aget_articles), \
+            patch("core.structured_briefing_generator.llm.agenerate_text", side_effect=fake_agenerate_text):
+        responses, cached = asyncio.run(run())
+
+    assert mock_aget_articles.await_count == 1
+    assert [response.request_id for response in responses] == ["req_0", "req_1", "req_2"]
+    assert all(response.positive_opinion == "正面总结" for response in responses)
+    assert cached.request_id == "req_cached"
+    assert cache.get_stats()["misses"] == 1
+    assert cache.get_stats()["coalesced"] == 2
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_cancelled_leader_does_not_fail_coalesced_requests():
+    """测试发起计算的请求被取消时，合并等待的请求仍得到结果且结果写入缓存"""
+    import asyncio
+    from core.cache_service import BriefingCacheService
+
+    cache = BriefingCacheService(ttl=60, max_entries=10, enabled=True)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "结果"
+
+    async def run():
+        leader = asyncio.ensure_future(cache.aget_or_compute("key", compute, "req_leader"))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.aget_or_compute("key", compute, "req_waiter"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        value = await waiter
+        cached = await cache.aget_or_compute("key", compute, "req_cached")
+        return leader, value, cached
+
+    leader, value, cached = asyncio.run(run())
+
+    assert leader.cancelled()
+    assert value == "结果"
+    assert cached == "结果"
+    assert len(calls) == 1
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_degraded_briefing_is_not_cached():
+    """测试LLM调用失败得到的空简报不写入缓存，恢复后重新生成"""
+    from core.cache_service import BriefingCacheService
+    from core.models import BriefingRequest
+
+    request = BriefingRequest(topic="测试", max_articles=2)
+    cache = BriefingCacheService(ttl=60, max_entries=10, enabled=True)
+
+    with patch("core.structured_briefing_generator.briefing_cache_service", cache), \
+            patch.object(structured_briefing_generator.news_service, "get_articles", return_value=_make_articles(2)), \
+            patch("core.structured_briefing_generator.EXTRACTION_BATCH_ENABLED", False):
+        with patch("core.structured_briefing_generator.llm.generate_text", side_effect=RuntimeError("LLM不可用")):
+            degraded = structured_briefing_generator.generate_structured_briefing(request, "req_degraded")
+        with patch("core.structured_briefing_generator.llm.generate_text", side_effect=lambda prompt, **kwargs: _fake_response(prompt)):
+            recovered = structured_briefing_generator.generate_structured_briefing(request, "req_recovered")
+            cached = structured_briefing_generator.generate_structured_briefing(request, "req_cached")
+
+    assert degraded.positive_opinion == ""
+    assert recovered.positive_opinion == "正面总结"
+    assert cached.positive_opinion == "正面总结"
+    assert cache.get_stats()["misses"] == 2
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_opinions_are_ranked_by_mention_count():
+    """测试合并结果时被更多文章提及的意见排在前面"""
+    results = [{"positive_opinions": ["少数观点"]}, {"positive_opinions": ["多数观点"]}, {"positive_opinions": ["多数观点"]}]
+
+    with patch("core.structured_briefing_generator.OPINION_DEDUP_ENABLED", False):
+        positive, _, _ = structured_briefing_generator._merge_extraction_results(results)
+
+    assert positive == ["多数观点", "少数观点"]
+
+
+def test_oversized_summary_input_falls_back_to_hierarchical_summary():
+    """测试总结内容超出token预算时分块总结后再汇总，块数受限时舍弃排在后面的意见"""
+    opinions = [f"第{index:02d}条正面意见内容" for index in range(12)]
+    overhead = len(structured_briefing_generator._build_summary_prompt([], [], [], "测试"))
+    prompts = []
+    lock = threading.Lock()
+
+    def fake_generate_text(prompt, **kwargs):
+        with lock:
+            prompts.append((prompt, kwargs))
+            partial_index = len(prompts)
+        if kwargs.get("max_tokens") == 64:
+            return json.dumps({"positive_opinions": f"部分总结{partial_index}", "negative_concerns": "", "constructive_suggestions": ""})
+        return json.dumps({"positive_opinions": "最终总结", "negative_concerns": "", "constructive_suggestions": ""})
+
+    # 每条意见占13个token，预算只够每块放两条，最多三块
+    with patch("core.structured_briefing_generator.llm.generate_text", side_effect=fake_generate_text), \
+            patch("core.structured_briefing_generator.SUMMARY_PROMPT_TOKEN_BUDGET", overhead + 30), \
+            patch("core.structured_briefing_generator.SUMMARY_PROMPT_MAX_CHUNKS", 3), \
+            patch("core.structured_briefing_generator.SUMMARY_PARTIAL_MAX_TOKENS", 64):
+        summary = structured_briefing_generator._summarize_structured_content(opinions, [], [], "测试", "test_hierarchical")
+
+    assert summary == ("最终总结", "", "")
+    partial_prompts = [prompt for prompt, kwargs in prompts if kwargs.get("max_tokens") == 64]
+    assert len(partial_prompts) == 3
+    assert all(opinion in "".join(partial_prompts) for opinion in opinions[:6])
+    assert not any(opinion in "".join(partial_prompts) for opinion in opinions[6:])
+    final_prompt = prompts[-1][0]
+    assert all(f"部分总结{index}" in final_prompt for index in range(1, 4))
+    assert opinions[0] not in final_prompt
+
+
+def test_summary_input_is_reduced_repeatedly_until_it_fits():
+    """测试部分总结仍超出token预算时继续分层总结，直到能放入一个提示词"""
+    from core.prompt_builder import prompt_builder
+
+    opinions = [f"第{index:02d}条正面意见内容" for index in range(6)]
+    budget = len(structured_briefing_generator._build_summary_prompt([], [], [], "测试")) + 30
+    prompts = []
+    lock = threading.Lock()
+
+    def fake_generate_text(prompt, **kwargs):
+        with lock:
+            prompts.append((prompt, kwargs))
+            partial_index = len(prompts)
+        if kwargs.get("max_tokens") != 64:
+            return json.dumps({"positive_opinions": "最终总结", "negative_concerns": "", "constructive_suggestions": ""})
+        # 第一层的部分总结仍然较长，第二层的部分总结足够短
+        text = f"第一层部分总结{partial_index}的较长内容" if "条正面意见" in prompt else f"短{partial_index}"
+        return json.dumps({"positive_opinions": text, "negative_concerns": "", "constructive_suggestions": ""})
+
+    with patch("core.structured_briefing_generator.llm.generate_text", side_effect=fake_generate_text), \
+            patch("core.structured_briefing_generator.SUMMARY_PROMPT_TOKEN_BUDGET", budget), \
+            patch("core.structured_briefing_generator.SUMMARY_PROMPT_MAX_CHUNKS", 3), \
+            patch("core.structured_briefing_generator.SUMMARY_PARTIAL_MAX_TOKENS", 64):
+        summary = structured_briefing_generator._summarize_structured_content(opinions, [], [], "测试", "test_levels")
+
+    assert summary == ("最终总结", "", "")
+    assert len(prompts) == 7  # 两层各三块，加最终总结
+    final_prompt = prompts[-1][0]
+    assert "短" in final_prompt and "第一层部分总结" not in final_prompt
+    assert prompt_builder.count_tokens(final_prompt) <= budget
+
+
+def test_single_oversized_article_is_truncated_to_budget():
+    """测试单篇文章的意见本身超出token预算时被截断，总结提示词不超过预算"""
+    from core.prompt_builder import prompt_builder
+
+    opinion = "超长意见" * 50
+    budget = len(structured_briefing_generator._build_summary_prompt([], [], [], "测试")) + 30
+
+    with patch("core.structured_briefing_generator.llm.generate_text", return_value=SUMMARY_RESPONSE) as mock_generate, \
+            patch("core.structured_briefing_generator.SUMMARY_PROMPT_TOKEN_BUDGET", budget):
+        summary = structured_briefing_generator._summarize_structured_content([opinion], [], [], "测试", "test_truncate")
+
+    assert summary == ("正面总结", "", "")
+    assert mock_generate.call_count == 1
+    prompt = mock_generate.call_args[0][0]
+    assert opinion[:20] in prompt and opinion not in prompt
+    assert prompt_builder.count_tokens(prompt) <= budget
+
+
+def test_debug_request_returns_stage_timings_and_skips_cache():
+    """测试开启debug请求时跳过简报缓存，并返回包含线程池中LLM调用在内的各阶段耗时明细；未开启时忽略debug参数"""
+    from unittest.mock import MagicMock
+    from core.cache_service import BriefingCacheService
+    from core.models import BriefingRequest
+
+    def fake_create(messages, **kwargs):
+        content = _fake_response(messages[0]["content"])
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+
+    client = MagicMock()
+    client.chat.completions.create.side_effect = fake_create
+    cache = BriefingCacheService(ttl=60, max_entries=10, enabled=True)
+    with patch("core.structured_briefing_generator.briefing_cache_service", cache), \
+            patch.object(structured_briefing_generator.news_service, "get_articles", return_value=_make_articles(3)), \
+            patch("core.structured_briefing_generator.EXTRACTION_BATCH_ENABLED", False), \
+            patch("core.structured_briefing_generator.llm.client", client):
+        # 服务端未开启debug请求时忽略debug参数
+        ignored = structured_briefing_generator.generate_structured_briefing(
+            BriefingRequest(topic="测试", max_articles=3, debug=True), "test_debug_ignored")
+        with patch("core.structured_briefing_generator.DEBUG_REQUESTS_ENABLED", True):
+            response = structured_briefing_generator.generate_structured_briefing(
+                BriefingRequest(topic="测试", max_articles=3, debug=True), "test_debug")
+
+    assert ignored.timings is None
+    assert response.positive_opinion == "正面总结"
+    assert cache.get_stats()["misses"] == 1
+    assert {"total", "fetch_articles", "extract", "summarize"} <= set(response.timings)
+    # 三次提取在线程池中执行，加上一次总结
+    assert response.timings["llm.generate"]["count"] == 4
+    assert response.timings["total"]["total_ms"] >= response.timings["extract"]["total_ms"]
@@ -0,0 +1,261 @@
+# 测试摘要服务
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.config import SUMMARY_PARTIAL_MAX_LENGTH
+from services.summary_service import SummaryService
+
+
+class FakeTokenizer:
+    """按字符计数的简易tokenizer"""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [[ord(char) for char in text] for text in texts]}
+
+    def decode(self, token_ids, skip_special_tokens=True):
+        return "".join(chr(token_id) for token_id in token_ids)
+
+
+def _make_service():
+    service = SummaryService()
+    summarizer = MagicMock(side_effect=lambda texts, **kwargs: [
+        {"summary_text": f"摘要{len(text)}" if kwargs["max_length"] == SUMMARY_PARTIAL_MAX_LENGTH else "最终摘要"} for text in texts
+    ])
+    summarizer.tokenizer = FakeTokenizer()
+    service.summarizer = summarizer
+    return service
+
+
+def test_short_input_is_summarized_in_one_call():
+    """测试未超出分块长度时只调用一次模型"""
+    service = _make_service()
+
+    with patch("services.summary_service.SUMMARY_CHUNK_TOKENS", 100):
+        summary = service.generate_summary([{"description": "短文本"}], "test_short")
+
+    assert summary == "最终摘要"
+    assert service.summarizer.call_count == 1
+    assert service.summarizer.call_args.kwargs["truncation"] is True
+
+
+def test_long_input_uses_batched_map_reduce():
+    """测试超出分块长度时按token分块、批量生成部分摘要后再汇总"""
+    service = _make_service()
+    articles = [{"description": "甲" * 30}, {"description": "乙" * 30}, {"description": "丙" * 90}]
+
+    with patch("services.summary_service.SUMMARY_CHUNK_TOKENS", 64):
+        summary = service.generate_summary(articles, "test_long")
+
+    assert summary == "最终摘要"
+    map_call, final_call = service.summarizer.call_args_list
+    chunks = map_call.args[0]
+    assert len(chunks) == 3  # 甲乙打包为一块，丙按token切分为两块
+    assert all(len(chunk.replace("\n", "")) <= 64 for chunk in chunks)
+    assert map_call.kwargs["truncation"] is True
+    assert final_call.kwargs["truncation"] is True
+    assert final_call.args[0] == ["摘要62\n\n摘要64\n\n摘要26"]
+
+
+def test_concurrent_requests_are_micro_batched():
+    """测试并发请求在等待窗口内合并为一次模型调用，并各自拿到对应结果"""
+    from concurrent.futures import ThreadPoolExecutor
+    from services.summary_service import MicroBatcher
+
+    run_batch = MagicMock(side_effect=lambda texts, **kwargs: [{"summary_text": f"{text}的摘要"} for text in texts])
+    batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=200)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda index: batcher.submit([f"文本{index}"], max_length=10), range(4)))
+
+    assert results == [[{"summary_text": f"文本{index}的摘要"}] for index in range(4)]
+    assert run_batch.call_count == 1
+    assert sorted(run_batch.call_args.args[0]) == [f"文本{index}" for index in range(4)]
+
+
+def test_micro_batcher_survives_failed_batch():
+    """测试批次处理出错时该批次的请求收到异常，工作线程继续处理后续请求"""
+    from services.summary_service import MicroBatcher
+
+    run_batch = MagicMock(side_effect=lambda texts, **kwargs: [{"summary_text": text} for text in texts])
+    batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=10)
+
+    # 不可哈希的生成参数使分组失败
+    with pytest.raises(TypeError):
+        batcher.submit(["文本"], bad_words_ids=[[1]])
+
+    run_batch.side_effect = lambda texts, **kwargs: []
+    with pytest.raises(ValueError):
+        batcher.submit(["文本"], max_length=10)
+
+    run_batch.side_effect = lambda texts, **kwargs: [{"summary_text": text} for text in texts]
+    assert batcher.submit(["文本"], max_length=10) == [{"summary_text": "文本"}]
+    assert all(worker.is_alive() for worker in batcher._workers)
+
+
+def test_readiness_reports_ready_after_startup_warm_up():
+    """测试启动时预热模型，预热完成前后就绪检查的返回"""
+    from fastapi.testclient import TestClient
+    from api.main import app
+    from services.summary_service import summary_service
+
+    with patch.object(summary_service, "warmed_up", False), \
+            patch.object(summary_service, "load_model"), \
+            patch.object(summary_service, "summarizer", MagicMock()) as mock_summarizer:
+        assert TestClient(app).get("/ready").status_code == 503
+
+        # 使用上下文管理器时会执行lifespan启动流程
+        with TestClient(app) as client:
+            for _ in range(50):
+                if summary_service.warmed_up:
+                    break
+                time.sleep(0.02)
+            response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    mock_summarizer.assert_called_once()
+
+
+def test_concurrent_load_model_loads_once():
+    """测试并发请求同时触发懒加载时只加载一份模型"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    service = SummaryService(backend="eager", process_workers=0)
+
+    def slow_load():
+        time.sleep(0.1)
+        return MagicMock()
+
+    with patch.object(service, "_load_eager_pipeline", side_effect=slow_load) as mock_load:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda index: service.load_model(f"test_load_{index}"), range(4)))
+
+    assert mock_load.call_count == 1
+
+
+def test_failed_preload_is_retried_until_ready():
+    """测试启动预加载失败后按退避间隔重试，成功后就绪检查返回就绪"""
+    import asyncio
+    from api.main import preload_models
+    from services.summary_service import summary_service
+
+    attempts = []
+
+    def flaky_warm_up(request_id="startup"):
+        attempts.append(request_id)
+        if len(attempts) < 3:
+            raise RuntimeError("模型文件暂不可用")
+        summary_service.warmed_up = True
+
+    with patch.object(summary_service, "warmed_up", False), \
+            patch.object(summary_service, "warm_up", side_effect=flaky_warm_up), \
+            patch("api.main.PRELOAD_RETRY_INITIAL_DELAY", 0.01):
+        asyncio.run(asyncio.wait_for(preload_models(), timeout=5))
+        assert summary_service.warmed_up
+
+    assert len(attempts) == 3
+
+
+def test_process_pool_runs_inference_in_worker_processes():
+    """测试推理进程池在独立进程中加载一次模型，并将并发任务结果返回给对应调用方"""
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+    from services.inference_pool import InferenceProcessPool
+
+    def fake_warm_up(self, request_id="startup"):
+        self.summarizer = lambda texts, **kwargs: [{"summary_text": f"{text}:{os.getpid()}"} for text in texts]
+
+    # fork方式启动的工作进程会继承此处的补丁，无需加载真实模型
+    with patch.object(SummaryService, "warm_up", fake_warm_up):
+        pool = InferenceProcessPool(2, "eager", start_method="fork")
+        try:
+            pool.start("test_pool")
+            assert pool.wait_ready(timeout=30)
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(lambda index: pool.submit([f"文本{index}"], max_length=10), range(4)))
+        finally:
+            pool.close()
+
+    for index, result in enumerate(results):
+        text, pid = result[0]["summary_text"].split(":")
+        assert text == f"文本{index}"
+        assert int(pid) != os.getpid()
+
+
+def test_process_pool_detects_crashed_worker_under_steady_load():
+    """测试其他工作进程持续返回结果时仍能发现异常退出的进程，其任务以异常结束而不是一直等待"""
+    import os
+    import threading
+    from services.inference_pool import InferenceProcessPool
+
+    def fake_warm_up(self, request_id="startup"):
+        def summarizer(texts, **kwargs):
+            if texts == ["崩溃"]:
+                os._exit(1)
+            time.sleep(0.05)
+            return [{"summary_text": text} for text in texts]
+        self.summarizer = summarizer
+
+    stop = threading.Event()
+
+    def keep_busy(pool):
+        while not stop.is_set():
+            pool.submit(["文本"], timeout=10)
+
+    with patch.object(SummaryService, "warm_up", fake_warm_up), \
+            patch("services.inference_pool.SUMMARY_PROCESS_CHECK_INTERVAL", 0.2):
+        pool = InferenceProcessPool(2, "eager", start_method="fork")
+        busy = threading.Thread(target=keep_busy, args=(pool,), daemon=True)
+        try:
+            pool.start("test_crash")
+            assert pool.wait_ready(timeout=30)
+            busy.start()
+            time.sleep(0.2)
+
+            start = time.monotonic()
+            with pytest.raises(RuntimeError):
+                pool.submit(["崩溃"], timeout=10)
+            assert time.monotonic() - start < 5
+
+            # 重启后的进程继续处理任务
+            assert pool.wait_ready(timeout=30)
+            assert pool.submit(["恢复"], timeout=10) == [{"summary_text": "恢复"}]
+        finally:
+            stop.set()
+            if busy.is_alive():
+                busy.join(timeout=10)
+            pool.close()
+
+
+def test_failed_pool_preload_recovers_on_retry(tmp_path):
+    """测试推理进程加载模型失败后，预加载重试会重启工作进程并恢复就绪"""
+    import asyncio
+    from api.main import preload_models
+    from services.inference_pool import InferenceProcessPool
+
+    # fork方式启动的工作进程之间通过文件记录尝试次数，首次加载失败
+    attempted = tmp_path / "attempted"
+
+    def fake_load_eager_pipeline(self):
+        if not attempted.exists():
+            attempted.touch()
+            raise RuntimeError("模型文件暂不可用")
+        return lambda texts, **kwargs: [{"summary_text": "预热"}]
+
+    service = SummaryService(backend="eager", process_workers=0)
+    service.pool = InferenceProcessPool(1, "eager", start_method="fork")
+    try:
+        with patch.object(SummaryService, "_load_eager_pipeline", fake_load_eager_pipeline), \
+                patch("services.summary_service.AutoTokenizer.from_pretrained", return_value=FakeTokenizer()), \
+                patch("api.main.summary_service", service), \
+                patch("api.main.PRELOAD_RETRY_INITIAL_DELAY", 0.01):
+            asyncio.run(asyncio.wait_for(preload_models(), timeout=60))
+    finally:
+        service.pool.close()
+
+    assert service.warmed_up
+    assert not service.pool.load_failed
+
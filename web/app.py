@@ -5,7 +5,7 @@ import os
 import sys
 import requests
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 import time
 import uuid
 
@@ -82,6 +82,48 @@ class GradioUI:
             logger.error(traceback.format_exc())
             return {"error": f"处理失败: {str(e)}"}
     
+    def stream_structured_briefing(self, topic: str, max_articles: int = 5, use_internal: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        流式生成结构化舆情简报
+        
+        Args:
+            topic: 监控主题
+            max_articles: 最大文章数量
+            use_internal: 是否使用内部调用方式（不通过HTTP）
+            
+        Yields:
+            结构化简报事件字典，格式与/briefing/structured/stream接口一致
+        """
+        if not topic.strip():
+            yield {"event": "error", "detail": "请输入有效的监控主题"}
+            return
+        
+        # 生成一个新的请求ID
+        self.request_id = f"req_{int(time.time())}_{hash(topic) % 10000}_structured_ui"
+        logger.info(f"[{self.request_id}] 收到流式生成结构化简报请求，主题: {topic}, 最大文章数: {max_articles}")
+        
+        if use_internal:
+            # 使用内部调用方式
+            request = BriefingRequest(topic=topic, max_articles=max_articles)
+            yield from structured_briefing_generator.stream_structured_briefing(request, self.request_id)
+            return
+        
+        # 使用HTTP API调用方式
+        url = f"{base_url}/briefing/structured/stream"
+        headers = {"Content-Type": "application/json"}
+        data = json.dumps({"topic": topic, "max_articles": max_articles})
+        
+        logger.info(f"[{self.request_id}] 调用流式API: {url}")
+        with requests.post(url, headers=headers, data=data, stream=True, timeout=60) as response:
+            if response.status_code != 200:
+                logger.error(f"[{self.request_id}] API调用失败，状态码: {response.status_code}, 响应: {response.text}")
+                yield {"event": "error", "detail": f"API调用失败: {response.text}"}
+                return
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if line:
+                    yield json.loads(line)
+    
     def create_ui(self):
         """创建Gradio用户界面"""
         with gr.Blocks(title="舆情简报服务", theme=gr.themes.Soft()) as demo:
@@ -156,32 +198,48 @@ class GradioUI:
             
             # 设置按钮点击事件
             def on_generate_click(topic, max_articles, use_internal):
-                """处理生成按钮点击事件"""
+                """处理生成按钮点击事件，按流式事件逐步刷新界面"""
                 status_output = "正在生成结构化舆情简报，请稍候..."
                 positive_output = ""
                 negative_output = ""
                 suggestion_output = ""
                 meta_output = ""
+                yield status_output, positive_output, negative_output, suggestion_output, meta_output
                 
+                article_count = 0
+                finished_count = 0
+                summary_length = 0
                 try:
-                    # 调用生成结构化简报的方法
-                    result = self.generate_structured_briefing(topic, max_articles, use_internal)
-                    
-                    if "error" in result:
-                        # 处理错误情况
-                        status_output = f"❌ 处理失败: {result['error']}"
-                    else:
-                        # 处理成功情况
-                        status_output = "✅ 结构化舆情简报生成成功！"
-                        positive_output = result.get("positive_opinion", "暂无正面意见总结")
-                        negative_output = result.get("negative_concern", "暂无负面关切总结")
-                        suggestion_output = result.get("constructive_suggestion", "暂无建设性建议总结")
-                        meta_output = f"主题: {result.get('topic', '')}, 文章数量: {result.get('article_count', 0)}, 处理时间: {result.get('processing_time', '')}"
+                    # 调用流式生成结构化简报的方法
+                    for event in self.stream_structured_briefing(topic, max_articles, use_internal):
+                        if event["event"] == "error":
+                            # 处理错误情况
+                            status_output = f"❌ 处理失败: {event['detail']}"
+                        elif event["event"] == "articles":
+                            article_count = event["article_count"]
+                            status_output = f"已获取 {article_count} 篇文章，正在逐篇分析..."
+                        elif event["event"] == "article_result":
+                            finished_count += 1
+                            status_output = f"正在逐篇分析文章 ({finished_count}/{article_count})..."
+                        elif event["event"] == "summary_delta":
+                            summary_length += len(event["text"])
+                            status_output = f"文章分析完成，正在生成总结（已生成 {summary_length} 字）..."
+                        elif event["event"] == "summary":
+                            positive_output = event.get("positive_opinion") or "暂无正面意见总结"
+                            negative_output = event.get("negative_concern") or "暂无负面关切总结"
+                            suggestion_output = event.get("constructive_suggestion") or "暂无建设性建议总结"
+                        elif event["event"] == "done":
+                            # 处理成功情况
+                            status_output = "✅ 结构化舆情简报生成成功！"
+                            meta_output = f"主题: {event.get('topic', '')}, 文章数量: {event.get('article_count', 0)}, 处理时间: {event.get('processing_time', '')}"
+                        else:
+                            continue
+                        
+                        yield status_output, positive_output, negative_output, suggestion_output, meta_output
                 except Exception as e:
                     status_output = f"❌ 处理过程中发生错误: {str(e)}"
                     logger.error(f"[{self.request_id}] 处理按钮点击事件时发生错误: {str(e)}")
-                
-                return status_output, positive_output, negative_output, suggestion_output, meta_output
+                    yield status_output, positive_output, negative_output, suggestion_output, meta_output
             
             # 绑定按钮点击事件
             generate_btn.click(